@@ -0,0 +1,49 @@
+# Builds trees from Python source code.
+#
+# Every node of the abstract syntax tree (see the ast module) is a node
+# labeled with its class name followed by its fields which are not
+# nodes, such as names, constants and operators, e.g. 'Name(x)',
+# 'FunctionDef(f)', 'Num(1)' or 'BinOp(Add)'. Its children are its
+# child nodes in the order of the fields of the class. The Load, Store,
+# ... contexts of the expressions are left out.
+
+import ast
+
+from util.tree_builder import TreeBuilder
+
+# The nodes which are shown in the labels of their fathers
+_OPERATORS = (ast.operator, ast.unaryop, ast.cmpop, ast.boolop)
+
+# Returns the tree of the Python module in source (a str). fileName is
+# only used in the messages of syntax errors.
+def buildTreeFromPython(source, fileName='<unknown>'):
+  builder = TreeBuilder()
+  # What is left to do, last first: a node to walk, or None to end one
+  pending = [ast.parse(source, fileName)]
+  while pending:
+    node = pending.pop()
+    if node is None:
+      builder.end()
+      continue
+    values = []
+    children = []
+    for _, value in ast.iter_fields(node):
+      if isinstance(value, ast.expr_context):
+        continue
+      for item in value if isinstance(value, list) else [value]:
+        if isinstance(item, _OPERATORS):
+          values.append(type(item).__name__)
+        elif isinstance(item, ast.AST):
+          children.append(item)
+        elif item is not None:
+          values.append(_text(item))
+    builder.start('%s(%s)' % (type(node).__name__, ', '.join(values)))
+    pending.append(None)
+    pending.extend(reversed(children))
+  return builder.tree()
+
+# Returns the text of a field value in a label
+def _text(value):
+  if isinstance(value, basestring):
+    return value
+  return repr(value)
@@ -0,0 +1,2 @@
+"""Performance benchmarks. Run a benchmark with "python -m benchmarks.<name>"
+from the top directory of the repository."""
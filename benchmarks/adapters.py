@@ -0,0 +1,113 @@
+"""Compares the throughput of the loaders in nodes per second.
+
+One random tree is rendered as a YAML document, a JSON document, an XML
+document and a Python expression, each in the natural way for its format:
+
+    YAML    {label: [children]}
+    JSON    {"label": [children]}
+    XML     <label>children</label>
+    Python  label(children...)
+
+The loaders do not give the same number of nodes for the same tree (JSON
+adds an object and an array node per node, Python a name node per call),
+so the rate is the number of nodes of the tree each loader returns over
+the time it took, parsing included.
+
+Run with "python -m benchmarks.adapters [size] [depth]".
+"""
+
+import random
+import sys
+import time
+from StringIO import StringIO
+
+from ast2tree import buildTreeFromPython
+from json2tree import buildTreeFromJson
+from xml2tree import buildTreeFromXml
+from yaml2tree import buildTreesFromYamlInput
+
+DEFAULT_SIZE = 20000
+DEFAULT_DEPTH = 30
+LABELS = ['n%d' % index for index in range(50)]
+
+
+def random_shape(generator, size, depth):
+    """Returns the labels and the children lists of a random tree"""
+    labels = [generator.choice(LABELS)]
+    children = [[]]
+    depths = [0]
+    while len(labels) < size:
+        father = generator.randrange(len(labels))
+        if depths[father] == depth:
+            continue
+        children[father].append(len(labels))
+        labels.append(generator.choice(LABELS))
+        children.append([])
+        depths.append(depths[father] + 1)
+    return labels, children
+
+
+def render(labels, children, opening, separator, closing):
+    """Renders the tree with the text around and between the children
+
+    opening and closing map a label to the text before and after the
+    children of its node.
+    """
+    parts = []
+    pending = [0]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, str):
+            parts.append(node)
+            continue
+        parts.append(opening(labels[node]))
+        pending.append(closing(labels[node]))
+        for index, child in enumerate(reversed(children[node])):
+            pending.append(child)
+            if index < len(children[node]) - 1:
+                pending.append(separator)
+    return ''.join(parts)
+
+
+def timed(function, *arguments):
+    """Returns the result of the call and the seconds it took"""
+    start = time.time()
+    result = function(*arguments)
+    return result, time.time() - start
+
+
+def main():
+    """Prints the size of the tree each loader gives and its rate"""
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_DEPTH
+    generator = random.Random(size)
+    labels, children = random_shape(generator, size, depth)
+    # The recursion limit of the Python parser bounds the depth of its
+    # input, the others are read without recursion
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10 * depth + 100))
+    inputs = (
+        ('YAML', lambda source: buildTreesFromYamlInput(source)[0],
+         render(labels, children, lambda label: '{%s: [' % label, ', ',
+                lambda label: ']}')),
+        ('JSON', buildTreeFromJson,
+         render(labels, children, lambda label: '{"%s": [' % label, ', ',
+                lambda label: ']}')),
+        ('XML', lambda source: buildTreeFromXml(StringIO(source)),
+         render(labels, children, lambda label: '<%s>' % label, '',
+                lambda label: '</%s>' % label)),
+        ('Python', buildTreeFromPython,
+         render(labels, children, lambda label: '%s(' % label, ', ',
+                lambda label: ')')),
+    )
+    print 'size %d, depth %d' % (size, depth)
+    print '%-8s %10s %10s %9s %12s' % ('', 'bytes', 'nodes', 's',
+                                       'nodes/s')
+    for name, loader, source in inputs:
+        tree, seconds = timed(loader, source)
+        print '%-8s %10d %10d %9.3f %12.0f' % (
+            name, len(source), tree.size(), seconds,
+            tree.size() / max(seconds, 1e-9))
+
+
+if __name__ == '__main__':
+    main()
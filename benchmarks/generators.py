@@ -0,0 +1,121 @@
+"""Seeded tree generators for the benchmarks.
+
+Every generator takes a random.Random, so a seed gives the same trees on
+every run, and returns a Tree with its caches built. The shapes stress
+different terms of the cost of the algorithm: random trees are the
+average case, balanced k-ary trees have many nodes for their depth,
+chains have the largest depth for their size and stars the smallest.
+near_duplicate makes the pairs seen when versions of a document are
+diffed.
+"""
+
+from util.tree import Tree
+from util.tree import TreeNode
+
+LABELS = 'ABCDE'
+
+
+def _tree(root):
+    """Returns the tree (Tree) of the root with its caches built"""
+    tree = Tree(root)
+    tree.build_caches()
+    return tree
+
+
+def random_tree(generator, size, depth=None, labels=LABELS):
+    """Returns a random tree (Tree) of the given size
+
+    Every node after the root gets a father picked uniformly among the
+    nodes whose depth is below depth (no limit if None).
+    """
+    nodes = [TreeNode(generator.choice(labels))]
+    depths = [0]
+    # The nodes which can still get children
+    fathers = [0]
+    while len(nodes) < size:
+        father = fathers[generator.randrange(len(fathers))]
+        node = TreeNode(generator.choice(labels))
+        nodes[father].add_child(node)
+        nodes.append(node)
+        depths.append(depths[father] + 1)
+        if depth is None or depths[-1] < depth:
+            fathers.append(len(nodes) - 1)
+    return _tree(nodes[0])
+
+
+def kary_tree(generator, size, arity=2, labels=LABELS):
+    """Returns a balanced tree (Tree) of the given size
+
+    The nodes are filled in level by level, so every node but the last
+    ones has arity children.
+    """
+    nodes = [TreeNode(generator.choice(labels))]
+    for index in range(1, size):
+        node = TreeNode(generator.choice(labels))
+        nodes[(index - 1) // arity].add_child(node)
+        nodes.append(node)
+    return _tree(nodes[0])
+
+
+def chain(generator, size, labels=LABELS):
+    """Returns a path (Tree) of the given size, as deep as it can be"""
+    root = node = TreeNode(generator.choice(labels))
+    for _ in range(size - 1):
+        child = TreeNode(generator.choice(labels))
+        node.add_child(child)
+        node = child
+    return _tree(root)
+
+
+def star(generator, size, labels=LABELS):
+    """Returns a root with size - 1 leaves (Tree)"""
+    root = TreeNode(generator.choice(labels))
+    for _ in range(size - 1):
+        root.add_child(TreeNode(generator.choice(labels)))
+    return _tree(root)
+
+
+def copy_tree(tree):
+    """Returns a copy (Tree) of the tree with new nodes"""
+    copies = [None]
+    for position in range(1, tree.size() + 1):
+        copy = TreeNode(tree.node_at(position).label())
+        if position > 1:
+            copies[tree.father_position_of(position)].add_child(copy)
+        copies.append(copy)
+    return _tree(copies[1])
+
+
+def near_duplicate(generator, tree, edits, labels=LABELS):
+    """Returns a copy (Tree) of the tree changed by random edits
+
+    Every edit changes the label of a node, deletes a node other than the
+    root (its children take its place) or inserts a node which adopts a
+    run of consecutive children of its new father. So the distance from
+    the tree is at most edits with the unit costs.
+    """
+    root = copy_tree(tree).node_at(1)
+    for _ in range(edits):
+        nodes = list(root.preorder_iterator())
+        node = generator.choice(nodes)
+        operation = generator.choice(('relabel', 'delete', 'insert'))
+        if operation == 'delete' and node is not root:
+            father = node.father()
+            index = list(father.children()).index(node)
+            father.remove_child(node)
+            for child in reversed(list(node.children())):
+                node.remove_child(child)
+                father.insert_child(index, child)
+        elif operation == 'insert':
+            children = list(node.children())
+            start = generator.randint(0, len(children))
+            stop = generator.randint(start, len(children))
+            inserted = TreeNode(generator.choice(labels))
+            for child in children[start:stop]:
+                node.remove_child(child)
+                inserted.add_child(child)
+            node.insert_child(start, inserted)
+        else:
+            others = [label for label in labels if label != node.label()]
+            node.set_label(generator.choice(others or labels))
+    return _tree(root)
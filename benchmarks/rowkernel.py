@@ -0,0 +1,89 @@
+"""Compares the row kernel of D with the serial and wavefront ones.
+
+Filling E and MIN_M for trees of thousands of nodes takes far too long,
+so D is filled from a made up MIN_M table of whole numbers with the
+first row and column of computeMIN_M. The D tables and choices of the
+three evaluations are checked to be the same.
+
+Run with "python -m benchmarks.rowkernel [size] [depth]".
+"""
+
+import random
+import sys
+import time
+
+import numpy
+
+from benchmarks.generators import random_tree
+from costModel import UNIT_COSTS
+from treediff import INFINITE
+from treediff import KEEP_CHOICES
+from treediff import KEEP_NOTHING
+from treediff import computeD
+from wavefrontDiff import computeDRows
+from wavefrontDiff import computeDWavefront
+
+DEFAULT_SIZE = 2000
+DEFAULT_DEPTH = 12
+
+
+def made_up_min_m(generator, costs, source_size, target_size):
+    """Returns a MIN_M table (list) which looks like the real ones"""
+    row = target_size + 1
+    random_state = numpy.random.RandomState(generator.randrange(2 ** 31))
+    columns = numpy.arange(row)
+    table = numpy.empty((source_size + 1, row))
+    for i in range(source_size + 1):
+        table[i] = (numpy.abs(columns - i) +
+                    random_state.randint(0, 4, size=row))
+    table[0, :] = INFINITE
+    table[:, 0] = INFINITE
+    table[1, 1] = costs.relabelCosts[1][1]
+    table[1, 2:] = table[1, 1] + numpy.cumsum(costs.insertCosts[2:])
+    table[2:, 1] = table[1, 1] + numpy.cumsum(costs.deleteCosts[2:])
+    table[1, target_size] = INFINITE
+    table[source_size, 1] = INFINITE
+    return [int(value) if value != INFINITE else INFINITE
+            for value in table.ravel().tolist()]
+
+
+def timed(function, *arguments):
+    """Returns the result of the call and the seconds it took"""
+    start = time.time()
+    result = function(*arguments)
+    return result, time.time() - start
+
+
+def main():
+    """Prints the timings of the three evaluations of D"""
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_DEPTH
+    generator = random.Random(size)
+    source = random_tree(generator, size, depth)
+    target = random_tree(generator, size, depth)
+    costs = UNIT_COSTS.editCosts(source, target)
+    min_m = made_up_min_m(generator, costs, size, size)
+
+    print 'size %d x %d, depth %d' % (size, size, depth)
+    print '%-10s %10s %10s' % ('', 'nothing s', 'choices s')
+    expected = None
+    serial_time = None
+    for name, d_phase in (('serial', computeD),
+                          ('wavefront', computeDWavefront),
+                          ('rows', computeDRows)):
+        (d_table, _), nothing_time = timed(
+            d_phase, source, target, min_m, None, KEEP_NOTHING, costs)
+        result, choices_time = timed(
+            d_phase, source, target, min_m, None, KEEP_CHOICES, costs)
+        if expected is None:
+            expected = result
+            serial_time = choices_time
+        elif result != expected:
+            print '%s differs from serial' % name
+        print '%-10s %10.3f %10.3f   x%.1f' % (
+            name, nothing_time, choices_time, serial_time / choices_time)
+    print 'distance %g' % d_table[-1]
+
+
+if __name__ == '__main__':
+    main()
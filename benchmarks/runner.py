@@ -0,0 +1,248 @@
+"""Times computeDiff and its phases on generated trees, as JSON.
+
+For every generator and size (and depth, for the random trees) a pair of
+trees is made from one seed, and the runner times computeDiff as well as
+computeE, computeMIN_M and computeD on their own with the unit costs.
+computeDiff maps identical first and last children before it fills the
+tables, so on near duplicates it is much faster than its phases run on
+the whole trees.
+
+Every result has the sizes V, V' and the maximum depths L, L' of the
+trees and the term V * V' * L^2 * L'^2 of the time complexity of the
+algorithm. The summary has, per generator, the slope of the log of the
+time of the phases against the log of that term: a slope near 1 means
+the time grows like the bound.
+
+The phases run in Python unless --engine compiled asks for the compiled
+accelerator of treediff (see buildAccelerator.py), and the report says
+which engine was timed.
+
+Run with "python -m benchmarks.runner [options]", e.g.
+"python -m benchmarks.runner --sizes 10,20,30 --output results.json".
+"""
+
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+import zlib
+
+import treediff
+from benchmarks import generators
+from costModel import UNIT_COSTS
+from treediff import KEEP_CHOICES
+from treediff import KEEP_MAPPINGS
+from treediff import KEEP_NOTHING
+from treediff import computeD
+from treediff import computeDiff
+from treediff import computeE
+from treediff import computeMIN_M
+
+GENERATORS = ('random', 'kary', 'chain', 'star', 'near-duplicate')
+PHASES = ('computeE', 'computeMIN_M', 'computeD')
+ENGINES = ('python', 'compiled')
+
+
+def make_pair(name, generator, size, depth, arity, edits):
+    """Returns a (source, target) pair of trees (Tree) of the generator"""
+    if name == 'near-duplicate':
+        source = generators.random_tree(generator, size, depth)
+        return source, generators.near_duplicate(generator, source, edits)
+    if name == 'random':
+        make = lambda: generators.random_tree(generator, size, depth)
+    elif name == 'kary':
+        make = lambda: generators.kary_tree(generator, size, arity)
+    elif name == 'chain':
+        make = lambda: generators.chain(generator, size)
+    elif name == 'star':
+        make = lambda: generators.star(generator, size)
+    else:
+        raise ValueError('Unknown generator', name)
+    return make(), make()
+
+
+def timed(function, *arguments):
+    """Returns the result of the call and the seconds it took"""
+    start = time.time()
+    result = function(*arguments)
+    return result, time.time() - start
+
+
+def best_of(repeat, function, *arguments):
+    """Returns the result of the call and the least seconds of repeat"""
+    result, best = timed(function, *arguments)
+    for _ in range(repeat - 1):
+        best = min(best, timed(function, *arguments)[1])
+    return result, best
+
+
+def time_phases(source, target, keep, repeat):
+    """Returns the seconds each phase of the algorithm took"""
+    costs = UNIT_COSTS.editCosts(source, target)
+    (E, for_e), e_time = best_of(repeat, computeE, source, target, keep,
+                                 costs)
+    (min_m, for_min_m), min_m_time = best_of(
+        repeat, computeMIN_M, E, for_e, source, target, keep, costs)
+    _, d_time = best_of(repeat, computeD, source, target, min_m, for_min_m,
+                        keep, costs)
+    return dict(zip(PHASES, (e_time, min_m_time, d_time)))
+
+
+def run_case(name, size, depth, options):
+    """Returns the result (a dict) of one pair of trees"""
+    # Every case has its own seed, so it gives the same trees whichever
+    # other cases are run
+    generator = random.Random(zlib.crc32('%d %s %d %s' % (
+        options.seed, name, size, depth)))
+    source, target = make_pair(name, generator, size, depth, options.arity,
+                               options.edits)
+    source_depth = max(source.depths()[1:])
+    target_depth = max(target.depths()[1:])
+    (distance, _), diff_time = best_of(options.repeat, computeDiff, source,
+                                       target)
+    seconds = time_phases(source, target, options.keep, options.repeat)
+    seconds['computeDiff'] = diff_time
+    return {
+        'generator': name,
+        'size': size,
+        'depth': depth,
+        'source_size': source.size(),
+        'target_size': target.size(),
+        'source_depth': source_depth,
+        'target_depth': target_depth,
+        'complexity': (source.size() * target.size() *
+                       max(source_depth, 1) ** 2 * max(target_depth, 1) ** 2),
+        'distance': distance,
+        'seconds': seconds,
+    }
+
+
+def slope(results):
+    """Returns the least squares slope of log(time) against log(term)
+
+    The time is the sum of the phases. None if there are not two distinct
+    terms to fit.
+    """
+    points = [(math.log(result['complexity']),
+               math.log(max(sum(result['seconds'][phase]
+                                for phase in PHASES), 1e-9)))
+              for result in results]
+    if len(set(x for x, _ in points)) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    return (sum((x - mean_x) * (y - mean_y) for x, y in points) /
+            sum((x - mean_x) ** 2 for x, _ in points))
+
+
+def pin_engine(engine):
+    """Makes treediff run its phases with the given engine and returns the
+    accelerator module to restore afterwards"""
+    accelerator = treediff._accelerator  # pylint: disable=protected-access
+    if engine == 'python':
+        treediff._accelerator = None  # pylint: disable=protected-access
+    return accelerator
+
+
+def integers(text):
+    """Parses a comma separated list of integers"""
+    return [int(item) for item in text.split(',')]
+
+
+def parse_options(arguments):
+    """Returns the options of the command line"""
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.runner',
+        description='Times computeDiff and its phases on generated trees.')
+    parser.add_argument('--generators', default=','.join(GENERATORS),
+                        help='comma separated, from %s' % ', '.join(
+                            GENERATORS))
+    parser.add_argument('--sizes', type=integers, default=[8, 12, 16],
+                        help='comma separated tree sizes')
+    parser.add_argument('--depths', type=integers, default=[4, 8],
+                        help='maximum depths of the random trees')
+    parser.add_argument('--arity', type=int, default=3,
+                        help='number of children in the k-ary trees')
+    parser.add_argument('--edits', type=int, default=3,
+                        help='number of edits of the near duplicates')
+    parser.add_argument('--keep', default=KEEP_NOTHING,
+                        choices=(KEEP_MAPPINGS, KEEP_CHOICES, KEEP_NOTHING),
+                        help='what the phases record besides the costs')
+    parser.add_argument('--engine', default='python', choices=ENGINES,
+                        help='whether the phases run in Python or in the '
+                        'compiled accelerator')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='the best of this many runs is reported')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='JSON file (default: stdout)')
+    options = parser.parse_args(arguments)
+    options.generators = options.generators.split(',')
+    if options.engine == 'compiled':
+        # pylint: disable=protected-access
+        if treediff._accelerator is None:
+            parser.error('the accelerator is not built, run '
+                         '"python buildAccelerator.py"')
+        if options.keep == KEEP_MAPPINGS:
+            parser.error('the accelerator does not keep mappings')
+    for name in options.generators:
+        if name not in GENERATORS:
+            parser.error('unknown generator %s' % name)
+    return options
+
+
+def run_cases(options):
+    """Returns the results (list of dict) of all the cases"""
+    results = []
+    for name in options.generators:
+        # Only the random trees (and their near duplicates) have a depth
+        # limit, the depth of the other shapes follows from their size
+        depths = (options.depths if name in ('random', 'near-duplicate')
+                  else [None])
+        for size in options.sizes:
+            for depth in depths:
+                results.append(run_case(name, size, depth, options))
+                sys.stderr.write('%s size %d depth %s: %.3f s\n' % (
+                    name, size, depth,
+                    results[-1]['seconds']['computeDiff']))
+    return results
+
+
+def main():
+    """Runs all the cases and writes the results as JSON"""
+    options = parse_options(sys.argv[1:])
+    accelerator = pin_engine(options.engine)
+    try:
+        results = run_cases(options)
+    finally:
+        treediff._accelerator = accelerator  # pylint: disable=protected-access
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'options': {
+            'sizes': options.sizes,
+            'depths': options.depths,
+            'arity': options.arity,
+            'edits': options.edits,
+            'keep': options.keep,
+            'engine': options.engine,
+            'repeat': options.repeat,
+            'seed': options.seed,
+        },
+        'results': results,
+        'slopes': dict((name, slope([result for result in results
+                                     if result['generator'] == name]))
+                       for name in options.generators),
+    }
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+    else:
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
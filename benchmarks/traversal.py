@@ -0,0 +1,127 @@
+"""Compares the iterative tree traversals with recursive ones.
+
+The recursive versions are the ones util.tree used before it switched to
+explicit stacks. They need a raised recursion limit and a large thread
+stack to get through deep trees at all.
+
+Run with "python -m benchmarks.traversal [depth]".
+"""
+
+import sys
+import threading
+import time
+
+from util.tree import Tree
+from util.tree import TreeNode
+
+DEFAULT_DEPTH = 10 ** 5
+
+
+def recursive_preorder(node, visit):
+    """Preorder traversal with one Python call per level"""
+    visit(node)
+    for child in node.children():
+        recursive_preorder(child, visit)
+
+
+def iterative_build_subtree(root_label, children):
+    """YAML subtree builder with an explicit stack, as yaml2tree built the
+    trees from the parsed documents before it read the parser events"""
+    root_node = TreeNode(root_label)
+    pending = [(root_node, children)]
+    while pending:
+        node, child_dicts = pending.pop()
+        if child_dicts:
+            for child_dict in child_dicts:
+                child_label, children_of_child = child_dict.iteritems().next()
+                child_node = TreeNode(child_label)
+                node.add_child(child_node)
+                pending.append((child_node, children_of_child))
+    return root_node
+
+
+def recursive_build_subtree(root_label, children):
+    """YAML subtree builder with one Python call per level"""
+    root_node = TreeNode(root_label)
+    if children:
+        for child_dict in children:
+            child_label, children_of_child = child_dict.iteritems().next()
+            root_node.add_child(
+                recursive_build_subtree(child_label, children_of_child))
+    return root_node
+
+
+def chain(depth):
+    """Returns the root (TreeNode) of a path of the given depth"""
+    root = node = TreeNode('n0')
+    for index in range(1, depth):
+        child = TreeNode('n%d' % index)
+        node.add_child(child)
+        node = child
+    return root
+
+
+def yaml_chain(depth):
+    """Returns the parsed YAML form (nested dicts) of a path"""
+    children = None
+    for index in range(depth - 1, 0, -1):
+        children = [{'n%d' % index: children}]
+    return children
+
+
+def timed(function, *arguments):
+    """Returns the seconds the call took"""
+    start = time.time()
+    function(*arguments)
+    return time.time() - start
+
+
+def run_with_deep_stack(function):
+    """Runs the function in a thread whose stack fits deep recursion"""
+    results = []
+    old_limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(10 ** 7)
+    threading.stack_size(1024 * 1024 * 1024)
+    try:
+        thread = threading.Thread(
+            target=lambda: results.append(function()))
+        thread.start()
+        thread.join()
+    finally:
+        threading.stack_size(0)
+        sys.setrecursionlimit(old_limit)
+    return results[0] if results else None
+
+
+def main():
+    """Prints the timings of both versions of each traversal"""
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_DEPTH
+    root = chain(depth)
+    tree = Tree(root)
+    children = yaml_chain(depth)
+    noop = lambda node: None
+
+    rows = [
+        ('preorder',
+         timed(lambda: [noop(node) for node in tree.preorder_iterator()]),
+         run_with_deep_stack(
+             lambda: timed(recursive_preorder, root, noop))),
+        ('postorder',
+         timed(lambda: [noop(node) for node in tree.postorder_iterator()]),
+         None),
+        ('build_caches', timed(tree.build_caches), None),
+        ('yaml build',
+         timed(iterative_build_subtree, 'n0', children),
+         run_with_deep_stack(
+             lambda: timed(recursive_build_subtree, 'n0', children))),
+    ]
+    print 'depth %d' % depth
+    print '%-14s %12s %12s' % ('', 'iterative s', 'recursive s')
+    for name, iterative, recursive in rows:
+        print '%-14s %12.3f %12s' % (
+            name, iterative,
+            '-' if recursive is None else '%.3f' % recursive)
+
+
+if __name__ == '__main__':
+    main()
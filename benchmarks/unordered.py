@@ -0,0 +1,135 @@
+"""Compares the unordered diff with the ordered computeDiff on configs.
+
+A config is a tree like a YAML mapping: a root with keys, each with a
+value, and every tenth key with a list of items of two values. The other
+config has its keys and items in another order (the order of a mapping
+is not kept by the loaders either) and some values changed, so its
+unordered distance is the number of changes.
+
+The unordered diff runs on all the sizes. The ordered algorithms of
+computeDiff ('tai' and 'zhang-shasha') only run up to --ordered-nodes,
+they grow quadratically with the number of keys. The distances show how
+much the order of the keys adds to the ordered ones.
+
+Run with "python -m benchmarks.unordered [options]", e.g.
+"python -m benchmarks.unordered --keys 100,1000,10000".
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from treediff import UNORDERED
+from treediff import computeDiff
+from util.tree_builder import TreeBuilder
+
+
+def config(generator, keys, changes):
+    """Returns the description (label, [children]) of a config and of the
+    same config in another order with changes values changed"""
+    sections = []
+    for key in range(keys):
+        children = [('v%d' % generator.randrange(100), [])]
+        if key % 10 == 0:
+            children.extend(
+                ('item', [('v%d' % generator.randrange(100), []),
+                          ('v%d' % generator.randrange(100), [])])
+                for _ in range(3))
+        sections.append(('key%d' % key, children))
+    source = ('config', sections)
+    target = changed(generator, reordered(generator, source), changes)
+    return source, target
+
+
+def reordered(generator, description):
+    """Returns the description with the children of every node shuffled"""
+    label, children = description
+    children = [reordered(generator, child) for child in children]
+    generator.shuffle(children)
+    return label, children
+
+
+def changed(generator, description, changes):
+    """Returns the description with the labels of changes leaves changed"""
+    leaves = []
+    pending = [description]
+    while pending:
+        _, children = pending.pop()
+        leaves.extend(child for child in children if not child[1])
+        pending.extend(child for child in children if child[1])
+    renamed = set(id(leaf) for leaf in generator.sample(leaves, changes))
+
+    def copy(node):
+        label, children = node
+        if id(node) in renamed:
+            label = 'changed'
+        return label, [copy(child) for child in children]
+    return copy(description)
+
+
+def build(description):
+    """Returns the tree (Tree) of the description"""
+    builder = TreeBuilder()
+    pending = [description]
+    while pending:
+        node = pending.pop()
+        if node is None:
+            builder.end()
+            continue
+        label, children = node
+        builder.start(label)
+        pending.append(None)
+        pending.extend(reversed(children))
+    return builder.tree()
+
+
+def timed(function, *arguments):
+    """Returns the result of the call and the seconds it took"""
+    start = time.time()
+    result = function(*arguments)
+    return result, time.time() - start
+
+
+def integers(text):
+    """Parses a comma separated list of integers"""
+    return [int(item) for item in text.split(',')]
+
+
+def main():
+    """Prints the distances and the timings of the algorithms"""
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.unordered',
+        description='Compares the unordered diff with the ordered ones.')
+    parser.add_argument('--keys', type=integers,
+                        default=[25, 50, 100, 1000, 10000],
+                        help='comma separated numbers of keys')
+    parser.add_argument('--changes', type=int, default=5,
+                        help='number of values changed')
+    parser.add_argument('--ordered-nodes', type=int, default=300,
+                        help='largest config the ordered algorithms run on')
+    parser.add_argument('--seed', type=int, default=0)
+    options = parser.parse_args(sys.argv[1:])
+
+    print '%7s %7s %10s %10s %12s %12s' % (
+        'keys', 'nodes', 'unordered', 'us/node', 'tai', 'zhang-shasha')
+    for keys in options.keys:
+        generator = random.Random(options.seed + keys)
+        source, target = config(generator, keys, options.changes)
+        source, target = build(source), build(target)
+        (distance, _), seconds = timed(computeDiff, source, target, UNORDERED)
+        columns = ['%7d %7d %4d %5.2fs %10.1f' % (
+            keys, source.size(), distance, seconds,
+            1e6 * seconds / source.size())]
+        for algorithm in ('tai', 'zhang-shasha'):
+            if source.size() > options.ordered_nodes:
+                columns.append('%12s' % '-')
+                continue
+            (distance, _), seconds = timed(computeDiff, source, target,
+                                           algorithm)
+            columns.append('%5d %5.2fs' % (distance, seconds))
+        print ' '.join(columns)
+
+
+if __name__ == '__main__':
+    main()
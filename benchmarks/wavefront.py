@@ -0,0 +1,83 @@
+"""Compares the wavefront evaluation of MIN_M and D with the serial one.
+
+Both are run on the same E table of two random trees, so the timings
+only cover the phases that wavefrontDiff replaces. The time computeE
+takes is printed for comparison since it bounds what the whole diff can
+gain.
+
+Run with "python -m benchmarks.wavefront [size] [depth]".
+"""
+
+import random
+import sys
+import time
+
+from costModel import UNIT_COSTS
+from treediff import KEEP_CHOICES
+from treediff import computeD
+from treediff import computeE
+from treediff import computeMIN_M
+from util.tree import Tree
+from util.tree import TreeNode
+from wavefrontDiff import computeDWavefront
+from wavefrontDiff import computeMIN_MWavefront
+
+DEFAULT_SIZE = 120
+DEFAULT_DEPTH = 12
+
+
+def random_tree(generator, size, depth):
+    """Returns a random tree (Tree) of the given size and maximum depth"""
+    nodes = [TreeNode('A')]
+    depths = [0]
+    while len(nodes) < size:
+        father = generator.randrange(len(nodes))
+        if depths[father] == depth:
+            continue
+        node = TreeNode(generator.choice('ABCDE'))
+        nodes[father].add_child(node)
+        nodes.append(node)
+        depths.append(depths[father] + 1)
+    tree = Tree(nodes[0])
+    tree.build_caches()
+    return tree
+
+
+def timed(function, *arguments):
+    """Returns the result of the call and the seconds it took"""
+    start = time.time()
+    result = function(*arguments)
+    return result, time.time() - start
+
+
+def main():
+    """Prints the timings of both evaluations of MIN_M and D"""
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_DEPTH
+    generator = random.Random(size)
+    source = random_tree(generator, size, depth)
+    target = random_tree(generator, size, depth)
+    costs = UNIT_COSTS.editCosts(source, target)
+
+    (E, choices_for_e), e_time = timed(
+        computeE, source, target, KEEP_CHOICES, costs)
+    rows = []
+    for name, min_m_phase, d_phase in (
+            ('serial', computeMIN_M, computeD),
+            ('wavefront', computeMIN_MWavefront, computeDWavefront)):
+        (min_m, choices_for_min_m), min_m_time = timed(
+            min_m_phase, E, choices_for_e, source, target, KEEP_CHOICES,
+            costs)
+        (d_table, _), d_time = timed(
+            d_phase, source, target, min_m, choices_for_min_m,
+            KEEP_CHOICES, costs)
+        rows.append((name, min_m_time, d_time, d_table[-1]))
+
+    print 'size %d, depth %d, computeE %.3f s' % (size, depth, e_time)
+    print '%-10s %10s %10s %9s' % ('', 'MIN_M s', 'D s', 'distance')
+    for name, min_m_time, d_time, distance in rows:
+        print '%-10s %10.3f %10.3f %9g' % (name, min_m_time, d_time, distance)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+# Memory-bounded evaluation of the tables of treediff.
+#
+# computeE fills the whole E table before computeMIN_M and computeD
+# start, and E has an entry for every pair of chains s <= u <= i and
+# t <= v <= j, which is what runs out of memory on large trees. But the
+# entries of source node i are only read by
+#
+#   - E(i + 1, j) for every j (the deletion of i + 1)
+#   - E(k, j) for the nodes k in the subtree of i + 1 (the split at the
+#     child i + 1 of u on the path to k)
+#   - MIN_M(i + 1, j) for every j
+#
+# so once the subtree of i + 1 is done, the row of E for i is never read
+# again. In the same way, the row of MIN_M for s is only read by the
+# MIN_M entries of the nodes below s and of s + 1, and the one of D for i
+# by the one for i + 1.
+#
+# computeBoundedDistance fills the rows of E, MIN_M and D for i = 1, 2,
+# ... one after the other with the row functions of treediff and drops
+# every row as soon as its last reader is done. Only the rows of the
+# nodes on the path to i (and their preorder predecessors) are held at
+# any time, i.e. at most depth + 1 rows of E instead of size. The result
+# is the same as computeDistance.
+
+from costModel import UNIT_COSTS
+from treediff import INFINITE
+from treediff import KEEP_MAPPINGS
+from treediff import KEEP_NOTHING
+from treediff import _Anchors
+from treediff import _Band
+from treediff import _TreeIndex
+from treediff import _cellCounts
+from treediff import _chainCount
+from treediff import _fillRowOfD
+from treediff import _fillRowOfE
+from treediff import _fillRowOfMinM
+from treediff import _subtreeSizes
+from treediff import _timed
+from treediff import flattenMapping
+from treeBounds import lowerBound
+
+
+# Returns when the rows of the source tree can be dropped: the last
+# source node whose entries read the row of E of node p (lastReaderOfE)
+# and the one of MIN_M of node p (lastReaderOfMinM), indexed by p
+def _lastReaders(sourceTree):
+  size = sourceTree.size()
+  sizes = _subtreeSizes(sourceTree)
+  lastReaderOfE = [p + sizes[p + 1] if p < size else p
+                   for p in range(size + 1)]
+  lastReaderOfMinM = [max(p + sizes[p] - 1, min(p + 1, size))
+                      for p in range(size + 1)]
+  return lastReaderOfE, lastReaderOfMinM
+
+# Returns the number of entries of E, MIN_M and D held at once when they
+# are at their most, as a dict from the name of a table to its entries
+def peakEntries(sourceTree, targetTree):
+  source = _TreeIndex(sourceTree)
+  target = _TreeIndex(targetTree)
+  row = target.size + 1
+  lastReaderOfE, lastReaderOfMinM = _lastReaders(sourceTree)
+  heldOfE = [0] * (source.size + 2)
+  heldOfMinM = [0] * (source.size + 2)
+  for p in range(1, source.size + 1):
+    rowOfE = _chainCount(source.depth[p] + 1) * target.pairs
+    heldOfE[p] += rowOfE
+    heldOfE[lastReaderOfE[p] + 1] -= rowOfE
+    heldOfMinM[p] += row
+    heldOfMinM[lastReaderOfMinM[p] + 1] -= row
+  peak = {'E': 0, 'MIN_M': 0, 'D': 2 * row}
+  entriesOfE, entriesOfMinM = 0, 0
+  for i in range(1, source.size + 1):
+    entriesOfE += heldOfE[i]
+    entriesOfMinM += heldOfMinM[i]
+    if entriesOfE + entriesOfMinM > peak['E'] + peak['MIN_M']:
+      peak['E'], peak['MIN_M'] = entriesOfE, entriesOfMinM
+  return peak
+
+# Returns the distance between the given trees like
+# treediff.computeDistance, holding only the rows of the tables which
+# are still to be read.
+#
+# @parameter sourceTree the source tree (Tree)
+# @parameter targetTree the target tree (Tree)
+# @parameter traceback whether to also return the mapping (bool), which
+#        keeps a mapping per entry held like computeDiff does
+# @parameter costModel the costs of the edit operations
+#        (costModel.CostModel), unit costs if None
+# @parameter maxDistance the largest distance of interest like in
+#        computeDistance, INFINITE (and no mapping) is returned above it
+# @parameter maxEntries the largest number of entries of the tables to
+#        hold at once (see peakEntries), no limit if None. MemoryError
+#        is raised before anything is computed if more are needed.
+# @parameter stats collects the time of the phases and the peak entries
+#        (diffStats.DiffStats), nothing is measured if None
+# @returns int, or (int, [(int, int)]) if traceback is True
+def computeBoundedDistance(sourceTree, targetTree, traceback=False,
+                           costModel=None, maxDistance=None,
+                           maxEntries=None, stats=None):
+  if stats is not None:
+    stats.diffs += 1
+  if costModel is None:
+    with _timed(stats, 'anchors'):
+      anchors = _Anchors(sourceTree, targetTree)
+    if anchors.found():
+      distance, mapping = _computeBoundedDiff(
+          anchors.sourceTree, anchors.targetTree, traceback, None,
+          anchors.maxDistance(maxDistance), maxEntries, stats)
+      if not traceback:
+        return anchors.distance(distance)
+      if mapping is None:
+        return anchors.distance(distance), None
+      with _timed(stats, 'mapping'):
+        return anchors.distance(distance), anchors.extend(mapping)
+  distance, mapping = _computeBoundedDiff(
+      sourceTree, targetTree, traceback, costModel, maxDistance, maxEntries,
+      stats)
+  if not traceback:
+    return distance
+  return distance, mapping
+
+def _computeBoundedDiff(sourceTree, targetTree, traceback, costModel,
+                        maxDistance, maxEntries, stats):
+  peak = peakEntries(sourceTree, targetTree)
+  if maxEntries is not None and sum(peak.values()) > maxEntries:
+    raise MemoryError('The tables need more entries than maxEntries',
+                      sum(peak.values()), maxEntries)
+  limit = INFINITE if maxDistance is None else maxDistance
+  if maxDistance is not None:
+    with _timed(stats, 'bounds'):
+      if lowerBound(sourceTree, targetTree, costModel) > limit:
+        return INFINITE, None
+  with _timed(stats, 'costs'):
+    costs = (costModel or UNIT_COSTS).editCosts(sourceTree, targetTree)
+  source = _TreeIndex(sourceTree)
+  target = _TreeIndex(targetTree)
+  band = _Band(source.size, target.size, costs, limit)
+  keep = KEEP_MAPPINGS if traceback else KEEP_NOTHING
+  lastReaderOfE, lastReaderOfMinM = _lastReaders(sourceTree)
+  # The rows held, by source node, as the row functions of treediff read
+  # them: (costs, mappings or None, 0)
+  rowsOfE = {}
+  rowsOfMinM = {}
+  rowsOfD = {}
+  for i in range(1, source.size + 1):
+    size = _chainCount(source.depth[i] + 1) * target.pairs
+    rowsOfE[i] = _newRow(size, traceback)
+    rowsOfMinM[i] = _newRow(target.size + 1, traceback)
+    rowsOfD[i] = _newRow(target.size + 1, traceback)
+    first, last = band.first(i), band.last(i)
+    with _timed(stats, 'computeE'):
+      _fillRowOfE(i, first, last, source, target, costs, keep,
+                  rowsOfE.__getitem__)
+    with _timed(stats, 'computeMIN_M'):
+      _fillRowOfMinM(i, first, last, source, target, costs, keep, limit,
+                     band, rowsOfE.__getitem__, rowsOfMinM.__getitem__)
+    with _timed(stats, 'computeD'):
+      _fillRowOfD(i, first, last, target.size, costs, keep, limit, band,
+                  rowsOfMinM.__getitem__, rowsOfD.__getitem__)
+    rowsOfD.pop(i - 1, None)
+    for rows, lastReader in ((rowsOfE, lastReaderOfE),
+                             (rowsOfMinM, lastReaderOfMinM)):
+      for p in [p for p in rows if lastReader[p] <= i]:
+        del rows[p]
+
+  if stats is not None:
+    for table, cells in zip(
+        ('E', 'MIN_M', 'D'),
+        _cellCounts(sourceTree, targetTree, costs, limit)):
+      stats.addCells(table, cells)
+    stats.addTables(peak)
+  D, mappingForD, _ = rowsOfD[source.size]
+  distance = D[target.size]
+  if distance > limit:
+    return INFINITE, None
+  if not traceback:
+    return distance, None
+  with _timed(stats, 'mapping'):
+    mapping = flattenMapping(mappingForD[target.size])
+  return distance, mapping
+
+# Returns a row of size entries as the row functions of treediff read it
+def _newRow(size, traceback):
+  return [INFINITE] * size, [None] * size if traceback else None, 0
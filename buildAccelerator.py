@@ -0,0 +1,61 @@
+# Builds _taiAccelerator, the compiled E, MIN_M and D phases of treediff
+# (see taiAccelerator.c), with cffi and the C compiler of the Python
+# installation:
+#
+#   python buildAccelerator.py
+#
+# The module is optional. treediff uses it when it can be imported and
+# runs its own loops otherwise.
+
+import os
+
+import cffi
+
+DECLARATIONS = '''
+struct tai_tree {
+    long size;
+    const long *depth;
+    const long *father;
+    const long *pairOffset;
+    const long *ancestors;
+    long ancestorsWidth;
+};
+
+struct tai_band {
+    long targetSize;
+    long lowest;
+    long highest;
+    long sizeDifference;
+    double cheapest;
+    double limit;
+};
+
+void tai_compute_e(const struct tai_tree *source,
+                   const struct tai_tree *target,
+                   const double *deleteCosts, const double *insertCosts,
+                   const double *relabel, const struct tai_band *band,
+                   double *E, unsigned char *choices);
+void tai_compute_min_m(const struct tai_tree *source,
+                       const struct tai_tree *target,
+                       const double *deleteCosts, const double *insertCosts,
+                       const double *relabel, const struct tai_band *band,
+                       const double *E, double *MIN_M, long *choices);
+void tai_compute_d(const struct tai_tree *source,
+                   const struct tai_tree *target,
+                   const double *deleteCosts, const double *insertCosts,
+                   const double *relabel, const struct tai_band *band,
+                   const double *MIN_M, double *D, unsigned char *choices);
+'''
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+# Returns the cffi builder of _taiAccelerator
+def builder():
+  ffi = cffi.FFI()
+  ffi.cdef(DECLARATIONS)
+  with open(os.path.join(DIRECTORY, 'taiAccelerator.c')) as source:
+    ffi.set_source('_taiAccelerator', source.read())
+  return ffi
+
+if __name__ == '__main__':
+  builder().compile(tmpdir=DIRECTORY)
@@ -0,0 +1,174 @@
+# Costs of the edit operations used by the algorithms in treediff and
+# keyrootDiff.
+#
+# A CostModel gives the cost of inserting, deleting and relabelling a
+# node from its label. The algorithms never call it in their loops:
+# editCosts asks the model once per distinct label (or pair of distinct
+# labels) and spreads the answers over arrays indexed by the preorder
+# positions of the nodes, which the loops index instead. The spreading
+# uses NumPy when it is installed.
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+from util.tree import LABELS
+
+
+# Costs of the edit operations on the nodes of a source and a target
+# tree, indexed by preorder position (index 0 is unused):
+#   deleteCosts[i] the cost of deleting source node i
+#   insertCosts[j] the cost of inserting target node j
+#   relabelCosts[i][j] the cost of changing source node i into target
+#                      node j (0 for a node kept as it is)
+class EditCosts(object):
+  def __init__(self, deleteCosts, insertCosts, relabelCosts):
+    self.deleteCosts = deleteCosts
+    self.insertCosts = insertCosts
+    self.relabelCosts = relabelCosts
+
+  # Returns the smallest cost of inserting or deleting a node, the least
+  # a difference of one node in size can cost.
+  def minimumInsertOrDelete(self):
+    return min(self.deleteCosts[1:] + self.insertCosts[1:])
+
+
+# The unit cost model of the original algorithm (see treediff.r):
+# inserting, deleting and changing the label of a node all cost 1.
+# Subclasses override the three cost methods.
+class CostModel(object):
+  # Returns the cost of inserting a node with the given label
+  def insertCost(self, label):
+    return 1
+
+  # Returns the cost of deleting a node with the given label
+  def deleteCost(self, label):
+    return 1
+
+  # Returns the cost of changing sourceLabel into targetLabel
+  def relabelCost(self, sourceLabel, targetLabel):
+    return 0 if sourceLabel == targetLabel else 1
+
+  # Returns relabelCost for every pair of the given labels as a list of
+  # rows. Override it to compute the whole matrix at once.
+  def relabelMatrix(self, sourceLabels, targetLabels):
+    return [[self.relabelCost(sourceLabel, targetLabel)
+             for targetLabel in targetLabels]
+            for sourceLabel in sourceLabels]
+
+  # Returns a cost no change of one of sourceLabels into a different one
+  # of targetLabels goes below, used by the bounds in treeBounds.
+  # Override it when the smallest cost is known without asking for every
+  # pair of labels.
+  def minimumRelabelCost(self, sourceLabels, targetLabels):
+    changes = [
+        cost
+        for sourceLabel, labelRow in zip(
+            sourceLabels, self.relabelMatrix(sourceLabels, targetLabels))
+        for targetLabel, cost in zip(targetLabels, labelRow)
+        if sourceLabel != targetLabel]
+    return min(changes) if changes else 0
+
+  # Returns a string which is the same for models giving the same costs,
+  # used by diffCache to store the diffs of the model. None means the
+  # diffs of the model are not cached. Override it in the subclasses that
+  # can tell.
+  def cacheKey(self):
+    return None
+
+  # Returns the EditCosts of the nodes of the given trees
+  #
+  # @parameter sourceTree the source tree (Tree)
+  # @parameter targetTree the target tree (Tree)
+  # @returns EditCosts
+  def editCosts(self, sourceTree, targetTree):
+    sourceLabels, sourceIndices = _distinctLabels(sourceTree)
+    targetLabels, targetIndices = _distinctLabels(targetTree)
+    deleteByLabel = [self.deleteCost(label) for label in sourceLabels]
+    insertByLabel = [self.insertCost(label) for label in targetLabels]
+    relabelByLabel = self.relabelMatrix(sourceLabels, targetLabels)
+    return EditCosts(
+        [deleteByLabel[index] for index in sourceIndices],
+        [insertByLabel[index] for index in targetIndices],
+        _spread(relabelByLabel, sourceIndices, targetIndices))
+
+
+# A cost model with a weight for every kind of operation which can be
+# refined per label, e.g. to make the deletion of some keys expensive or
+# the renaming between similar keys cheap.
+#
+# @parameter insert the cost of an insertion
+# @parameter delete the cost of a deletion
+# @parameter relabel the cost of changing a label into a different one
+# @parameter insertByLabel {label: cost} overriding insert
+# @parameter deleteByLabel {label: cost} overriding delete
+# @parameter relabelByPair {(sourceLabel, targetLabel): cost} overriding
+#            relabel
+class WeightedCostModel(CostModel):
+  def __init__(self, insert=1, delete=1, relabel=1, insertByLabel=None,
+               deleteByLabel=None, relabelByPair=None):
+    self.insert = insert
+    self.delete = delete
+    self.relabel = relabel
+    self.insertByLabel = insertByLabel or {}
+    self.deleteByLabel = deleteByLabel or {}
+    self.relabelByPair = relabelByPair or {}
+
+  def insertCost(self, label):
+    return self.insertByLabel.get(label, self.insert)
+
+  def deleteCost(self, label):
+    return self.deleteByLabel.get(label, self.delete)
+
+  def relabelCost(self, sourceLabel, targetLabel):
+    if sourceLabel == targetLabel:
+      return 0
+    return self.relabelByPair.get((sourceLabel, targetLabel), self.relabel)
+
+  def minimumRelabelCost(self, sourceLabels, targetLabels):
+    return min([self.relabel] + self.relabelByPair.values())
+
+  def cacheKey(self):
+    return repr((self.insert, self.delete, self.relabel,
+                 sorted(self.insertByLabel.items()),
+                 sorted(self.deleteByLabel.items()),
+                 sorted(self.relabelByPair.items())))
+
+
+# The model used when computeDiff is not given one, a WeightedCostModel
+# so that the bounds of treeBounds know its smallest relabel cost
+UNIT_COSTS = WeightedCostModel()
+
+# Returns the distinct labels of the tree and, indexed by preorder
+# position, the index of the label of every node in them.
+def _distinctLabels(tree):
+  size = tree.size()
+  if hasattr(tree, 'label_ids'):
+    keys = tree.label_ids()
+    labelOf = lambda position: LABELS.label_of(keys[position])
+  else:
+    keys = [None] + [tree.node_at(i).label() for i in range(1, size + 1)]
+    labelOf = lambda position: keys[position]
+  labels = []
+  indexOfKey = {}
+  indices = [0] * (size + 1)
+  for position in range(1, size + 1):
+    index = indexOfKey.get(keys[position])
+    if index is None:
+      index = indexOfKey[keys[position]] = len(labels)
+      labels.append(labelOf(position))
+    indices[position] = index
+  return labels, indices
+
+# Returns the rows of byLabel spread over the nodes: entry [i][j] is
+# byLabel[rowIndices[i]][columnIndices[j]].
+def _spread(byLabel, rowIndices, columnIndices):
+  if numpy is not None:
+    return numpy.asarray(byLabel)[
+        numpy.ix_(rowIndices, columnIndices)].tolist()
+  rows = []
+  for rowIndex in rowIndices:
+    labelRow = byLabel[rowIndex]
+    rows.append([labelRow[columnIndex] for columnIndex in columnIndices])
+  return rows
@@ -0,0 +1,147 @@
+# A cache in front of treediff.computeDiff for diffs which are computed
+# again and again, e.g. the same trees against the same baselines.
+#
+# The entries are keyed by the structural hashes of the two trees (see
+# util.tree.merkle_hashes) and the options of the diff, so trees built
+# anew with the same structure and labels find the entries of the
+# earlier ones. The most recently used entries are kept in memory. With
+# a path, the entries are also stored in a sqlite database which later
+# runs share. Both tiers evict their least recently used entries when
+# they grow beyond their size.
+
+import collections
+import hashlib
+import json
+import sqlite3
+
+from treediff import ALPHA
+from treediff import computeDiff
+from treediff import produceHumanFriendlyMapping
+
+
+# The entries of the database are ordered by a counter of their uses
+_NEXT_USE = 'SELECT COALESCE(MAX(used), 0) + 1 FROM diffs'
+
+
+class DiffCache(object):
+  # @parameter maxEntries the number of entries kept in memory
+  # @parameter path the file of the sqlite database, no disk tier if None
+  # @parameter maxDiskEntries the number of entries kept in the database
+  def __init__(self, maxEntries=1024, path=None, maxDiskEntries=100000):
+    if maxEntries < 1 or maxDiskEntries < 1:
+      raise ValueError('Cache sizes must be positive',
+                       maxEntries, maxDiskEntries)
+    self.maxEntries = maxEntries
+    self.maxDiskEntries = maxDiskEntries
+    self.hits = 0
+    self.misses = 0
+    self._entries = collections.OrderedDict()
+    self._database = None
+    if path is not None:
+      self._database = sqlite3.connect(path)
+      self._database.execute(
+          'CREATE TABLE IF NOT EXISTS diffs '
+          '(key TEXT PRIMARY KEY, entry TEXT, used INTEGER)')
+      self._database.execute(
+          'CREATE INDEX IF NOT EXISTS diffsByUse ON diffs (used)')
+      self._database.commit()
+
+  # Returns the same (distance, mapping, humanFriendlyMapping) as
+  # diffRunner.treesToDiff, from the cache when the same diff was
+  # computed before. The arguments are the ones of treediff.computeDiff.
+  # The mapping and its description are None if the distance is above
+  # maxDistance. stats (diffStats.DiffStats) counts the hits and misses
+  # and measures the diffs computed on misses.
+  def diff(self, sourceTree, targetTree, algorithm='tai', costModel=None,
+           maxDistance=None, stats=None):
+    key = self._key(sourceTree, targetTree, algorithm, costModel, maxDistance)
+    entry = None if key is None else self._get(key)
+    if entry is not None:
+      self.hits += 1
+      if stats is not None:
+        stats.cacheHits += 1
+      return _copy(entry)
+
+    self.misses += 1
+    if stats is not None:
+      stats.cacheMisses += 1
+    distance, mapping = computeDiff(
+        sourceTree, targetTree, algorithm, costModel, maxDistance, stats)
+    description = None
+    if mapping is not None:
+      description = produceHumanFriendlyMapping(
+          mapping, sourceTree, targetTree)
+    entry = (distance, mapping, description)
+    if key is not None:
+      self._put(key, _copy(entry))
+    return entry
+
+  # Empties both tiers
+  def clear(self):
+    self._entries.clear()
+    if self._database is not None:
+      self._database.execute('DELETE FROM diffs')
+      self._database.commit()
+
+  # Closes the database
+  def close(self):
+    if self._database is not None:
+      self._database.close()
+      self._database = None
+
+  # Returns the key of a diff, None for cost models without a cacheKey
+  def _key(self, sourceTree, targetTree, algorithm, costModel, maxDistance):
+    costKey = 'unit' if costModel is None else costModel.cacheKey()
+    if costKey is None:
+      return None
+    return hashlib.sha1(repr((
+        sourceTree.structural_hash(), targetTree.structural_hash(),
+        algorithm, costKey, maxDistance))).hexdigest()
+
+  def _get(self, key):
+    entry = self._entries.pop(key, None)
+    if entry is None and self._database is not None:
+      row = self._database.execute(
+          'SELECT entry FROM diffs WHERE key = ?', (key,)).fetchone()
+      if row is not None:
+        self._database.execute(
+            'UPDATE diffs SET used = (%s) WHERE key = ?' % _NEXT_USE, (key,))
+        self._database.commit()
+        entry = _decode(row[0])
+    if entry is not None:
+      self._remember(key, entry)
+    return entry
+
+  def _put(self, key, entry):
+    self._remember(key, entry)
+    if self._database is not None:
+      self._database.execute(
+          'INSERT OR REPLACE INTO diffs VALUES (?, ?, (%s))' % _NEXT_USE,
+          (key, _encode(entry)))
+      self._database.execute(
+          'DELETE FROM diffs WHERE key IN (SELECT key FROM diffs '
+          'ORDER BY used DESC LIMIT -1 OFFSET ?)', (self.maxDiskEntries,))
+      self._database.commit()
+
+  # Adds the entry to the memory tier as the most recently used one
+  def _remember(self, key, entry):
+    self._entries[key] = entry
+    while len(self._entries) > self.maxEntries:
+      self._entries.popitem(last=False)
+
+def _encode(entry):
+  return json.dumps(entry)
+
+def _decode(text):
+  distance, mapping, description = json.loads(text)
+  if mapping is not None:
+    mapping = [(ALPHA if i == ALPHA else i, ALPHA if j == ALPHA else j)
+               for i, j in mapping]
+  return (distance, mapping, description)
+
+# Returns a copy of the entry which the caller can change
+def _copy(entry):
+  distance, mapping, description = entry
+  return (distance,
+          None if mapping is None else list(mapping),
+          None if description is None else list(description))
@@ -3,10 +3,15 @@ from diff2Dot import generateDot
 
 DEBUG = False
 
-def treesToDiff(sourceTree, targetTree, outputDotGraph=False):
-    distance, mapping = computeDiff(sourceTree, targetTree) 
-    humanFriendlyDescription = produceHumanFriendlyMapping(
-        mapping, sourceTree, targetTree) 
+# The cache (diffCache.DiffCache) is used when it is given
+def treesToDiff(sourceTree, targetTree, outputDotGraph=False, cache=None):
+    if cache is not None:
+        distance, mapping, humanFriendlyDescription = cache.diff(
+            sourceTree, targetTree)
+    else:
+        distance, mapping = computeDiff(sourceTree, targetTree)
+        humanFriendlyDescription = produceHumanFriendlyMapping(
+            mapping, sourceTree, targetTree)
     if DEBUG:
         print distance
         print mapping
@@ -0,0 +1,158 @@
+# Diffs of two trees kept up to date while the trees are edited, e.g. a
+# document against its baseline in an editor.
+#
+# A session keeps the tables of the last computation (with the choices of
+# KEEP_CHOICES, see treediff). The entries of the nodes i and j only
+# depend on the nodes up to i and up to j in preorder, and an edit at the
+# preorder position p leaves the nodes before p as they are. So the next
+# computation takes the entries of the nodes before the first edited
+# positions over and only computes the others: an edit near the end of
+# the preorder is much cheaper than a diff from scratch, an edit near the
+# root costs about as much.
+
+from costModel import UNIT_COSTS
+from treediff import INFINITE
+from treediff import KEEP_CHOICES
+from treediff import _KeptTables
+from treediff import _TreeIndex
+from treediff import _compiledCosts
+from treediff import _phaseDistance
+from treediff import _traceback
+from treediff import computeD
+from treediff import computeE
+from treediff import computeMIN_M
+from util.tree import TreeNode
+
+# The trees an edit of a DiffSession applies to
+SOURCE = 'source'
+TARGET = 'target'
+
+
+class DiffSession(object):
+  # @parameter sourceTree the source tree (util.tree.Tree), edited in place
+  # @parameter targetTree the target tree (util.tree.Tree), edited in place
+  # @parameter costModel the costs of the edit operations
+  #        (costModel.CostModel), unit costs if None
+  def __init__(self, sourceTree, targetTree, costModel=None):
+    self.sourceTree = sourceTree
+    self.targetTree = targetTree
+    self.costModel = costModel or UNIT_COSTS
+    # The tables of the last computation (_KeptTables), None before the
+    # first one
+    self._tables = None
+    # The first preorder positions edited since the last computation
+    self._firstSource = 1
+    self._firstTarget = 1
+    self._result = None
+
+  # Returns the distance between the trees like treediff.computeDistance
+  def distance(self):
+    return self.diff()[0]
+
+  # Returns the distance between the trees and the mapping like
+  # treediff.computeDiff, computing the entries of the tables changed by
+  # the edits since the last call
+  def diff(self):
+    if self._result is None:
+      self._compute()
+    distance, mapping = self._result
+    return (distance, list(mapping))
+
+  # Inserts a node with the given label as the child at index of the
+  # node at fatherPosition. The childCount children of the father from
+  # index on become the children of the new node.
+  #
+  # @parameter side SOURCE or TARGET
+  # @returns the preorder position of the new node (int)
+  def insertNode(self, side, fatherPosition, index, label, childCount=0):
+    tree = self._tree(side)
+    father = self._node(tree, fatherPosition)
+    children = list(father.children())
+    if not (0 <= index and 0 <= childCount and
+            index + childCount <= len(children)):
+      raise ValueError('No such children', index, childCount)
+    node = TreeNode(label)
+    for child in children[index:index + childCount]:
+      father.remove_child(child)
+      node.add_child(child)
+    father.insert_child(index, node)
+    tree.build_caches()
+    position = node.preorder_position()
+    self._edited(side, position)
+    return position
+
+  # Deletes the node at position, its children take its place among the
+  # children of its father. The root cannot be deleted.
+  #
+  # @parameter side SOURCE or TARGET
+  def deleteNode(self, side, position):
+    tree = self._tree(side)
+    node = self._node(tree, position)
+    if position == 1:
+      raise ValueError('The root cannot be deleted', position)
+    father = node.father()
+    index = list(father.children()).index(node)
+    father.remove_child(node)
+    for offset, child in enumerate(list(node.children())):
+      father.insert_child(index + offset, child)
+    tree.build_caches()
+    self._edited(side, position)
+
+  # Changes the label of the node at position
+  #
+  # @parameter side SOURCE or TARGET
+  def relabelNode(self, side, position, label):
+    tree = self._tree(side)
+    self._node(tree, position).set_label(label)
+    tree.build_caches()
+    self._edited(side, position)
+
+  def _tree(self, side):
+    if side == SOURCE:
+      return self.sourceTree
+    if side == TARGET:
+      return self.targetTree
+    raise ValueError('Unknown side', side)
+
+  @staticmethod
+  def _node(tree, position):
+    node = tree.node_at(position)
+    if node is None:
+      raise ValueError('No node at position', position)
+    return node
+
+  # Records that the nodes from position on may have changed
+  def _edited(self, side, position):
+    if side == SOURCE:
+      self._firstSource = min(self._firstSource, position)
+    else:
+      self._firstTarget = min(self._firstTarget, position)
+    self._result = None
+
+  def _compute(self):
+    source = self.sourceTree
+    target = self.targetTree
+    costs = self.costModel.editCosts(source, target)
+    kept = self._tables
+    if kept is not None:
+      kept.firstSource = self._firstSource
+      kept.firstTarget = self._firstTarget
+    compiled = _compiledCosts(costs, KEEP_CHOICES, INFINITE, kept)
+    E, choicesForE = computeE(
+        source, target, KEEP_CHOICES, costs, kept=kept, compiled=compiled)
+    MIN_M, choicesForMinM = computeMIN_M(
+        E, choicesForE, source, target, KEEP_CHOICES, costs, kept=kept,
+        compiled=compiled)
+    D, choicesForD = computeD(
+        source, target, MIN_M, choicesForMinM, KEEP_CHOICES, costs,
+        kept=kept, compiled=compiled)
+    distance = _phaseDistance(
+        D[source.size() * (target.size() + 1) + target.size()], compiled)
+    mapping = _traceback(source, target, choicesForE, choicesForMinM,
+                         choicesForD)
+    self._result = (distance, mapping)
+    self._tables = _KeptTables(
+        source.size() + 1, target.size() + 1, _TreeIndex(target).pairs,
+        target.size(), E, choicesForE, MIN_M, choicesForMinM, D, choicesForD)
+    self._firstSource = source.size() + 1
+    self._firstTarget = target.size() + 1
@@ -0,0 +1,136 @@
+# Statistics of diffs for finding out where their time and memory go.
+#
+# A DiffStats is handed to treediff.computeDiff (or DiffCache.diff) and
+# collects, over all the diffs it is given to:
+#
+#   - the seconds spent in every phase: 'anchors' (mapping identical
+#     subtrees, see treediff._Anchors), 'bounds' (treeBounds.lowerBound
+#     under maxDistance), 'costs' (the cost arrays of the cost model),
+#     'computeE', 'computeMIN_M', 'computeD' or the keyroot algorithm
+#     ('zhang-shasha', 'apted') and 'mapping' (building the result)
+#   - the number of DP cells computed per table
+#   - the number of entries of every table and the largest number of
+#     entries held at once by one diff
+#   - the bytes of the mappings held by the tables of one diff, at
+#     most, if measureMappings is True: they are measured by walking the
+#     tables, which takes about as long as filling them, and the phases
+#     run in Python to keep them even if treediff has its compiled
+#     accelerator, so the statistics are then of the Python engine
+#   - the hits and misses of DiffCache
+#
+# Without a DiffStats, computeDiff does none of this work. asDict returns
+# the statistics as plain numbers, lists and dicts for JSON or a metrics
+# system.
+
+import collections
+import sys
+import time
+
+
+class DiffStats(object):
+  # @parameter measureMappings whether to measure the bytes of the
+  #        mappings (bool). This switches the phases from the compiled
+  #        accelerator of treediff, when it is built, to the much slower
+  #        Python engine.
+  def __init__(self, measureMappings=False):
+    self.measureMappings = measureMappings
+    self.diffs = 0
+    self.seconds = collections.OrderedDict()
+    self.cells = collections.OrderedDict()
+    self.tableEntries = collections.OrderedDict()
+    self.peakTableEntries = 0
+    self.peakMappingBytes = 0
+    self.cacheHits = 0
+    self.cacheMisses = 0
+
+  # Returns a context manager adding the seconds spent in it to phase
+  def timer(self, phase):
+    return _PhaseTimer(self, phase)
+
+  # Adds seconds to the time of phase
+  def addSeconds(self, phase, seconds):
+    self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds
+
+  # Adds the cells computed for a table
+  def addCells(self, table, cells):
+    self.cells[table] = self.cells.get(table, 0) + cells
+
+  # Records the tables of one diff, a dict from the name of a table to
+  # its number of entries, which are all held at once
+  def addTables(self, entriesByTable):
+    for table, entries in entriesByTable.items():
+      self.tableEntries[table] = max(self.tableEntries.get(table, 0),
+                                     entries)
+    self.peakTableEntries = max(self.peakTableEntries,
+                                sum(entriesByTable.values()))
+
+  # Records the mappings held by the tables of one diff
+  def addMappingTables(self, *tables):
+    if self.measureMappings:
+      self.peakMappingBytes = max(self.peakMappingBytes,
+                                  mappingBytes(*tables))
+
+  # Returns the fraction of the cached diffs found in the cache, None
+  # before any
+  def cacheHitRate(self):
+    lookups = self.cacheHits + self.cacheMisses
+    if lookups == 0:
+      return None
+    return float(self.cacheHits) / lookups
+
+  # Returns the statistics as a dict of numbers, dicts and None
+  def asDict(self):
+    return {
+        'diffs': self.diffs,
+        'seconds': dict(self.seconds),
+        'totalSeconds': sum(self.seconds.values()),
+        'cells': dict(self.cells),
+        'totalCells': sum(self.cells.values()),
+        'tableEntries': dict(self.tableEntries),
+        'peakTableEntries': self.peakTableEntries,
+        'peakMappingBytes': self.peakMappingBytes,
+        'cacheHits': self.cacheHits,
+        'cacheMisses': self.cacheMisses,
+        'cacheHitRate': self.cacheHitRate(),
+    }
+
+
+class _PhaseTimer(object):
+  def __init__(self, stats, phase):
+    self.stats = stats
+    self.phase = phase
+    self.started = None
+
+  def __enter__(self):
+    self.started = time.time()
+    return self
+
+  def __exit__(self, *exception):
+    self.stats.addSeconds(self.phase, time.time() - self.started)
+    return False
+
+
+# Returns the bytes of the distinct mappings in the given tables, which
+# are kept like treediff.flattenMapping describes, and of the pairs in
+# them. The tables share mappings and pairs between their entries, each
+# is only counted once.
+def mappingBytes(*tables):
+  seen = set()
+  total = 0
+  for table in tables:
+    pending = list(table)
+    while pending:
+      mapping = pending.pop()
+      if mapping is None or id(mapping) in seen:
+        continue
+      seen.add(id(mapping))
+      total += sys.getsizeof(mapping)
+      if len(mapping) == 3:
+        pending.append(mapping[0])
+        pending.append(mapping[1])
+      else:
+        pending.append(mapping[1])
+        if id(mapping[0]) not in seen:
+          seen.add(id(mapping[0]))
+          total += sys.getsizeof(mapping[0])
+  return total
@@ -0,0 +1,114 @@
+# Builds trees from JSON documents.
+#
+# Every JSON value is a node: an object is a '{}' node with a child per
+# member, labeled with the key of the member and having the value as its
+# only child, an array is a '[]' node with a child per element and any
+# other value is a leaf labeled with the value. So {"a": [1, 2]} is
+#
+#   {} - a - [] - 1
+#                \ 2
+#
+# With the ijson package installed, documents are parsed incrementally
+# and never held in memory as Python objects. Without it, each document
+# is loaded with the json module first.
+
+import decimal
+import json
+from StringIO import StringIO
+
+try:
+  import ijson
+except ImportError:
+  ijson = None
+
+from util.tree_builder import TreeBuilder
+
+OBJECT = '{}'
+ARRAY = '[]'
+
+# The members of an object loaded by the json module, in document order
+class _Object(list):
+  pass
+
+# Returns the tree of the JSON document in source (a str or a file)
+def buildTreeFromJson(source):
+  builder = TreeBuilder()
+  if ijson is not None:
+    if isinstance(source, basestring):
+      source = StringIO(source)
+    _buildEvents(ijson.parse(source), builder)
+  elif isinstance(source, basestring):
+    _buildValue(json.loads(source, object_pairs_hook=_Object), builder)
+  else:
+    _buildValue(json.load(source, object_pairs_hook=_Object), builder)
+  return builder.tree()
+
+# Yields the trees of the JSON documents of a JSON Lines input (an
+# iterable of lines such as a file), one at a time. Blank lines are
+# skipped.
+def iterTreesFromJsonLines(lines):
+  builder = TreeBuilder()
+  for line in lines:
+    if line.strip():
+      _buildValue(json.loads(line, object_pairs_hook=_Object), builder)
+      yield builder.tree()
+
+# Walks a value loaded by the json module
+def _buildValue(value, builder):
+  # What is left to do, last first: ('value', v) to walk a value,
+  # ('key', k) to start a member and ('end', None) to end a node
+  pending = [('value', value)]
+  while pending:
+    kind, value = pending.pop()
+    if kind == 'end':
+      builder.end()
+    elif kind == 'key':
+      builder.start(value)
+    elif isinstance(value, _Object):
+      builder.start(OBJECT)
+      pending.append(('end', None))
+      for key, member in reversed(value):
+        pending.append(('end', None))
+        pending.append(('value', member))
+        pending.append(('key', key))
+    elif isinstance(value, list):
+      builder.start(ARRAY)
+      pending.append(('end', None))
+      pending.extend(('value', element) for element in reversed(value))
+    else:
+      builder.leaf(value)
+
+# Walks the events of ijson.parse
+def _buildEvents(events, builder):
+  # For every object or array being read, whether it is an object with a
+  # member being read
+  inMember = []
+  for _, event, value in events:
+    if event == 'map_key':
+      if inMember[-1]:
+        builder.end()
+      builder.start(value)
+      inMember[-1] = True
+      continue
+    if event == 'start_map':
+      builder.start(OBJECT)
+      inMember.append(False)
+      continue
+    if event == 'start_array':
+      builder.start(ARRAY)
+      inMember.append(False)
+      continue
+    if event in ('end_map', 'end_array'):
+      if inMember.pop():
+        builder.end()
+      builder.end()
+    else:
+      builder.leaf(_number(value) if event == 'number' else value)
+
+# Returns the number the json module gives for an ijson number: ijson
+# returns the integers as int (or long) and the other numbers, e.g. 2.5
+# or 1e5, as Decimal, which json.loads returns as float
+def _number(value):
+  if isinstance(value, decimal.Decimal):
+    return float(value)
+  return value
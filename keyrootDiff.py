@@ -0,0 +1,192 @@
+# This file has the implementation of the algorithm described in
+# "Simple Fast Algorithms for the Editing Distance between Trees and
+# Related Problems" by Kaizhong Zhang and Dennis Shasha published at
+# the SIAM Journal on Computing, 18(6):1245-1262, December 1989.
+#
+# The trees are numbered in postorder and the distances are computed
+# for the keyroots only (the root and every node having a left
+# sibling), so the running time is O(V * V' * min(L, F) * min(L', F'))
+# where F, F' are the number of leaves instead of the O(L^2 * L'^2)
+# factor of the algorithm in treediff.
+#
+# The 'apted' flavour follows the idea of the path strategies in
+# "Tree Edit Distance: Robust and Memory-Efficient" by Mateusz Pawlik
+# and Nikolaus Augsten (Information Systems 56, 2016) restricted to
+# the two strategies that keyroots support: decomposing along the
+# leftmost paths or along the rightmost paths (Zhang-Shasha on the
+# mirrored trees). It picks the one with fewer subproblems per pair.
+#
+# Both return the same (distance, mapping) result as
+# treediff.computeDiff: the roots of the trees are mapped to each
+# other and the mapping uses the preorder positions and ALPHA.
+
+from costModel import UNIT_COSTS
+from treediff import ALPHA
+
+
+# Postorder numbering of a tree. Mirrored trees visit the children from
+# right to left, which makes the leftmost leaves the rightmost ones.
+class _PostorderView(object):
+  def __init__(self, tree, mirrored):
+    self.size = tree.size()
+    # nodes[k] is the node at postorder index k (1 based)
+    self.nodes = [None] * (self.size + 1)
+    # leftmost[k] is the postorder index of the leftmost leaf under k
+    self.leftmost = [0] * (self.size + 1)
+
+    index = 0
+    root = tree.node_at(1)
+    stack = [[root, self._children(root, mirrored), None]]
+    while stack:
+      top = stack[-1]
+      child = next(top[1], None)
+      if child is not None:
+        stack.append([child, self._children(child, mirrored), None])
+        continue
+      stack.pop()
+      index += 1
+      self.nodes[index] = top[0]
+      self.leftmost[index] = index if top[2] is None else top[2]
+      if stack and stack[-1][2] is None:
+        stack[-1][2] = self.leftmost[index]
+
+    highestWithLeftmost = {}
+    for k in range(1, self.size + 1):
+      highestWithLeftmost[self.leftmost[k]] = k
+    self.keyroots = sorted(highestWithLeftmost.values())
+
+  @staticmethod
+  def _children(node, mirrored):
+    children = list(node.children())
+    if mirrored:
+      children.reverse()
+    return iter(children)
+
+  # Returns the number of subproblems the keyroots of this tree create
+  def keyrootSubproblems(self):
+    return sum(k - self.leftmost[k] + 1 for k in self.keyroots)
+
+  # Returns the preorder position of the node at postorder index k
+  def position(self, k):
+    return self.nodes[k].preorder_position()
+
+# Returns the forest distances between the subtrees rooted at i and j as
+# a table where entry [x - l(i) + 1][y - l(j) + 1] is the distance
+# between the forests l(i)..x and l(j)..y. The tree distances of the
+# pairs on the leftmost paths of i and j are stored in treeDistance.
+def _forestDistance(source, target, costs, i, j, treeDistance):
+  row = target.size + 1
+  deleteCosts = costs.deleteCosts
+  insertCosts = costs.insertCosts
+  li = source.leftmost[i]
+  lj = target.leftmost[j]
+  rows = i - li + 2
+  columns = j - lj + 2
+  fd = [[0] * columns for _ in range(rows)]
+  for x in range(1, rows):
+    fd[x][0] = fd[x - 1][0] + deleteCosts[source.position(li + x - 1)]
+  for y in range(1, columns):
+    fd[0][y] = fd[0][y - 1] + insertCosts[target.position(lj + y - 1)]
+
+  for x in range(1, rows):
+    sx = li + x - 1
+    sourcePosition = source.position(sx)
+    lx = source.leftmost[sx]
+    deleteCost = deleteCosts[sourcePosition]
+    relabelCosts = costs.relabelCosts[sourcePosition]
+    for y in range(1, columns):
+      ty = lj + y - 1
+      targetPosition = target.position(ty)
+      ly = target.leftmost[ty]
+      option1 = fd[x - 1][y] + deleteCost
+      option2 = fd[x][y - 1] + insertCosts[targetPosition]
+      if lx == li and ly == lj:
+        fd[x][y] = min(
+            option1, option2, fd[x - 1][y - 1] + relabelCosts[targetPosition])
+        treeDistance[sx * row + ty] = fd[x][y]
+      else:
+        fd[x][y] = min(
+            option1, option2,
+            fd[lx - li][ly - lj] + treeDistance[sx * row + ty])
+  return fd
+
+# Walks back the forest distance table fd of the subtrees rooted at i
+# and j from the forests ending at x and y. Pairs of subtrees whose
+# mapping needs their own table are added to pending.
+def _backtrack(source, target, costs, i, j, fd, x, y, mapping, pending):
+  li = source.leftmost[i]
+  lj = target.leftmost[j]
+  while x >= li or y >= lj:
+    fx = x - li + 1
+    fy = y - lj + 1
+    if fx > 0 and fd[fx][fy] == (
+        fd[fx - 1][fy] + costs.deleteCosts[source.position(x)]):
+      mapping.append((source.position(x), ALPHA))
+      x -= 1
+    elif fy > 0 and fd[fx][fy] == (
+        fd[fx][fy - 1] + costs.insertCosts[target.position(y)]):
+      mapping.append((ALPHA, target.position(y)))
+      y -= 1
+    elif source.leftmost[x] == li and target.leftmost[y] == lj:
+      mapping.append((source.position(x), target.position(y)))
+      x -= 1
+      y -= 1
+    else:
+      pending.append((x, y))
+      x = source.leftmost[x] - 1
+      y = target.leftmost[y] - 1
+
+def _diffViews(source, target, costs):
+  treeDistance = [0] * ((source.size + 1) * (target.size + 1))
+  for i in source.keyroots:
+    for j in target.keyroots:
+      fd = _forestDistance(source, target, costs, i, j, treeDistance)
+
+  # The roots are the last keyroots, so fd is the table of the whole
+  # trees. The roots are mapped to each other like in treediff.
+  n = source.size
+  m = target.size
+  distance = fd[n - 1][m - 1] + costs.relabelCosts[1][1]
+  mapping = [(source.position(n), target.position(m))]
+  pending = []
+  _backtrack(source, target, costs, n, m, fd, n - 1, m - 1, mapping, pending)
+  while pending:
+    i, j = pending.pop()
+    fd = _forestDistance(source, target, costs, i, j, treeDistance)
+    _backtrack(source, target, costs, i, j, fd, i, j, mapping, pending)
+  mapping.sort()
+  return (distance, mapping)
+
+# Returns the distance between the given trees and the mapping using
+# the leftmost path decomposition of Zhang and Shasha.
+#
+# @parameter sourceTree the source tree (Tree)
+# @parameter targetTree the target tree (Tree)
+# @parameter costs the costs of the edit operations (costModel.EditCosts),
+#        unit costs if None
+# @returns (int, [(int, int)]) like treediff.computeDiff
+def computeZhangShashaDiff(sourceTree, targetTree, costs=None):
+  if costs is None:
+    costs = UNIT_COSTS.editCosts(sourceTree, targetTree)
+  return _diffViews(_PostorderView(sourceTree, False),
+                    _PostorderView(targetTree, False), costs)
+
+# Returns the distance between the given trees and the mapping using
+# the leftmost or the rightmost path decomposition, whichever creates
+# fewer subproblems for the given pair of trees.
+#
+# @parameter sourceTree the source tree (Tree)
+# @parameter targetTree the target tree (Tree)
+# @parameter costs the costs of the edit operations (costModel.EditCosts),
+#        unit costs if None
+# @returns (int, [(int, int)]) like treediff.computeDiff
+def computeAptedDiff(sourceTree, targetTree, costs=None):
+  if costs is None:
+    costs = UNIT_COSTS.editCosts(sourceTree, targetTree)
+  left = (_PostorderView(sourceTree, False), _PostorderView(targetTree, False))
+  right = (_PostorderView(sourceTree, True), _PostorderView(targetTree, True))
+  leftCost = left[0].keyrootSubproblems() * left[1].keyrootSubproblems()
+  rightCost = right[0].keyrootSubproblems() * right[1].keyrootSubproblems()
+  if rightCost < leftCost:
+    return _diffViews(right[0], right[1], costs)
+  return _diffViews(left[0], left[1], costs)
@@ -0,0 +1,140 @@
+# Distance matrices of many trees computed on several processes.
+#
+# The trees are turned into CompactTrees and handed to every worker
+# process once, when the pool starts, so the tasks only carry the indices
+# of the pairs. Only the pairs above the diagonal are computed since the
+# distance of a pair does not depend on the order of the trees (for a
+# symmetric cost model). The pairs are scheduled in chunks, the most
+# expensive ones first, and the results are written into the matrix as
+# the chunks come back in whatever order they finish.
+
+import multiprocessing
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+from treediff import ALGORITHMS
+from treediff import UNORDERED
+from treediff import computeDiff
+from treediff import computeDistance
+from util.compact_tree import CompactTree
+
+# The trees and the options of the worker process, set by _initWorker
+_worker = {}
+
+def _initWorker(trees, algorithm, costModel, maxDistance):
+  _worker['trees'] = trees
+  _worker['algorithm'] = algorithm
+  _worker['costModel'] = costModel
+  _worker['maxDistance'] = maxDistance
+
+# Returns [(i, j, distance)] for the given pairs of tree indices
+def _distanceChunk(pairs):
+  trees = _worker['trees']
+  algorithm = _worker['algorithm']
+  costModel = _worker['costModel']
+  maxDistance = _worker['maxDistance']
+  results = []
+  for i, j in pairs:
+    if algorithm == 'tai':
+      # The mappings are not needed, which saves most of the memory
+      distance = computeDistance(
+          trees[i], trees[j], costModel=costModel, maxDistance=maxDistance)
+    else:
+      distance = computeDiff(
+          trees[i], trees[j], algorithm, costModel, maxDistance)[0]
+    results.append((i, j, distance))
+  return results
+
+# Yields the pairs above the diagonal in chunks of chunkSize pairs. The
+# trees are taken from the largest to the smallest one, each paired with
+# the smaller ones, so the expensive pairs come first and only one chunk
+# of pairs exists at a time.
+def _chunks(trees, chunkSize):
+  order = sorted(range(len(trees)), key=lambda i: trees[i].size(),
+                 reverse=True)
+  chunk = []
+  for k, i in enumerate(order):
+    for j in order[k + 1:]:
+      chunk.append((i, j))
+      if len(chunk) == chunkSize:
+        yield chunk
+        chunk = []
+  if chunk:
+    yield chunk
+
+# Returns the matrix the distances are written to: a NumPy array, a
+# NumPy memory mapped file if output is a file name, or a list of lists
+# when NumPy is not installed.
+def _newMatrix(count, output):
+  if numpy is None:
+    if output is not None:
+      raise ValueError('Writing to a file needs NumPy', output)
+    return [[0] * count for _ in range(count)]
+  if output is None:
+    return numpy.zeros((count, count))
+  matrix = numpy.memmap(output, dtype='float64', mode='w+',
+                        shape=(count, count))
+  matrix[:] = 0
+  return matrix
+
+# Returns the distances between all pairs of the given trees. Entry
+# [i][j] of the result is computeDiff(trees[i], trees[j])[0], INFINITE
+# for the pairs farther than maxDistance.
+#
+# @parameter trees the trees (list of Tree or CompactTree)
+# @parameter workers the number of processes, one per CPU if None. With
+#        1 the distances are computed in the calling process.
+# @parameter algorithm one of treediff.ALGORITHMS or treediff.UNORDERED
+#        (str)
+# @parameter costModel the costs of the edit operations
+#        (costModel.CostModel), the unit costs if None. It must be
+#        symmetric and picklable.
+# @parameter maxDistance the largest distance of interest (see computeDiff)
+# @parameter chunkSize the number of pairs sent to a worker at a time
+# @parameter progress called as progress(done, total) with the number of
+#        pairs done after every chunk
+# @parameter output the name of a file the matrix is memory mapped to
+#        (needs NumPy), the matrix is kept in memory if None
+# @returns numpy array (numpy.memmap with output), or a list of lists
+#        without NumPy
+def pairwiseDistances(trees, workers=None, algorithm='tai', costModel=None,
+                      maxDistance=None, chunkSize=16, progress=None,
+                      output=None):
+  if algorithm not in ALGORITHMS and algorithm != UNORDERED:
+    raise ValueError('Unknown algorithm', algorithm)
+  if chunkSize < 1:
+    raise ValueError('Chunk size must be positive', chunkSize)
+  trees = [tree if isinstance(tree, CompactTree)
+           else CompactTree.from_tree(tree) for tree in trees]
+  matrix = _newMatrix(len(trees), output)
+  chunks = _chunks(trees, chunkSize)
+  total = len(trees) * (len(trees) - 1) // 2
+  options = (trees, algorithm, costModel, maxDistance)
+
+  if workers == 1:
+    _initWorker(*options)
+    results = (_distanceChunk(chunk) for chunk in chunks)
+    pool = None
+  else:
+    pool = multiprocessing.Pool(workers, _initWorker, options)
+    results = pool.imap_unordered(_distanceChunk, chunks)
+  try:
+    done = 0
+    for chunk in results:
+      for i, j, distance in chunk:
+        matrix[i][j] = distance
+        matrix[j][i] = distance
+      done += len(chunk)
+      if progress is not None:
+        progress(done, total)
+  finally:
+    if pool is not None:
+      pool.terminate()
+      pool.join()
+    _worker.clear()
+  if output is not None:
+    matrix.flush()
+  return matrix
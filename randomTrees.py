@@ -0,0 +1,14 @@
+# Random trees for the unit tests which cross-check the algorithms.
+from util.tree import *
+
+# Returns a random tree (Tree) of size nodes with labels chosen from
+# labels, every node added as the last child of a random earlier node
+def randomTree(generator, size, labels):
+  nodes = [TreeNode(generator.choice(labels))]
+  for _ in range(size - 1):
+    node = TreeNode(generator.choice(labels))
+    generator.choice(nodes).add_child(node)
+    nodes.append(node)
+  tree = Tree(nodes[0])
+  tree.build_caches()
+  return tree
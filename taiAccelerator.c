@@ -0,0 +1,256 @@
+/*
+ * The E, MIN_M and D phases of treediff in C, for the compiled
+ * accelerator built by buildAccelerator.py.
+ *
+ * Every function does what the phase of the same name in treediff does
+ * under KEEP_NOTHING (choices is NULL) or KEEP_CHOICES, in the same
+ * order and with the same ties, so the tables and the choices are the
+ * same. The costs are doubles, like the Python floats.
+ *
+ * The trees are given as the arrays of treediff._TreeIndex, indexed by
+ * preorder position: depth, father, pairOffset and ancestors, where the
+ * ancestor of node i at depth d is ancestors[i * ancestorsWidth + d].
+ * relabel[i * (targetSize + 1) + j] is the cost of changing source node
+ * i into target node j. The band is the one of treediff._Band.
+ */
+
+#include <math.h>
+#include <stddef.h>
+
+struct tai_tree {
+    long size;
+    const long *depth;
+    const long *father;
+    const long *pairOffset;
+    const long *ancestors;
+    long ancestorsWidth;
+};
+
+struct tai_band {
+    long targetSize;
+    long lowest;
+    long highest;
+    long sizeDifference;
+    double cheapest;
+    double limit;
+};
+
+#define TAI_FROM_LEFT_CHILD_CHAIN 1
+#define TAI_FROM_RIGHT_CHILD_CHAIN 2
+#define TAI_FROM_SPLIT 3
+#define TAI_FROM_INSERT 1
+#define TAI_FROM_DELETE 2
+#define TAI_FROM_MIN_M 3
+
+static long tai_chain(const struct tai_tree *tree, long i, long depthOfS,
+                      long depthOfU)
+{
+    return tree->pairOffset[i] + depthOfU * (depthOfU + 1) / 2 + depthOfS;
+}
+
+static long tai_ancestor(const struct tai_tree *tree, long i, long depth)
+{
+    return tree->ancestors[i * tree->ancestorsWidth + depth];
+}
+
+static long tai_first(const struct tai_band *band, long i)
+{
+    long j = i + band->lowest;
+    return j > 1 ? j : 1;
+}
+
+static long tai_last(const struct tai_band *band, long i)
+{
+    long j = i + band->highest;
+    return j < band->targetSize ? j : band->targetSize;
+}
+
+static double tai_rest(const struct tai_band *band, long i, long j)
+{
+    long difference = band->sizeDifference - (j - i);
+    return band->cheapest * (double)(difference < 0 ? -difference
+                                                    : difference);
+}
+
+/* min(a, b) the way Python picks it: a unless b is smaller */
+static double tai_min(double a, double b)
+{
+    return b < a ? b : a;
+}
+
+void tai_compute_e(const struct tai_tree *source,
+                   const struct tai_tree *target,
+                   const double *deleteCosts, const double *insertCosts,
+                   const double *relabel, const struct tai_band *band,
+                   double *E, unsigned char *choices)
+{
+    long width = target->pairOffset[target->size + 1];
+    long row = target->size + 1;
+    long entries = source->pairOffset[source->size + 1] * width;
+    long i, j, ds, du, dt, dv, k;
+
+    for (k = 0; k < entries; k++)
+        E[k] = HUGE_VAL;
+    for (i = 1; i <= source->size; i++) {
+        long depthOfI = source->depth[i];
+        long last = tai_last(band, i);
+        for (j = tai_first(band, i); j <= last; j++) {
+            long depthOfJ = target->depth[j];
+            for (du = depthOfI; du >= 0; du--) {
+                for (ds = du; ds >= 0; ds--) {
+                    long sourceChain = tai_chain(source, i, ds, du) * width;
+                    for (dv = depthOfJ; dv >= 0; dv--) {
+                        for (dt = dv; dt >= 0; dt--) {
+                            long key = sourceChain +
+                                       tai_chain(target, j, dt, dv);
+                            if ((ds == du && du == depthOfI) &&
+                                (dt == dv && dv == depthOfJ)) {
+                                E[key] = relabel[i * row + j];
+                            } else if ((ds == du && du == depthOfI) ||
+                                       (dt < dv && dv == depthOfJ)) {
+                                long dependentKey = sourceChain +
+                                    tai_chain(target, j - 1, dt,
+                                              depthOfJ - 1);
+                                E[key] = E[dependentKey] + insertCosts[j];
+                            } else if ((ds < du && du == depthOfI) ||
+                                       (dt == dv && dv == depthOfJ)) {
+                                long dependentKey =
+                                    tai_chain(source, i - 1, ds,
+                                              depthOfI - 1) * width +
+                                    tai_chain(target, j, dt, dv);
+                                E[key] = E[dependentKey] + deleteCosts[i];
+                            } else {
+                                long x = tai_ancestor(source, i, du + 1);
+                                long y = tai_ancestor(target, j, dv + 1);
+                                long key1 =
+                                    tai_chain(source, i, ds, du + 1) * width +
+                                    tai_chain(target, j, dt, dv);
+                                long key2 = sourceChain +
+                                    tai_chain(target, j, dt, dv + 1);
+                                long key3 =
+                                    tai_chain(source, x - 1, ds, du) * width +
+                                    tai_chain(target, y - 1, dt, dv);
+                                long key4 =
+                                    tai_chain(source, i, du + 1, du + 1) *
+                                        width +
+                                    tai_chain(target, j, dv + 1, dv + 1);
+                                double best = tai_min(
+                                    tai_min(E[key1], E[key2]),
+                                    E[key3] + E[key4]);
+                                E[key] = best;
+                                if (choices != NULL) {
+                                    if (best == E[key1])
+                                        choices[key] =
+                                            TAI_FROM_LEFT_CHILD_CHAIN;
+                                    else if (best == E[key2])
+                                        choices[key] =
+                                            TAI_FROM_RIGHT_CHILD_CHAIN;
+                                    else
+                                        choices[key] = TAI_FROM_SPLIT;
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    }
+}
+
+void tai_compute_min_m(const struct tai_tree *source,
+                       const struct tai_tree *target,
+                       const double *deleteCosts, const double *insertCosts,
+                       const double *relabel, const struct tai_band *band,
+                       const double *E, double *MIN_M, long *choices)
+{
+    long width = target->pairOffset[target->size + 1];
+    long row = target->size + 1;
+    long entries = (source->size + 1) * row;
+    long i, j, k;
+
+    for (k = 0; k < entries; k++)
+        MIN_M[k] = HUGE_VAL;
+    MIN_M[row + 1] = relabel[row + 1];
+    for (j = 2; j < target->size; j++)
+        MIN_M[row + j] = MIN_M[row + j - 1] + insertCosts[j];
+    for (i = 2; i < source->size; i++)
+        MIN_M[i * row + 1] = MIN_M[(i - 1) * row + 1] + deleteCosts[i];
+
+    for (i = 2; i <= source->size; i++) {
+        long f_i = source->father[i];
+        long depthOfF_i = source->depth[f_i];
+        long first = tai_first(band, i);
+        long last = tai_last(band, i);
+        if (first < 2)
+            first = 2;
+        for (j = first; j <= last; j++) {
+            long key = i * row + j;
+            long f_j = target->father[j];
+            long depthOfF_j = target->depth[f_j];
+            long ds, dt;
+            for (ds = depthOfF_i; ds >= 0; ds--) {
+                long s = tai_ancestor(source, f_i, ds);
+                long sourceChain =
+                    tai_chain(source, i - 1, ds, depthOfF_i) * width;
+                for (dt = depthOfF_j; dt >= 0; dt--) {
+                    long t = tai_ancestor(target, f_j, dt);
+                    long keyForE = sourceChain +
+                        tai_chain(target, j - 1, dt, depthOfF_j);
+                    long keyForM = s * row + t;
+                    double temp = MIN_M[keyForM] + E[keyForE] -
+                                  relabel[s * row + t];
+                    MIN_M[key] = tai_min(temp, MIN_M[key]);
+                    if (temp == MIN_M[key] && temp <= band->limit &&
+                        choices != NULL)
+                        choices[key] = keyForM;
+                }
+            }
+            MIN_M[key] = MIN_M[key] + relabel[key];
+            if (MIN_M[key] + tai_rest(band, i, j) > band->limit)
+                MIN_M[key] = HUGE_VAL;
+        }
+    }
+}
+
+void tai_compute_d(const struct tai_tree *source,
+                   const struct tai_tree *target,
+                   const double *deleteCosts, const double *insertCosts,
+                   const double *relabel, const struct tai_band *band,
+                   const double *MIN_M, double *D, unsigned char *choices)
+{
+    long row = target->size + 1;
+    long entries = (source->size + 1) * row;
+    long i, j, k;
+
+    for (k = 0; k < entries; k++)
+        D[k] = HUGE_VAL;
+    D[row + 1] = relabel[row + 1];
+    for (i = 2; i <= source->size; i++)
+        D[i * row + 1] = D[(i - 1) * row + 1] + deleteCosts[i];
+    for (j = 2; j <= target->size; j++)
+        D[row + j] = D[row + j - 1] + insertCosts[j];
+
+    for (i = 2; i <= source->size; i++) {
+        long first = tai_first(band, i);
+        long last = tai_last(band, i);
+        if (first < 2)
+            first = 2;
+        for (j = first; j <= last; j++) {
+            long key = i * row + j;
+            double option1 = D[key - 1] + insertCosts[j];
+            double option2 = D[key - row] + deleteCosts[i];
+            double option3 = MIN_M[key];
+            D[key] = tai_min(tai_min(option1, option2), option3);
+            if (D[key] + tai_rest(band, i, j) > band->limit) {
+                D[key] = HUGE_VAL;
+            } else if (choices != NULL) {
+                if (D[key] == option1)
+                    choices[key] = TAI_FROM_INSERT;
+                else if (D[key] == option2)
+                    choices[key] = TAI_FROM_DELETE;
+                else
+                    choices[key] = TAI_FROM_MIN_M;
+            }
+        }
+    }
+}
@@ -0,0 +1,117 @@
+# File containing unit tests for the compiled phases of taiAccelerator.c,
+# which are checked against the Python loops of treediff. They are
+# skipped unless the accelerator is built ("python buildAccelerator.py").
+# Run the test by executing "python test_accelerator.py -v" at the
+# command line.
+import random
+import unittest
+import weakref
+import treediff
+from util.tree import *
+from treediff import *
+from costModel import UNIT_COSTS
+from costModel import WeightedCostModel
+from diffSession import DiffSession
+from diffSession import TARGET
+from randomTrees import randomTree
+
+# Returns the result of the call with the Python loops of treediff
+def inPython(function, *arguments, **options):
+  accelerator = treediff._accelerator
+  treediff._accelerator = None
+  try:
+    return function(*arguments, **options)
+  finally:
+    treediff._accelerator = accelerator
+
+def phases(source, target, keep, costs, limit):
+  E, choicesForE = computeE(source, target, keep, costs, limit)
+  MIN_M, choicesForMinM = computeMIN_M(
+      E, choicesForE, source, target, keep, costs, limit)
+  D, choicesForD = computeD(
+      source, target, MIN_M, choicesForMinM, keep, costs, limit)
+  return E, choicesForE, MIN_M, choicesForMinM, D, choicesForD
+
+def randomCostModel(generator):
+  return generator.choice([
+      None,
+      WeightedCostModel(insert=generator.randint(1, 3),
+                        delete=generator.randint(1, 3),
+                        relabel=generator.choice([1, 2, 0.5])),
+      WeightedCostModel(insert=0.3, delete=0.7, relabel=0.1)])
+
+@unittest.skipIf(treediff._accelerator is None, 'needs the accelerator')
+class TestAccelerator(unittest.TestCase):
+  def test_phases(self):
+    generator = random.Random(1)
+    for _ in range(150):
+      source = randomTree(generator, generator.randint(1, 12), 'ABC')
+      target = randomTree(generator, generator.randint(1, 12), 'ABC')
+      costs = (randomCostModel(generator) or UNIT_COSTS).editCosts(
+          source, target)
+      limit = generator.choice([INFINITE, 2, 5, 2.5])
+      for keep in (KEEP_CHOICES, KEEP_NOTHING):
+        self.assertEqual(
+            inPython(phases, source, target, keep, costs, limit),
+            phases(source, target, keep, costs, limit))
+
+  def test_diff(self):
+    generator = random.Random(2)
+    for _ in range(150):
+      source = randomTree(generator, generator.randint(1, 12), 'ABC')
+      target = randomTree(generator, generator.randint(1, 12), 'ABC')
+      costModel = randomCostModel(generator)
+      maxDistance = generator.choice([None, 2, 5])
+      for function, options in ((computeDiff, {}),
+                                (computeDistance, {}),
+                                (computeDistance, {'traceback': True})):
+        expected = inPython(function, source, target, costModel=costModel,
+                            maxDistance=maxDistance, **options)
+        result = function(source, target, costModel=costModel,
+                          maxDistance=maxDistance, **options)
+        self.assertEqual(expected, result)
+        # Whole numbers stay whole numbers
+        self.assertEqual(repr(expected), repr(result))
+
+  def test_session(self):
+    generator = random.Random(3)
+    source = randomTree(generator, 10, 'ABC')
+    target = randomTree(generator, 10, 'ABC')
+    session = DiffSession(source, target)
+    expected = computeDistance(source, target, True)
+    self.assertEqual(repr(expected), repr(session.diff()))
+    session.relabelNode(TARGET, 10, 'D')
+    self.assertEqual(computeDistance(source, target, True), session.diff())
+
+  def test_fallback(self):
+    source = Tree(TreeNode('A'))
+    source.build_caches()
+    target = Tree(TreeNode('B'))
+    target.build_caches()
+    costs = UNIT_COSTS.editCosts(source, target)
+    self.assertTrue(treediff._compiledCosts(
+        costs, KEEP_CHOICES, INFINITE, None) is not None)
+    self.assertTrue(treediff._compiledCosts(
+        costs, KEEP_MAPPINGS, INFINITE, None) is None)
+    # Sums of these costs may not fit the bits of a double
+    costModel = WeightedCostModel(relabel=2 ** 60)
+    costs = costModel.editCosts(source, target)
+    self.assertTrue(treediff._compiledCosts(
+        costs, KEEP_CHOICES, INFINITE, None) is None)
+    self.assertEqual((2 ** 60, [(1, 1)]),
+                     computeDiff(source, target, costModel=costModel))
+
+  def test_costs_released(self):
+    source = Tree(TreeNode('A'))
+    source.build_caches()
+    target = Tree(TreeNode('B'))
+    target.build_caches()
+    costs = UNIT_COSTS.editCosts(source, target)
+    holder = weakref.ref(costs)
+    E, choicesForE = computeE(source, target, KEEP_CHOICES, costs)
+    self.assertTrue(E is not None)
+    del costs
+    self.assertTrue(holder() is None)
+
+if __name__ == '__main__':
+    unittest.main()
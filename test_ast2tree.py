@@ -0,0 +1,27 @@
+# File containing unit tests for building trees from Python code.
+# Run the test by executing "python test_ast2tree.py -v" at the
+# command line.
+import unittest
+from ast2tree import buildTreeFromPython
+from treediff import computeDiff
+
+def shape(tree):
+  return [(tree.node_at(position).label(), tree.father_position_of(position))
+          for position in range(1, tree.size() + 1)]
+
+class TestAst2Tree(unittest.TestCase):
+  def test_module(self):
+    tree = buildTreeFromPython('def f(x):\n  return x + 1 < 2\n')
+    self.assertEqual(
+        [('Module()', 0), ('FunctionDef(f)', 1), ('arguments()', 2),
+         ('Name(x)', 3), ('Return()', 2), ('Compare(Lt)', 5),
+         ('BinOp(Add)', 6), ('Name(x)', 7), ('Num(1)', 7), ('Num(2)', 6)],
+        shape(tree))
+
+  def test_diff(self):
+    source = buildTreeFromPython('x = f(1)\ny = 2\n')
+    target = buildTreeFromPython('x = f(3)\ny = 2\n')
+    self.assertEqual(1, computeDiff(source, target)[0])
+
+if __name__ == '__main__':
+  unittest.main()
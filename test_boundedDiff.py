@@ -0,0 +1,72 @@
+# File containing unit tests for the memory-bounded evaluation of the
+# tables which is checked against computeDistance.
+# Run the test by executing "python test_boundedDiff.py -v" at the
+# command line.
+import random
+import unittest
+from treediff import *
+from boundedDiff import computeBoundedDistance
+from boundedDiff import peakEntries
+from costModel import WeightedCostModel
+from diffStats import DiffStats
+from randomTrees import randomTree
+
+class TestBoundedDiff(unittest.TestCase):
+  def test_random_trees(self):
+    generator = random.Random(2)
+    for index in range(150):
+      source = randomTree(generator, generator.randint(1, 10), 'ABC')
+      target = randomTree(generator, generator.randint(1, 10), 'ABC')
+      costModel = None
+      if index % 2:
+        costModel = WeightedCostModel(
+            insert=generator.randint(1, 3), delete=generator.randint(1, 3),
+            relabel=generator.randint(1, 4))
+      self.assertEqual(
+          computeDistance(source, target, True, costModel),
+          computeBoundedDistance(source, target, True, costModel))
+      self.assertEqual(
+          computeDistance(source, target, False, costModel),
+          computeBoundedDistance(source, target, False, costModel))
+
+  def test_maxDistance(self):
+    generator = random.Random(4)
+    for _ in range(100):
+      source = randomTree(generator, generator.randint(1, 10), 'ABC')
+      target = randomTree(generator, generator.randint(1, 10), 'ABC')
+      maxDistance = generator.choice([0, 2, 4, 2.5])
+      for traceback in (False, True):
+        self.assertEqual(
+            computeDistance(source, target, traceback,
+                            maxDistance=maxDistance),
+            computeBoundedDistance(source, target, traceback,
+                                   maxDistance=maxDistance))
+    # Only the band of the limit is computed
+    source = randomTree(generator, 20, 'AB')
+    target = randomTree(generator, 20, 'AB')
+    stats = DiffStats()
+    computeBoundedDistance(source, target, maxDistance=6, stats=stats)
+    unlimited = DiffStats()
+    computeBoundedDistance(source, target, stats=unlimited)
+    self.assertTrue(0 < stats.cells['E'] < unlimited.cells['E'])
+
+  def test_peak(self):
+    generator = random.Random(3)
+    source = randomTree(generator, 30, 'A')
+    target = randomTree(generator, 30, 'B')
+    E, _ = computeE(source, target, KEEP_NOTHING)
+    peak = peakEntries(source, target)
+    self.assertEqual(2 * 31, peak['D'])
+    self.assertTrue(sum(peak.values()) < len(E) / 2)
+
+    stats = DiffStats()
+    distance = computeBoundedDistance(source, target, stats=stats,
+                                      maxEntries=sum(peak.values()))
+    self.assertEqual(computeDistance(source, target), distance)
+    self.assertEqual(peak, stats.tableEntries)
+    self.assertEqual(len(E), stats.cells['E'])
+    self.assertRaises(MemoryError, computeBoundedDistance, source, target,
+                      maxEntries=sum(peak.values()) - 1)
+
+if __name__ == '__main__':
+  unittest.main()
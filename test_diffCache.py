@@ -0,0 +1,83 @@
+# File containing unit tests for the diff cache.
+# Run the test by executing "python test_diffCache.py -v" at the
+# command line.
+import os
+import shutil
+import tempfile
+import unittest
+from util.tree import *
+from treediff import *
+from diffCache import DiffCache
+from costModel import CostModel
+from costModel import WeightedCostModel
+
+def buildTree(labels):
+  nodes = [TreeNode(label) for label in labels]
+  for node in nodes[1:]:
+    nodes[0].add_child(node)
+  tree = Tree(nodes[0])
+  tree.build_caches()
+  return tree
+
+class TestDiffCache(unittest.TestCase):
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.path = os.path.join(self.directory, 'diffs.sqlite')
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def test_memory(self):
+    cache = DiffCache(maxEntries=2)
+    source, target = buildTree('ABC'), buildTree('ABD')
+    distance, mapping = computeDiff(source, target)
+    expected = (distance, mapping,
+                produceHumanFriendlyMapping(mapping, source, target))
+    self.assertEqual(expected, cache.diff(source, target))
+    # Trees built again have the same hashes
+    self.assertEqual(expected, cache.diff(buildTree('ABC'), buildTree('ABD')))
+    self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+    cache.diff(source, target, 'zhang-shasha')
+    cache.diff(source, target, costModel=WeightedCostModel(relabel=2))
+    self.assertEqual((1, 3), (cache.hits, cache.misses))
+    # The first entry was evicted
+    cache.diff(source, target)
+    self.assertEqual((1, 4), (cache.hits, cache.misses))
+
+  def test_models_without_key(self):
+    cache = DiffCache()
+    source, target = buildTree('ABC'), buildTree('ABD')
+    cache.diff(source, target, costModel=CostModel())
+    cache.diff(source, target, costModel=CostModel())
+    self.assertEqual((0, 2), (cache.hits, cache.misses))
+
+  def test_disk(self):
+    source, target = buildTree('ABC'), buildTree('AB')
+    cache = DiffCache(path=self.path)
+    expected = cache.diff(source, target)
+    self.assertEqual((INFINITE, None, None),
+                     cache.diff(source, buildTree('XYZW'), maxDistance=1))
+    cache.close()
+
+    cache = DiffCache(path=self.path)
+    self.assertEqual(expected, cache.diff(source, target))
+    self.assertEqual((INFINITE, None, None),
+                     cache.diff(source, buildTree('XYZW'), maxDistance=1))
+    self.assertEqual((2, 0), (cache.hits, cache.misses))
+    cache.close()
+
+  def test_disk_eviction(self):
+    cache = DiffCache(maxEntries=1, path=self.path, maxDiskEntries=2)
+    source = buildTree('ABC')
+    for labels in ('AB', 'AC', 'AD'):
+      cache.diff(source, buildTree(labels))
+    cache.diff(source, buildTree('AC'))
+    cache.diff(source, buildTree('AD'))
+    self.assertEqual((2, 3), (cache.hits, cache.misses))
+    cache.diff(source, buildTree('AB'))
+    self.assertEqual((2, 4), (cache.hits, cache.misses))
+    cache.close()
+
+if __name__ == '__main__':
+    unittest.main()
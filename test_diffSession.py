@@ -0,0 +1,74 @@
+# File containing unit tests for the incremental diff sessions.
+# Run the test by executing "python test_diffSession.py -v" at the
+# command line.
+import random
+import unittest
+from util.tree import *
+from treediff import *
+from costModel import UNIT_COSTS
+from costModel import WeightedCostModel
+from diffSession import DiffSession
+from diffSession import SOURCE
+from diffSession import TARGET
+from randomTrees import randomTree
+
+def buildTree(labels):
+  nodes = [TreeNode(label) for label in labels]
+  for node in nodes[1:]:
+    nodes[0].add_child(node)
+  tree = Tree(nodes[0])
+  tree.build_caches()
+  return tree
+
+class TestDiffSession(unittest.TestCase):
+  def test_edits(self):
+    source, target = buildTree('ABC'), buildTree('ABC')
+    session = DiffSession(source, target)
+    self.assertEqual((0, [(1, 1), (2, 2), (3, 3)]), session.diff())
+    # A(B, X(C))
+    self.assertEqual(3, session.insertNode(TARGET, 1, 1, 'X', 1))
+    self.assertEqual(
+        (1, [(1, 1), (2, 2), (3, 4), ('alpha', 3)]), session.diff())
+    session.relabelNode(SOURCE, 2, 'Y')
+    self.assertEqual(2, session.distance())
+    # A(B, C) again
+    session.deleteNode(TARGET, 3)
+    self.assertEqual((1, [(1, 1), (2, 2), (3, 3)]), session.diff())
+    self.assertEqual(['B', 'C'],
+                     [node.label() for node in target.node_at(1).children()])
+    self.assertRaises(ValueError, session.deleteNode, TARGET, 1)
+    self.assertRaises(ValueError, session.relabelNode, TARGET, 4, 'Z')
+    self.assertRaises(ValueError, session.insertNode, SOURCE, 1, 1, 'Z', 2)
+
+  def test_random_edits(self):
+    generator = random.Random(1979)
+    for index in range(60):
+      source = randomTree(generator, generator.randint(1, 10), 'ABCD')
+      target = randomTree(generator, generator.randint(1, 10), 'ABCD')
+      costModel = UNIT_COSTS
+      if index % 2:
+        costModel = WeightedCostModel(
+            insert=2, relabel=3, deleteByLabel={'A': 4})
+      session = DiffSession(source, target, costModel)
+      session.diff()
+      for _ in range(3):
+        side = generator.choice((SOURCE, TARGET))
+        tree = source if side == SOURCE else target
+        operation = generator.randint(0, 2)
+        if operation == 0 or tree.size() == 1:
+          father = generator.randint(1, tree.size())
+          count = len(list(tree.node_at(father).children()))
+          index = generator.randint(0, count)
+          session.insertNode(side, father, index, generator.choice('ABCDE'),
+                             generator.randint(0, count - index))
+        elif operation == 1:
+          session.deleteNode(side, generator.randint(2, tree.size()))
+        else:
+          session.relabelNode(side, generator.randint(1, tree.size()),
+                              generator.choice('ABCDE'))
+        # The tables of the session give what a diff from scratch gives
+        self.assertEqual(
+            computeDistance(source, target, True, costModel), session.diff())
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,55 @@
+# File containing unit tests for the statistics of diffs.
+# Run the test by executing "python test_diffStats.py -v" at the
+# command line.
+import json
+import random
+import unittest
+from treediff import *
+from diffCache import DiffCache
+from diffStats import DiffStats
+from randomTrees import randomTree
+
+class TestDiffStats(unittest.TestCase):
+  def setUp(self):
+    generator = random.Random(5)
+    self.source = randomTree(generator, 12, 'AB')
+    self.target = randomTree(generator, 12, 'CD')
+
+  def test_phases(self):
+    stats = DiffStats(measureMappings=True)
+    self.assertEqual(computeDiff(self.source, self.target),
+                     computeDiff(self.source, self.target, stats=stats))
+    self.assertEqual(
+        ['anchors', 'costs', 'computeE', 'computeMIN_M', 'computeD',
+         'mapping'],
+        list(stats.seconds))
+    # Without a limit every entry is computed
+    E, _ = computeE(self.source, self.target)
+    size = (self.source.size() + 1) * (self.target.size() + 1)
+    self.assertEqual(len(E), stats.cells['E'])
+    self.assertEqual({'E': len(E), 'MIN_M': size, 'D': size},
+                     stats.tableEntries)
+    self.assertEqual(len(E) + 2 * size, stats.peakTableEntries)
+    self.assertTrue(stats.peakMappingBytes > 0)
+
+    limited = DiffStats()
+    computeDiff(self.source, self.target, maxDistance=14, stats=limited)
+    self.assertIn('bounds', limited.seconds)
+    self.assertTrue(limited.cells['E'] < stats.cells['E'])
+    self.assertEqual(0, limited.peakMappingBytes)
+
+  def test_cache(self):
+    stats = DiffStats()
+    cache = DiffCache()
+    cache.diff(self.source, self.target, 'apted', stats=stats)
+    cache.diff(self.source, self.target, 'apted', stats=stats)
+    self.assertEqual((1, 1, 0.5),
+                     (stats.cacheHits, stats.cacheMisses,
+                      stats.cacheHitRate()))
+    exported = json.loads(json.dumps(stats.asDict()))
+    self.assertEqual(1, exported['diffs'])
+    self.assertIn('apted', exported['seconds'])
+    self.assertEqual(0, exported['totalCells'])
+
+if __name__ == '__main__':
+  unittest.main()
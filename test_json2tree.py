@@ -0,0 +1,45 @@
+# File containing unit tests for building trees from JSON.
+# Run the test by executing "python test_json2tree.py -v" at the
+# command line.
+import unittest
+from StringIO import StringIO
+import json2tree
+from json2tree import buildTreeFromJson
+from json2tree import iterTreesFromJsonLines
+
+def shape(tree):
+  return [(tree.node_at(position).label(), tree.father_position_of(position))
+          for position in range(1, tree.size() + 1)]
+
+class TestJson2Tree(unittest.TestCase):
+  def test_document(self):
+    document = '{"b": [1, 2.5, {"c": null}], "a": true, "e": {}}'
+    expected = [
+        ('{}', 0), ('b', 1), ('[]', 2), (1, 3), (2.5, 3), ('{}', 3),
+        ('c', 6), (None, 7), ('a', 1), (True, 9), ('e', 1), ('{}', 11)]
+    self.assertEqual(expected, shape(buildTreeFromJson(document)))
+    self.assertEqual(expected, shape(buildTreeFromJson(StringIO(document))))
+
+  def test_json_lines(self):
+    trees = iterTreesFromJsonLines(StringIO('"a"\n\n[1, "a"]\n'))
+    self.assertEqual([('a', 0)], shape(next(trees)))
+    self.assertEqual([('[]', 0), (1, 1), ('a', 1)], shape(next(trees)))
+    self.assertRaises(StopIteration, next, trees)
+
+  @unittest.skipIf(json2tree.ijson is None, 'needs ijson')
+  def test_ijson(self):
+    document = ('{"n": [0, -3, 12345678901234567890, 2.5, 1e5, 1E-2, 10.0],'
+                ' "s": "\\u00e9", "o": {"a": [], "b": {}}, "z": false}')
+    parsed = shape(buildTreeFromJson(document))
+    ijson = json2tree.ijson
+    json2tree.ijson = None
+    try:
+      loaded = shape(buildTreeFromJson(document))
+    finally:
+      json2tree.ijson = ijson
+    self.assertEqual(loaded, parsed)
+    self.assertEqual([type(label) for label, _ in loaded],
+                     [type(label) for label, _ in parsed])
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,100 @@
+# File containings unit tests for the keyroot based algorithms which
+# are cross-checked against the algorithm in treediff.
+# Run the test by executing "python test_keyrootDiff.py -v" at the
+# command line.
+import random
+import unittest
+from util.tree import *
+from treediff import *
+from costModel import WeightedCostModel
+from randomTrees import randomTree
+
+class TestKeyrootDiff(unittest.TestCase):
+  def setUp(self):
+    a = TreeNode('A')
+    b = TreeNode('B')
+    a.add_child(b)
+    d = TreeNode('D')
+    b.add_child(d)
+    self.treeOne = Tree(a)
+    self.treeOne.build_caches()
+
+    a = TreeNode('A')
+    b = TreeNode('B')
+    c = TreeNode('C')
+    d = TreeNode('D')
+    a.add_child(b)
+    a.add_child(c)
+    c.add_child(d)
+    self.treeTwo = Tree(a)
+    self.treeTwo.build_caches()
+
+  def test_mapping(self):
+    for algorithm in ('zhang-shasha', 'apted'):
+      self.assertEqual(
+          (2, [(1, 1), (2, 3), (3, 4), ('alpha', 2)]),
+          computeDiff(self.treeOne, self.treeTwo, algorithm))
+      self.assertEqual(
+          (0, [(1, 1), (2, 2), (3, 3), (4, 4)]),
+          computeDiff(self.treeTwo, self.treeTwo, algorithm))
+
+  def test_unknown_algorithm(self):
+    with self.assertRaises(ValueError):
+      computeDiff(self.treeOne, self.treeTwo, 'unknown')
+
+  def test_random_trees(self):
+    generator = random.Random(1979)
+    for _ in range(200):
+      source = randomTree(generator, generator.randint(1, 8), 'ABC')
+      target = randomTree(generator, generator.randint(1, 8), 'ABC')
+      expectedDistance, _ = computeDiff(source, target)
+      for algorithm in ('zhang-shasha', 'apted'):
+        distance, mapping = computeDiff(source, target, algorithm)
+        self.assertEqual(expectedDistance, distance)
+        # The mapping must account for every node and cost the distance.
+        self.assertEqual(
+            range(1, source.size() + 1),
+            sorted(i for i, _ in mapping if i != ALPHA))
+        self.assertEqual(
+            range(1, target.size() + 1),
+            sorted(j for _, j in mapping if j != ALPHA))
+        self.assertEqual(
+            distance,
+            sum(r(source.node_at(i) if i != ALPHA else ALPHA,
+                  target.node_at(j) if j != ALPHA else ALPHA)
+                for i, j in mapping))
+
+  def test_random_costs(self):
+    generator = random.Random(2016)
+    for _ in range(100):
+      source = randomTree(generator, generator.randint(1, 7), 'ABC')
+      target = randomTree(generator, generator.randint(1, 7), 'ABC')
+      costModel = WeightedCostModel(
+          insert=generator.randint(1, 4), delete=generator.randint(1, 4),
+          relabel=generator.randint(1, 6),
+          insertByLabel={'A': generator.randint(1, 4)},
+          relabelByPair={('B', 'C'): generator.randint(1, 3)})
+      expectedDistance, _ = computeDiff(
+          source, target, costModel=costModel)
+      for algorithm in ('zhang-shasha', 'apted'):
+        self.assertEqual(
+            expectedDistance,
+            computeDiff(source, target, algorithm, costModel)[0])
+
+  def test_maxDistance(self):
+    generator = random.Random(42)
+    for _ in range(100):
+      source = randomTree(generator, generator.randint(1, 7), 'ABC')
+      target = randomTree(generator, generator.randint(1, 7), 'ABC')
+      expected = computeDiff(source, target)
+      maxDistance = generator.randint(0, 6)
+      if expected[0] > maxDistance:
+        expected = (INFINITE, None)
+      for algorithm in ALGORITHMS:
+        self.assertEqual(
+            expected[0],
+            computeDiff(source, target, algorithm,
+                        maxDistance=maxDistance)[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# File containing unit tests for the distance matrices of pairwiseDiff.
+# Run the test by executing "python test_pairwiseDiff.py -v" at the
+# command line.
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import pairwiseDiff
+from util.tree import *
+from treediff import *
+from pairwiseDiff import *
+from randomTrees import randomTree
+
+class TestPairwiseDiff(unittest.TestCase):
+  def setUp(self):
+    generator = random.Random(7)
+    self.trees = [randomTree(generator, generator.randint(1, 8), 'ABC')
+                  for _ in range(9)]
+
+  def assertMatrix(self, matrix, algorithm='tai', maxDistance=None):
+    for i, source in enumerate(self.trees):
+      for j, target in enumerate(self.trees):
+        self.assertEqual(
+            computeDiff(source, target, algorithm,
+                        maxDistance=maxDistance)[0],
+            matrix[i][j])
+
+  def test_pairwiseDistances(self):
+    self.assertMatrix(pairwiseDistances(self.trees, workers=1))
+    self.assertMatrix(pairwiseDistances(self.trees, workers=2, chunkSize=5))
+    self.assertMatrix(
+        pairwiseDistances(self.trees, workers=2, algorithm='zhang-shasha'),
+        'zhang-shasha')
+    self.assertMatrix(
+        pairwiseDistances(self.trees, workers=2, maxDistance=2),
+        maxDistance=2)
+
+  def test_progress(self):
+    calls = []
+    pairwiseDistances(self.trees, workers=2, chunkSize=4,
+                      progress=lambda done, total: calls.append((done, total)))
+    self.assertEqual(9, len(calls))
+    self.assertEqual((36, 36), calls[-1])
+    self.assertEqual(sorted(calls), calls)
+
+  @unittest.skipIf(numpy is None, 'needs NumPy')
+  def test_output(self):
+    directory = tempfile.mkdtemp()
+    try:
+      path = os.path.join(directory, 'distances')
+      matrix = pairwiseDistances(self.trees, workers=2, output=path)
+      self.assertMatrix(matrix)
+      stored = numpy.memmap(path, dtype='float64', mode='r',
+                            shape=(len(self.trees), len(self.trees)))
+      self.assertMatrix(stored)
+      del matrix, stored
+    finally:
+      shutil.rmtree(directory)
+
+  def test_chunks(self):
+    chunks = pairwiseDiff._chunks(self.trees, 5)
+    self.assertEqual(chunks, iter(chunks))
+    pairs = [pair for chunk in chunks for pair in chunk]
+    self.assertEqual(36, len(set(frozenset(pair) for pair in pairs)))
+    largest = max(tree.size() for tree in self.trees)
+    self.assertEqual(largest, self.trees[pairs[0][0]].size())
+
+  def test_unknown_algorithm(self):
+    with self.assertRaises(ValueError):
+      pairwiseDistances(self.trees, algorithm='unknown')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+# File containing unit tests for the bounds in treeBounds which are
+# checked against the distances of treediff.
+# Run the test by executing "python test_treeBounds.py -v" at the
+# command line.
+import random
+import unittest
+from util.tree import *
+from treediff import *
+from treeBounds import *
+from costModel import WeightedCostModel
+from randomTrees import randomTree
+
+class TestTreeBounds(unittest.TestCase):
+  def setUp(self):
+    a = TreeNode('A')
+    b = TreeNode('B')
+    a.add_child(b)
+    d = TreeNode('D')
+    b.add_child(d)
+    self.treeOne = Tree(a)
+    self.treeOne.build_caches()
+
+    a = TreeNode('A')
+    b = TreeNode('B')
+    c = TreeNode('C')
+    d = TreeNode('D')
+    e = TreeNode('E')
+    a.add_child(b)
+    a.add_child(c)
+    c.add_child(d)
+    d.add_child(e)
+    self.treeThree = Tree(a)
+    self.treeThree.build_caches()
+
+  def test_bounds(self):
+    # two nodes more, one level deeper, C and E missing
+    self.assertEqual(2, sizeAndDepthBound(self.treeOne, self.treeThree))
+    self.assertEqual(2, labelBound(self.treeOne, self.treeThree))
+    self.assertEqual(2, lowerBound(self.treeOne, self.treeThree))
+    self.assertEqual(3, traversalBound(self.treeOne, self.treeThree))
+    self.assertEqual(4, upperBound(self.treeOne, self.treeThree))
+    for bound in (lowerBound, traversalBound, upperBound):
+      self.assertEqual(0, bound(self.treeThree, self.treeThree))
+
+  def test_random_trees(self):
+    generator = random.Random(1989)
+    for _ in range(300):
+      source = randomTree(generator, generator.randint(1, 12), 'ABCD')
+      target = randomTree(generator, generator.randint(1, 12), 'ABCD')
+      distance, _ = computeDiff(source, target, 'zhang-shasha')
+      self.assertTrue(lowerBound(source, target) <= distance)
+      self.assertTrue(traversalBound(source, target) <= distance)
+      self.assertTrue(distance <= upperBound(source, target))
+
+  def test_random_costs(self):
+    generator = random.Random(2017)
+    for _ in range(200):
+      source = randomTree(generator, generator.randint(1, 10), 'ABCD')
+      target = randomTree(generator, generator.randint(1, 10), 'ABCD')
+      costModel = WeightedCostModel(
+          insert=generator.randint(1, 4), delete=generator.randint(1, 4),
+          relabel=generator.randint(1, 6),
+          deleteByLabel={'A': generator.randint(1, 9)},
+          relabelByPair={('B', 'C'): generator.randint(0, 3)})
+      distance, _ = computeDiff(
+          source, target, 'zhang-shasha', costModel=costModel)
+      self.assertTrue(lowerBound(source, target, costModel) <= distance)
+      self.assertTrue(traversalBound(source, target, costModel) <= distance)
+      self.assertTrue(distance <= upperBound(source, target, costModel))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,7 +3,11 @@
 # line.
 import unittest
 from util.tree import *
+from util.compact_tree import CompactTree
+import treediff
 from treediff import *
+from costModel import UNIT_COSTS
+from costModel import WeightedCostModel
 
 class TestTreeDiff(unittest.TestCase):
   def setUp(self):
@@ -77,6 +81,141 @@ class TestTreeDiff(unittest.TestCase):
     expectedMapping = [(1, 1), (2, 2), (3, 3), (4, 4)]
     self.assertEqual(expectedMapping, mapping)
 
+  def test_deletion(self):
+    a = TreeNode('A')
+    b = TreeNode('B')
+    c = TreeNode('C')
+    a.add_child(b)
+    a.add_child(c)
+    source = Tree(a)
+    source.build_caches()
+
+    a = TreeNode('A')
+    b = TreeNode('B')
+    a.add_child(b)
+    target = Tree(a)
+    target.build_caches()
+
+    distance, mapping = computeDiff(source, target)
+    self.assertEqual(1, distance)
+    self.assertEqual([(1, 1), (2, 2), (3, 'alpha')], mapping)
+
+  def test_root_change(self):
+    a = TreeNode('Z')
+    b = TreeNode('B')
+    a.add_child(b)
+    d = TreeNode('D')
+    b.add_child(d)
+    source = Tree(a)
+    source.build_caches()
+
+    distance, mapping = computeDiff(source, self.treeOne)
+    self.assertEqual(1, distance)
+    self.assertEqual([(1, 1), (2, 2), (3, 3)], mapping)
+
+  def test_computeDistance(self):
+    pairs = [
+        (self.treeOne, self.treeTwo), (self.treeOne, self.treeThree),
+        (self.treeTwo, self.treeThree), (self.treeThree, self.treeFour),
+        (self.treeTwo, self.treeTwo)]
+    for source, target in pairs:
+      distance, mapping = computeDiff(source, target)
+      self.assertEqual(distance, computeDistance(source, target))
+      self.assertEqual(
+          (distance, mapping),
+          computeDistance(source, target, traceback=True))
+
+  def test_costModel(self):
+    # Changing B into C is cheaper than deleting and inserting it
+    cheapRelabel = WeightedCostModel(insert=2, delete=2, relabel=3)
+    self.assertEqual(
+        (5, [(1, 1), (2, 3), (3, 4), ('alpha', 2)]),
+        computeDiff(self.treeOne, self.treeTwo, costModel=cheapRelabel))
+    # but not when changes cost more than a deletion and an insertion
+    expensiveRelabel = WeightedCostModel(relabel=3)
+    distance, mapping = computeDiff(
+        self.treeOne, self.treeTwo, costModel=expensiveRelabel)
+    self.assertEqual(3, distance)
+    self.assertTrue((2, 3) not in mapping)
+    self.assertEqual(
+        (distance, mapping),
+        computeDistance(self.treeOne, self.treeTwo, traceback=True,
+                        costModel=expensiveRelabel))
+    # Costs can depend on the labels
+    keepB = WeightedCostModel(
+        deleteByLabel={'B': 10}, relabelByPair={('B', 'C'): 10})
+    self.assertEqual(
+        (3, [(1, 1), (2, 2), (3, 'alpha'), ('alpha', 3), ('alpha', 4)]),
+        computeDiff(self.treeOne, self.treeTwo, costModel=keepB))
+
+  def test_maxDistance(self):
+    pairs = [
+        (self.treeOne, self.treeTwo), (self.treeOne, self.treeThree),
+        (self.treeTwo, self.treeThree), (self.treeThree, self.treeFour),
+        (self.treeTwo, self.treeTwo)]
+    for source, target in pairs:
+      expected = computeDiff(source, target)
+      for maxDistance in range(4):
+        if expected[0] > maxDistance:
+          self.assertEqual(
+              (INFINITE, None),
+              computeDiff(source, target, maxDistance=maxDistance))
+          self.assertEqual(
+              INFINITE,
+              computeDistance(source, target, maxDistance=maxDistance))
+        else:
+          self.assertEqual(
+              expected, computeDiff(source, target, maxDistance=maxDistance))
+          self.assertEqual(
+              expected,
+              computeDistance(source, target, traceback=True,
+                              maxDistance=maxDistance))
+
+  def test_anchors(self):
+    # treeThree only has E more than treeTwo, so A, B and C are mapped
+    # without the tables, which see D and D(E)
+    anchors = treediff._Anchors(self.treeTwo, self.treeThree)
+    self.assertEqual([(1, 1), (2, 2), (3, 3)], sorted(anchors.mapping))
+    self.assertEqual(1, anchors.sourceTree.size())
+    self.assertEqual(2, anchors.targetTree.size())
+    self.assertEqual('D', anchors.targetTree.node_at(1).label())
+    # C and CC have different labels, so only B is left out
+    anchors = treediff._Anchors(self.treeThree, self.treeFour)
+    self.assertEqual([(2, 2)], anchors.mapping)
+    self.assertEqual(4, anchors.sourceTree.size())
+    # Identical trees leave their roots alone
+    anchors = treediff._Anchors(self.treeTwo, self.treeTwo)
+    self.assertEqual(1, anchors.sourceTree.size())
+    self.assertEqual(1, anchors.targetTree.size())
+    # The distances are the ones of the tables of the whole trees
+    pairs = [
+        (self.treeOne, self.treeTwo), (self.treeOne, self.treeThree),
+        (self.treeTwo, self.treeThree), (self.treeThree, self.treeFour),
+        (self.treeTwo, self.treeTwo)]
+    for source, target in pairs:
+      for algorithm in ALGORITHMS:
+        self.assertEqual(
+            computeDiff(source, target, algorithm, UNIT_COSTS)[0],
+            computeDiff(source, target, algorithm)[0])
+
+  def test_compactTree(self):
+    for algorithm in ALGORITHMS:
+      self.assertEqual(
+          computeDiff(self.treeOne, self.treeThree, algorithm),
+          computeDiff(CompactTree.from_tree(self.treeOne),
+                      CompactTree.from_tree(self.treeThree), algorithm))
+
+  def test_flattenMapping(self):
+    self.assertEqual([], flattenMapping(None))
+    shared = ((ALPHA, 3), ((1, 1), None))
+    mapping = ((2, ALPHA), (((2, 2), shared), shared, None))
+    self.assertEqual([(1, 1), (2, 2), (2, ALPHA), (ALPHA, 3)],
+                     flattenMapping(mapping))
+
+    # The E mappings are built the same way
+    E, mappingForE = computeE(self.treeOne, self.treeTwo)
+    self.assertEqual([(1, 1)], flattenMapping(mappingForE[0]))
+
   def test_produceHumanFriendlyMapping(self):
     _, mapping = computeDiff(self.treeOne, self.treeTwo)
     description = produceHumanFriendlyMapping(
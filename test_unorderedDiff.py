@@ -0,0 +1,146 @@
+# File containing unit tests for the diff of unordered trees.
+# Run the test by executing "python test_unorderedDiff.py -v" at the
+# command line.
+import random
+import unittest
+from util.tree import *
+from treediff import *
+from costModel import UNIT_COSTS
+from costModel import WeightedCostModel
+from unorderedDiff import computeUnorderedDiff
+from randomTrees import randomTree
+
+# Returns the tree of (label, [children]) where the children are of the
+# same form
+def buildTree(description):
+  root = TreeNode(description[0])
+  pending = [(root, description[1])]
+  while pending:
+    node, children = pending.pop()
+    for label, grandChildren in children:
+      child = TreeNode(label)
+      node.add_child(child)
+      pending.append((child, grandChildren))
+  tree = Tree(root)
+  tree.build_caches()
+  return tree
+
+def shuffledTree(generator, tree):
+  def describe(node):
+    children = [describe(child) for child in node.children()]
+    generator.shuffle(children)
+    return (node.label(), children)
+  return buildTree(describe(tree.node_at(1)))
+
+class TestUnorderedDiff(unittest.TestCase):
+  # Checks that the mapping is top-down, covers every node once and costs
+  # the distance
+  def assertMapping(self, source, target, distance, mapping, costModel):
+    costModel = costModel or UNIT_COSTS
+    mapped = dict((x, y) for x, y in mapping if x != ALPHA and y != ALPHA)
+    self.assertEqual(1, mapped[1])
+    for x, y in mapped.items():
+      if x > 1:
+        self.assertEqual(target.father_position_of(y),
+                         mapped[source.father_position_of(x)])
+    self.assertEqual(range(1, source.size() + 1),
+                     sorted(x for x, _ in mapping if x != ALPHA))
+    self.assertEqual(range(1, target.size() + 1),
+                     sorted(y for _, y in mapping if y != ALPHA))
+    cost = 0
+    for x, y in mapping:
+      if x == ALPHA:
+        cost += costModel.insertCost(target.node_at(y).label())
+      elif y == ALPHA:
+        cost += costModel.deleteCost(source.node_at(x).label())
+      else:
+        cost += costModel.relabelCost(source.node_at(x).label(),
+                                      target.node_at(y).label())
+    self.assertEqual(distance, cost)
+
+  def test_shuffled(self):
+    generator = random.Random(1)
+    for _ in range(30):
+      tree = randomTree(generator, generator.randint(1, 30), 'ABC')
+      distance, mapping = computeUnorderedDiff(
+          tree, shuffledTree(generator, tree))
+      self.assertEqual(0, distance)
+      self.assertEqual(tree.size(), len(mapping))
+
+  def test_keys(self):
+    source = buildTree(('config', [
+        ('name', [('app', [])]),
+        ('port', [('80', [])]),
+        ('paths', [('/a', []), ('/b', [])])]))
+    target = buildTree(('config', [
+        ('ports', [('80', [])]),
+        ('paths', [('/b', []), ('/c', [])]),
+        ('name', [('app', [])])]))
+    distance, mapping = computeUnorderedDiff(source, target)
+    # port is renamed, /a is changed into /c
+    self.assertEqual(2, distance)
+    self.assertTrue((4, 2) in mapping)
+    self.assertTrue((7, 6) in mapping)
+    self.assertTrue((8, 5) in mapping)
+    self.assertTrue(computeDiff(source, target)[0] > distance)
+
+  def test_items(self):
+    # The items of the same label are assigned by their subtrees
+    source = buildTree(('list', [
+        ('item', [('a', []), ('b', [])]),
+        ('item', [('c', []), ('d', [])]),
+        ('item', [('e', [])])]))
+    target = buildTree(('list', [
+        ('item', [('d', []), ('x', [])]),
+        ('item', [('a', []), ('b', [])]),
+        ('item', [('f', [])]),
+        ('item', [('g', [])])]))
+    distance, mapping = computeUnorderedDiff(source, target)
+    self.assertEqual(1 + 1 + 2, distance)
+    self.assertTrue((2, 5) in mapping)
+    self.assertTrue((5, 2) in mapping)
+    self.assertMapping(source, target, distance, mapping, None)
+
+  def test_random_trees(self):
+    generator = random.Random(2)
+    for index in range(100):
+      source = randomTree(generator, generator.randint(1, 20), 'ABC')
+      target = randomTree(generator, generator.randint(1, 20), 'ABC')
+      costModel = None
+      if index % 2:
+        costModel = WeightedCostModel(
+            insert=generator.randint(1, 3), delete=generator.randint(1, 3),
+            relabel=generator.choice([1, 2, 0.5]))
+      for assignmentLimit in (0, 40):
+        distance, mapping = computeUnorderedDiff(
+            source, target, costModel, assignmentLimit)
+        self.assertMapping(source, target, distance, mapping, costModel)
+      # The assignments never do worse than the pairs in order
+      self.assertTrue(distance <= computeUnorderedDiff(
+          source, target, costModel, 0)[0])
+      self.assertEqual((distance, mapping),
+                       computeDiff(source, target, UNORDERED, costModel))
+
+  def test_wide_and_deep(self):
+    keys = [('key%d' % k, [('value%d' % k, [])]) for k in range(3000)]
+    source = buildTree(('root', keys))
+    target = buildTree(('root', list(reversed(keys[1:])) + [
+        ('key0', [('changed', [])])]))
+    self.assertEqual(1, computeUnorderedDiff(source, target)[0])
+
+    chain = ('leaf', [])
+    for _ in range(3000):
+      chain = ('node', [chain])
+    tree = buildTree(chain)
+    self.assertEqual(0, computeUnorderedDiff(tree, tree)[0])
+
+  def test_maxDistance(self):
+    source = buildTree(('a', [('b', []), ('c', [])]))
+    target = buildTree(('a', [('c', []), ('d', [])]))
+    self.assertEqual(1, computeDiff(source, target, UNORDERED)[0])
+    self.assertEqual(
+        (INFINITE, None),
+        computeDiff(source, target, UNORDERED, maxDistance=0))
+
+if __name__ == '__main__':
+    unittest.main()
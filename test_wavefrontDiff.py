@@ -0,0 +1,62 @@
+# File containing unit tests for the wavefront evaluation of MIN_M and D
+# which is checked against the serial one of treediff.
+# Run the test by executing "python test_wavefrontDiff.py -v" at the
+# command line.
+import random
+import unittest
+from util.tree import *
+from treediff import *
+from costModel import UNIT_COSTS
+from costModel import WeightedCostModel
+from wavefrontDiff import computeDRows
+from randomTrees import randomTree
+
+class TestWavefrontDiff(unittest.TestCase):
+  def test_random_trees(self):
+    generator = random.Random(1)
+    for index in range(150):
+      source = randomTree(generator, generator.randint(1, 10), 'ABC')
+      target = randomTree(generator, generator.randint(1, 10), 'ABC')
+      costModel = None
+      if index % 2:
+        costModel = WeightedCostModel(
+            insert=generator.randint(1, 3), delete=generator.randint(1, 3),
+            relabel=generator.randint(1, 4))
+      maxDistance = generator.choice([None, 2, 5])
+      self.assertEqual(
+          computeDistance(source, target, True, costModel, maxDistance),
+          computeDistance(source, target, True, costModel, maxDistance,
+                          wavefront=True))
+
+  def test_rows(self):
+    generator = random.Random(2)
+    for index in range(150):
+      source = randomTree(generator, generator.randint(1, 10), 'ABC')
+      target = randomTree(generator, generator.randint(1, 10), 'ABC')
+      costModel = None
+      if index % 2:
+        costModel = WeightedCostModel(
+            insert=generator.randint(1, 3), delete=generator.randint(1, 3),
+            relabel=generator.choice([1, 2, 0.5]))
+      maxDistance = generator.choice([None, 2, 5])
+      costs = (costModel or UNIT_COSTS).editCosts(source, target)
+      limit = INFINITE if maxDistance is None else maxDistance
+      E, choicesForE = computeE(source, target, KEEP_CHOICES, costs, limit)
+      MIN_M, choicesForMinM = computeMIN_M(
+          E, choicesForE, source, target, KEEP_CHOICES, costs, limit)
+      self.assertEqual(
+          computeD(source, target, MIN_M, choicesForMinM, KEEP_CHOICES,
+                   costs, limit),
+          computeDRows(source, target, MIN_M, choicesForMinM,
+                       KEEP_CHOICES, costs, limit))
+
+      expected = computeDiff(source, target, costModel=costModel,
+                             maxDistance=maxDistance)
+      distance, mapping = computeDiff(
+          source, target, costModel=costModel, maxDistance=maxDistance,
+          vectorized=True)
+      self.assertEqual(expected, (distance, mapping))
+      self.assertEqual(repr(expected[0]), repr(distance))
+
+if __name__ == '__main__':
+    unittest.main()
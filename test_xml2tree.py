@@ -0,0 +1,51 @@
+# File containing unit tests for building trees from XML.
+# Run the test by executing "python test_xml2tree.py -v" at the
+# command line.
+import unittest
+from StringIO import StringIO
+import xml2tree
+from xml2tree import buildTreeFromXml
+
+def shape(tree):
+  return [(tree.node_at(position).label(), tree.father_position_of(position))
+          for position in range(1, tree.size() + 1)]
+
+class TestXml2Tree(unittest.TestCase):
+  def test_document(self):
+    document = '<a y="2" x="1">t<b>in</b>u<c/>\n  <d/> v </a>'
+    self.assertEqual(
+        [('a', 0), ('@x=1', 1), ('@y=2', 1), ('t', 1), ('b', 1), ('in', 5),
+         ('u', 1), ('c', 1), ('d', 1), ('v', 1)],
+        shape(buildTreeFromXml(StringIO(document))))
+
+  def test_deep_document(self):
+    depth = 5000
+    document = '<n>' * depth + '</n>' * depth
+    tree = buildTreeFromXml(StringIO(document))
+    self.assertEqual(depth, tree.size())
+    self.assertEqual(depth - 1, tree.depth_of(depth))
+
+  def test_children_removed(self):
+    # The children the root holds while the document is read
+    counts = []
+    def countingIterparse(source, events):
+      root = None
+      for event, element in iterparse(source, events):
+        root = element if root is None else root
+        yield event, element
+        counts.append(len(root))
+    children = 20000
+    document = '<a>' + '<b x="1">t</b>u' * children + '</a>'
+    iterparse = xml2tree.iterparse
+    xml2tree.iterparse = countingIterparse
+    try:
+      tree = buildTreeFromXml(StringIO(document))
+    finally:
+      xml2tree.iterparse = iterparse
+    self.assertEqual(1 + 4 * children, tree.size())
+    # Only the children the parser has read ahead are left
+    self.assertTrue(max(counts) < children // 10, max(counts))
+    self.assertEqual(0, counts[-1])
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,70 @@
+# File containing unit tests for building trees from YAML.
+# Run the test by executing "python test_yaml2tree.py -v" at the
+# command line.
+import os
+import shutil
+import tempfile
+import unittest
+from util.tree_file import load_tree
+from util.tree_file import save_tree
+from yaml2tree import buildTreesFromYamlInput
+from yaml2tree import iterTreesFromYamlInput
+
+TREES_AS_YAML = """
+---
+Z1:
+  - B2:
+  - C3:
+    - D4:
+        - F5:
+    - E6:
+        - 7:
+        - J9: ~
+    - A10: []
+---
+---
+A:
+"""
+
+def shape(tree):
+  return [(tree.node_at(position).label(), tree.father_position_of(position))
+          for position in range(1, tree.size() + 1)]
+
+class TestYaml2Tree(unittest.TestCase):
+  def test_trees(self):
+    trees = buildTreesFromYamlInput(TREES_AS_YAML)
+    self.assertEqual(2, len(trees))
+    self.assertEqual(
+        [('Z1', 0), ('B2', 1), ('C3', 1), ('D4', 3), ('F5', 4), ('E6', 3),
+         (7, 6), ('J9', 6), ('A10', 3)],
+        shape(trees[0]))
+    self.assertEqual([('A', 0)], shape(trees[1]))
+
+  def test_one_at_a_time(self):
+    trees = iterTreesFromYamlInput('---\nA:\n  - B:\n---\nA: 3\n')
+    self.assertEqual([('A', 0), ('B', 1)], shape(next(trees)))
+    # The second document is only read when its tree is asked for
+    self.assertRaises(ValueError, next, trees)
+
+  def test_tree_file(self):
+    directory = tempfile.mkdtemp()
+    try:
+      path = os.path.join(directory, 'tree.bin')
+      for tree in buildTreesFromYamlInput(TREES_AS_YAML):
+        save_tree(tree, path)
+        loaded = load_tree(path)
+        self.assertEqual(shape(tree), shape(loaded))
+        self.assertEqual(tree.structural_hash(), loaded.structural_hash())
+    finally:
+      shutil.rmtree(directory)
+
+  def test_deep_tree(self):
+    depth = 2000
+    lines = ['n0:'] + ['%s- n%d:' % ('  ' * level, level)
+                       for level in range(1, depth)]
+    tree, = buildTreesFromYamlInput('\n'.join(lines))
+    self.assertEqual(depth, tree.size())
+    self.assertEqual(depth - 1, tree.depth_of(depth))
+
+if __name__ == '__main__':
+  unittest.main()
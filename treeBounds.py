@@ -0,0 +1,250 @@
+# Cheap bounds of the distance computed by treediff.computeDiff, used to
+# skip exact diffs in nearest neighbour searches and clustering.
+#
+# The lower bounds never exceed the distance and upperBound is the cost
+# of an actual (usually not optimal) mapping, so for any trees s and t
+#
+#   max(lowerBound(s, t), traversalBound(s, t))
+#       <= computeDiff(s, t)[0] <= upperBound(s, t)
+#
+# All of them take the costModel of computeDiff and ask it for the costs
+# of the distinct labels only. They run in O(n log n) except for
+# traversalBound, which aligns two strings in O(n * n') time and is
+# still much cheaper than the exact algorithms.
+
+from bisect import bisect_right
+
+from costModel import UNIT_COSTS
+from util.tree import LABELS
+
+
+# Returns the cost the model gives to every node, indexed by preorder
+# position (index 0 is unused). The model is asked once per label.
+def _nodeCosts(tree, costOf):
+  labelIds = tree.label_ids()
+  costOfLabelId = {}
+  costs = [0] * (tree.size() + 1)
+  for position in range(1, tree.size() + 1):
+    labelId = labelIds[position]
+    cost = costOfLabelId.get(labelId)
+    if cost is None:
+      cost = costOfLabelId[labelId] = costOf(LABELS.label_of(labelId))
+    costs[position] = cost
+  return costs
+
+# Returns the sum of the count smallest costs of the nodes
+def _cheapestSum(costs, count):
+  return sum(sorted(costs[1:])[:count])
+
+# Returns a lower bound from the sizes and the depths of the trees: the
+# size difference has to be deleted (or inserted) and, since the mapping
+# keeps the ancestors, so do the nodes of a longest root path beyond the
+# depth of the other tree.
+#
+# @parameter sourceTree the source tree (Tree)
+# @parameter targetTree the target tree (Tree)
+# @parameter costModel the costs of the edit operations
+#        (costModel.CostModel), unit costs if None
+# @returns number
+def sizeAndDepthBound(sourceTree, targetTree, costModel=None):
+  costModel = costModel or UNIT_COSTS
+  deleteCosts = _nodeCosts(sourceTree, costModel.deleteCost)
+  insertCosts = _nodeCosts(targetTree, costModel.insertCost)
+  sizeDifference = sourceTree.size() - targetTree.size()
+  depthDifference = (max(sourceTree.depths()[1:]) -
+                     max(targetTree.depths()[1:]))
+  if sizeDifference >= 0:
+    sizeBound = _cheapestSum(deleteCosts, sizeDifference)
+  else:
+    sizeBound = _cheapestSum(insertCosts, -sizeDifference)
+  if depthDifference >= 0:
+    depthBound = _cheapestSum(deleteCosts, depthDifference)
+  else:
+    depthBound = _cheapestSum(insertCosts, -depthDifference)
+  return max(sizeBound, depthBound)
+
+# Returns a lower bound from the label histograms of the trees. The nodes
+# left over when the nodes with equal labels are paired up have to be
+# changed, deleted or inserted. With unit costs this is half of the L1
+# distance of the histograms plus half of the size difference.
+#
+# @parameter sourceTree the source tree (Tree)
+# @parameter targetTree the target tree (Tree)
+# @parameter costModel the costs of the edit operations
+#        (costModel.CostModel), unit costs if None
+# @returns number
+def labelBound(sourceTree, targetTree, costModel=None):
+  costModel = costModel or UNIT_COSTS
+  counts = {}
+  for labelId in sourceTree.label_ids()[1:]:
+    counts[labelId] = counts.get(labelId, 0) + 1
+  common = 0
+  for labelId in targetTree.label_ids()[1:]:
+    if counts.get(labelId, 0) > 0:
+      counts[labelId] -= 1
+      common += 1
+  sourceLeft = sourceTree.size() - common
+  targetLeft = targetTree.size() - common
+  if sourceLeft == 0 and targetLeft == 0:
+    return 0
+
+  deleteCosts = _nodeCosts(sourceTree, costModel.deleteCost)
+  insertCosts = _nodeCosts(targetTree, costModel.insertCost)
+  cheapestDelete = min(deleteCosts[1:])
+  cheapestInsert = min(insertCosts[1:])
+  cheapestRelabel = costModel.minimumRelabelCost(
+      _labels(sourceTree), _labels(targetTree))
+  # The cost is linear in the number of changes, so the cheapest is at
+  # no change or at as many changes as possible.
+  changes = min(sourceLeft, targetLeft)
+  return min(
+      sourceLeft * cheapestDelete + targetLeft * cheapestInsert,
+      changes * cheapestRelabel +
+      (sourceLeft - changes) * cheapestDelete +
+      (targetLeft - changes) * cheapestInsert)
+
+# Returns the distinct labels of the tree
+def _labels(tree):
+  return [LABELS.label_of(labelId) for labelId in set(tree.label_ids()[1:])]
+
+# Returns the largest of the O(n log n) lower bounds above. computeDiff
+# checks it before filling any table when it is given a maxDistance.
+#
+# @parameter sourceTree the source tree (Tree)
+# @parameter targetTree the target tree (Tree)
+# @parameter costModel the costs of the edit operations
+#        (costModel.CostModel), unit costs if None
+# @returns number
+def lowerBound(sourceTree, targetTree, costModel=None):
+  return max(sizeAndDepthBound(sourceTree, targetTree, costModel),
+             labelBound(sourceTree, targetTree, costModel))
+
+# Returns the string edit distance between the node sequences of the
+# trees in preorder or in postorder, whichever is larger. A mapping of
+# the trees keeps both orders, so it is also an alignment of the two
+# sequences with the same cost and the distance cannot be smaller.
+#
+# @parameter sourceTree the source tree (Tree)
+# @parameter targetTree the target tree (Tree)
+# @parameter costModel the costs of the edit operations
+#        (costModel.CostModel), unit costs if None
+# @returns number
+def traversalBound(sourceTree, targetTree, costModel=None):
+  costs = (costModel or UNIT_COSTS).editCosts(sourceTree, targetTree)
+  preorderBound = _stringDistance(
+      range(1, sourceTree.size() + 1), range(1, targetTree.size() + 1), costs)
+  postorderBound = _stringDistance(
+      [node.preorder_position() for node in sourceTree.postorder_iterator()],
+      [node.preorder_position() for node in targetTree.postorder_iterator()],
+      costs)
+  return max(preorderBound, postorderBound)
+
+# Returns the edit distance of two sequences of preorder positions keeping
+# one row of the table
+def _stringDistance(sourcePositions, targetPositions, costs):
+  insertCosts = costs.insertCosts
+  previous = [0]
+  for j in targetPositions:
+    previous.append(previous[-1] + insertCosts[j])
+  for i in sourcePositions:
+    deleteCost = costs.deleteCosts[i]
+    relabelCosts = costs.relabelCosts[i]
+    current = [previous[0] + deleteCost]
+    for y, j in enumerate(targetPositions):
+      current.append(min(previous[y + 1] + deleteCost,
+                         current[y] + insertCosts[j],
+                         previous[y] + relabelCosts[j]))
+    previous = current
+  return previous[-1]
+
+# Returns the cost of a top-down mapping built greedily, which is an upper
+# bound of the distance. The roots are mapped to each other. Then the
+# children of every pair of mapped nodes are paired up in order: first the
+# children with equal labels, then the remaining ones between two such
+# pairs position by position when changing one into the other is cheaper
+# than deleting and inserting them. Paired children are mapped the same
+# way, the subtrees of the others are deleted or inserted.
+#
+# @parameter sourceTree the source tree (Tree)
+# @parameter targetTree the target tree (Tree)
+# @parameter costModel the costs of the edit operations
+#        (costModel.CostModel), unit costs if None
+# @returns number
+def upperBound(sourceTree, targetTree, costModel=None):
+  costModel = costModel or UNIT_COSTS
+  deleteCosts = _nodeCosts(sourceTree, costModel.deleteCost)
+  insertCosts = _nodeCosts(targetTree, costModel.insertCost)
+  subtreeDeleteCosts = _subtreeSums(sourceTree, deleteCosts)
+  subtreeInsertCosts = _subtreeSums(targetTree, insertCosts)
+  sourceChildren = _childLists(sourceTree)
+  targetChildren = _childLists(targetTree)
+  sourceLabelIds = sourceTree.label_ids()
+  targetLabelIds = targetTree.label_ids()
+  relabelCosts = {}
+
+  def relabelCost(i, j):
+    pair = (sourceLabelIds[i], targetLabelIds[j])
+    cost = relabelCosts.get(pair)
+    if cost is None:
+      cost = relabelCosts[pair] = costModel.relabelCost(
+          LABELS.label_of(pair[0]), LABELS.label_of(pair[1]))
+    return cost
+
+  total = 0
+  pending = [(1, 1)]
+  while pending:
+    i, j = pending.pop()
+    total += relabelCost(i, j)
+    children = sourceChildren[i]
+    otherChildren = targetChildren[j]
+
+    # Children with equal labels, paired greedily in order
+    indicesOfLabel = {}
+    for index, child in enumerate(otherChildren):
+      indicesOfLabel.setdefault(targetLabelIds[child], []).append(index)
+    matches = []
+    lastIndex = -1
+    for index, child in enumerate(children):
+      indices = indicesOfLabel.get(sourceLabelIds[child])
+      if indices:
+        k = bisect_right(indices, lastIndex)
+        if k < len(indices):
+          lastIndex = indices[k]
+          matches.append((index, lastIndex))
+    matches.append((len(children), len(otherChildren)))
+
+    # The children between two matches
+    previousIndex, previousOtherIndex = 0, 0
+    for index, otherIndex in matches:
+      gap = children[previousIndex:index]
+      otherGap = otherChildren[previousOtherIndex:otherIndex]
+      for child, otherChild in zip(gap, otherGap):
+        if relabelCost(child, otherChild) <= (
+            deleteCosts[child] + insertCosts[otherChild]):
+          pending.append((child, otherChild))
+        else:
+          total += subtreeDeleteCosts[child] + subtreeInsertCosts[otherChild]
+      for child in gap[len(otherGap):]:
+        total += subtreeDeleteCosts[child]
+      for otherChild in otherGap[len(gap):]:
+        total += subtreeInsertCosts[otherChild]
+      if index < len(children):
+        pending.append((children[index], otherChildren[otherIndex]))
+      previousIndex, previousOtherIndex = index + 1, otherIndex + 1
+  return total
+
+# Returns the preorder positions of the children of every node
+def _childLists(tree):
+  fathers = tree.father_positions()
+  children = [[] for _ in range(tree.size() + 1)]
+  for position in range(2, tree.size() + 1):
+    children[fathers[position]].append(position)
+  return children
+
+# Returns the sums of the given node costs over every subtree
+def _subtreeSums(tree, costs):
+  fathers = tree.father_positions()
+  sums = list(costs)
+  for position in range(tree.size(), 1, -1):
+    sums[fathers[position]] += sums[position]
+  return sums
@@ -8,6 +8,23 @@
 # missing piece in the algorithm provided in the paper which is
 # MIN_M(i, 1) and MIN_M(1, j) values. We added the computation
 # of these in the implementation below.
+#
+# The algorithm maps the roots of the two trees to each other, so
+# MIN_M(1, 1) and D(1, 1) are the cost of changing the source root
+# into the target root.
+
+from costModel import UNIT_COSTS
+from treeBounds import lowerBound
+from util.compact_tree import CompactTree
+
+# The phases in C (see taiAccelerator.c), if buildAccelerator.py built
+# them. computeE, computeMIN_M and computeD run them instead of their own
+# loops when they can (see _compiledCosts).
+try:
+  from _taiAccelerator import ffi as _ffi
+  from _taiAccelerator import lib as _accelerator
+except ImportError:
+  _ffi = _accelerator = None
 
 INFINITE = float("inf")
 
@@ -27,188 +44,770 @@ def r(a, b):
   else:  # Insert, Delete, Change.
     return 1
 
-def keyForE(s, u, i, t, v, j):
-  return '%d:%d:%d, %d:%d:%d' % (s, u, i, t, v, j)
+# What the DP phases remember for every table entry besides its cost.
+# KEEP_MAPPINGS stores the mapping of every entry, KEEP_CHOICES stores
+# which option of the recurrence produced the entry so that the single
+# optimal mapping can be rebuilt at the end (see _traceback) and
+# KEEP_NOTHING only keeps the costs.
+KEEP_MAPPINGS = 'mappings'
+KEEP_CHOICES = 'choices'
+KEEP_NOTHING = 'nothing'
+
+# The mappings kept under KEEP_MAPPINGS share their pairs with the
+# mappings they are built from instead of copying them, so extending a
+# mapping takes constant time. A mapping is
+#
+#   (pair, mapping)              the pairs of mapping and pair
+#   (mapping, mapping, None)     the pairs of both mappings
+#
+# and the empty mapping is None. flattenMapping turns one into a list.
+
+# Returns the sorted list of the distinct pairs of a mapping of the
+# tables of KEEP_MAPPINGS
+def flattenMapping(mapping):
+  pairs = set()
+  # The mappings are shared between many others, each is walked once
+  seen = set()
+  pending = [mapping]
+  while pending:
+    mapping = pending.pop()
+    while mapping is not None and id(mapping) not in seen:
+      seen.add(id(mapping))
+      if len(mapping) == 3:
+        pending.append(mapping[1])
+        mapping = mapping[0]
+      else:
+        pairs.add(mapping[0])
+        mapping = mapping[1]
+  return sorted(pairs)
+
+# Choices recorded in the E, MIN_M and D phases under KEEP_CHOICES
+_FROM_LEFT_CHILD_CHAIN = 1
+_FROM_RIGHT_CHILD_CHAIN = 2
+_FROM_SPLIT = 3
+_FROM_INSERT = 1
+_FROM_DELETE = 2
+_FROM_MIN_M = 3
+
+# The DP phases below do not call r() in their loops. They index the
+# arrays of a costModel.EditCosts instead, which are the unit costs of
+# r() unless computeDiff is given another CostModel.
+
+# Integer addressing of the DP tables.
+#
+# Every E entry is identified by two chains s <= u <= i and t <= v <= j
+# where s, u are ancestors of i (and t, v of j). Such a chain is fully
+# determined by i and the depths of s and u, so the chains of node i are
+# numbered consecutively starting at pairOffset[i]:
+#
+#   pairOffset[i] + depth(u) * (depth(u) + 1) / 2 + depth(s)
+#
+# The E table is then a flat list where the entry for the chains
+# (s, u, i) and (t, v, j) lives at
+# sourceChain * targetIndex.pairs + targetChain. MIN_M and D are flat
+# (size + 1) x (size' + 1) lists addressed by i * (size' + 1) + j.
+class _TreeIndex(object):
+  def __init__(self, tree):
+    self.size = tree.size()
+    # The caches of Tree.build_caches, indexed by preorder position:
+    # depth[i] is 0 for the root, father[i] is the position of the father
+    # (0 for the root) and ancestors[i][d] is the ancestor of i at depth d.
+    self.depth = tree.depths()
+    self.father = tree.father_positions()
+    self.ancestors = tree.root_paths()
+    self.pairOffset = [0] * (self.size + 2)
+    for i in range(1, self.size + 1):
+      self.pairOffset[i + 1] = (
+          self.pairOffset[i] + _chainCount(self.depth[i] + 1))
+    self.pairs = self.pairOffset[self.size + 1]
+
+  # Returns the number of the chain s <= u <= i given the depths of s, u
+  def chain(self, i, depthOfS, depthOfU):
+    return self.pairOffset[i] + _chainCount(depthOfU) + depthOfS
+
+# Returns the number of (s, u) pairs with depth(s) <= depth(u) < depth
+def _chainCount(depth):
+  return depth * (depth + 1) // 2
+
+# Pruning of the DP tables when only distances up to a limit matter.
+#
+# Every entry of E, MIN_M and D for the nodes i and j covers a part of
+# the preorder prefixes 1..i and 1..j, and the rest of the trees still
+# has to be edited after it. Each node of the size difference of two
+# parts costs at least cheapest, the smallest insert or delete cost, so
+# an entry can only lead to a distance below the limit if
+#
+#   cheapest * (|i - j| + |(size - i) - (size' - j)|) <= limit
+#
+# which holds for j in a band around i. The entries outside the band are
+# not computed. The MIN_M and D entries whose cost plus rest(i, j) exceeds
+# the limit are dropped as well, so their mappings are never built.
+class _Band(object):
+  def __init__(self, sourceSize, targetSize, costs, limit):
+    self.targetSize = targetSize
+    self.sizeDifference = targetSize - sourceSize
+    self.cheapest = costs.minimumInsertOrDelete()
+    if limit == INFINITE or self.cheapest <= 0:
+      width = sourceSize + targetSize
+    else:
+      width = int(limit // self.cheapest)
+    # |j - i| + |sizeDifference - (j - i)| grows by 2 for every step of
+    # j - i out of the range between 0 and sizeDifference
+    slack = (width - abs(self.sizeDifference)) // 2
+    if slack < 0:
+      self.lowest, self.highest = 1, 0
+    else:
+      self.lowest = min(0, self.sizeDifference) - slack
+      self.highest = max(0, self.sizeDifference) + slack
+
+  # Returns the lowest j in the band of source node i
+  def first(self, i):
+    return max(1, i + self.lowest)
+
+  # Returns the highest j in the band of source node i
+  def last(self, i):
+    return min(self.targetSize, i + self.highest)
+
+  # Returns the least cost of editing the nodes after i and j
+  def rest(self, i, j):
+    return self.cheapest * abs(self.sizeDifference - (j - i))
+
+# The tables of an earlier run of the phases on the same trees, which
+# changed since then at or after the preorder positions firstSource and
+# firstTarget only (see diffSession). The entries of i and j only depend
+# on the nodes up to i and up to j in preorder, so the phases take over
+# the entries with i < firstSource and j < firstTarget and only compute
+# the others. The tables are the ones of KEEP_CHOICES and are laid out
+# for a target tree with targetPairs chains and targetSize nodes.
+class _KeptTables(object):
+  def __init__(self, firstSource, firstTarget, targetPairs, targetSize,
+               E, choicesForE, MIN_M, choicesForMinM, D, choicesForD):
+    self.firstSource = firstSource
+    self.firstTarget = firstTarget
+    self.targetPairs = targetPairs
+    self.targetSize = targetSize
+    self.E = E
+    self.choicesForE = choicesForE
+    self.MIN_M = MIN_M
+    self.choicesForMinM = choicesForMinM
+    self.D = D
+    self.choicesForD = choicesForD
+
+  # Returns the first j to compute for source node i from the first j of
+  # the band
+  def first(self, i, j):
+    if i < self.firstSource:
+      return max(j, self.firstTarget)
+    return j
+
+# Copies the first columns entries of the first rows rows of oldTable,
+# whose rows have oldWidth entries, to table, whose rows have width
+# entries
+def _copyRows(table, oldTable, rows, columns, width, oldWidth):
+  for k in range(rows):
+    table[k * width:k * width + columns] = (
+        oldTable[k * oldWidth:k * oldWidth + columns])
+
+# The compiled phases add up doubles where the Python loops add up the
+# costs as they are. Both give the same numbers when the costs are all
+# floats or all whole numbers whose sums fit the 52 bits of a double; the
+# sums in the tables never exceed twice the cost of deleting and
+# inserting every node and relabelling every source node at its highest
+# cost. With a mix of both, the type of a distance of the loops depends
+# on the costs on its way, so they are left to the loops.
+_EXACT_IN_DOUBLES = 2 ** 52
+
+# The costs of an EditCosts as arrays of doubles for _accelerator.
+# integral tells whether they are all whole numbers (int or long), whose
+# distances the Python phases give as whole numbers, rather than floats.
+class _CompiledCosts(object):
+  def __init__(self, costs, integral):
+    self.integral = integral
+    self.deleteCosts = _ffi.new('double[]', costs.deleteCosts)
+    self.insertCosts = _ffi.new('double[]', costs.insertCosts)
+    self.relabelCosts = _ffi.new(
+        'double[]', [cost for row in costs.relabelCosts for cost in row])
+
+# Returns the _CompiledCosts of costs if the phases can run in
+# _accelerator with them, None otherwise: the compiled phases do not
+# build mappings and do not take over kept tables, and the costs (and
+# the limit) must be exact in doubles. The callers running more than one
+# phase build it once and hand it to every phase.
+def _compiledCosts(costs, keep, limit, kept):
+  if _accelerator is None or keep == KEEP_MAPPINGS or kept is not None:
+    return None
+  if not isinstance(limit, float) and abs(limit) >= _EXACT_IN_DOUBLES:
+    return None
+  nodeCosts = costs.deleteCosts[1:] + costs.insertCosts[1:]
+  relabelCosts = [row[1:] for row in costs.relabelCosts[1:]]
+  wholeNumbers = (int, long)
+  if (all(isinstance(cost, wholeNumbers) for cost in nodeCosts) and
+      all(isinstance(cost, wholeNumbers)
+          for row in relabelCosts for cost in row)):
+    total = (sum(abs(cost) for cost in nodeCosts) +
+             sum(max(abs(cost) for cost in row) for row in relabelCosts))
+    if 2 * total < _EXACT_IN_DOUBLES:
+      return _CompiledCosts(costs, True)
+  elif (all(isinstance(cost, float) for cost in nodeCosts) and
+        all(isinstance(cost, float) for row in relabelCosts for cost in row)):
+    return _CompiledCosts(costs, False)
+  return None
+
+# The arrays of a _TreeIndex for _accelerator (struct tai_tree), with the
+# ancestor of i at depth d at ancestors[i * (maximum depth + 1) + d]
+def _compiledTree(index):
+  width = max(index.depth) + 1
+  ancestors = [0] * ((index.size + 1) * width)
+  for i in range(1, index.size + 1):
+    path = index.ancestors[i]
+    ancestors[i * width:i * width + len(path)] = path
+  arrays = [_ffi.new('long[]', list(values)) for values in (
+      index.depth, index.father, index.pairOffset, ancestors)]
+  tree = _ffi.new('struct tai_tree *', {
+      'size': index.size,
+      'depth': arrays[0],
+      'father': arrays[1],
+      'pairOffset': arrays[2],
+      'ancestors': arrays[3],
+      'ancestorsWidth': width})
+  # The struct does not keep the arrays it points to alive
+  return tree, arrays
+
+# Returns the _Band of the limit for _accelerator (struct tai_band)
+def _compiledBand(band, limit):
+  return _ffi.new('struct tai_band *', {
+      'targetSize': band.targetSize,
+      'lowest': band.lowest,
+      'highest': band.highest,
+      'sizeDifference': band.sizeDifference,
+      'cheapest': band.cheapest,
+      'limit': limit})
+
+# computeE, computeMIN_M and computeD under KEEP_CHOICES or KEEP_NOTHING
+# in _accelerator, with the _CompiledCosts compiled. They give the same
+# tables and choices as the Python loops, with the costs as floats.
+def _compiledE(source, target, keep, compiled, band, limit):
+  sourceTree, sourceArrays = _compiledTree(source)
+  targetTree, targetArrays = _compiledTree(target)
+  entries = source.pairs * target.pairs
+  E = _ffi.new('double[]', entries)
+  choices = (_ffi.new('unsigned char[]', entries) if keep == KEEP_CHOICES
+             else _ffi.NULL)
+  _accelerator.tai_compute_e(
+      sourceTree, targetTree, compiled.deleteCosts, compiled.insertCosts,
+      compiled.relabelCosts, _compiledBand(band, limit), E, choices)
+  return _ffi.unpack(E, entries), _compiledChoices(choices, entries)
+
+def _compiledMIN_M(E, source, target, keep, compiled, band, limit):
+  sourceTree, sourceArrays = _compiledTree(source)
+  targetTree, targetArrays = _compiledTree(target)
+  entries = (source.size + 1) * (target.size + 1)
+  MIN_M = _ffi.new('double[]', entries)
+  choices = (_ffi.new('long[]', entries) if keep == KEEP_CHOICES
+             else _ffi.NULL)
+  _accelerator.tai_compute_min_m(
+      sourceTree, targetTree, compiled.deleteCosts, compiled.insertCosts,
+      compiled.relabelCosts, _compiledBand(band, limit),
+      _ffi.new('double[]', E), MIN_M, choices)
+  if choices != _ffi.NULL:
+    choices = _ffi.unpack(choices, entries)
+  else:
+    choices = None
+  return _ffi.unpack(MIN_M, entries), choices
+
+def _compiledD(MIN_M, sourceSize, targetSize, keep, compiled, band, limit):
+  # computeD only reads the sizes of the trees
+  sourceTree = _ffi.new('struct tai_tree *', {'size': sourceSize})
+  targetTree = _ffi.new('struct tai_tree *', {'size': targetSize})
+  entries = (sourceSize + 1) * (targetSize + 1)
+  D = _ffi.new('double[]', entries)
+  choices = (_ffi.new('unsigned char[]', entries) if keep == KEEP_CHOICES
+             else _ffi.NULL)
+  _accelerator.tai_compute_d(
+      sourceTree, targetTree, compiled.deleteCosts, compiled.insertCosts,
+      compiled.relabelCosts, _compiledBand(band, limit),
+      _ffi.new('double[]', MIN_M), D, choices)
+  return _ffi.unpack(D, entries), _compiledChoices(choices, entries)
+
+# Returns a distance of D as the Python loops give it: the compiled phases
+# give a float, which the loops give as a whole number if the costs are.
+# compiled is the _CompiledCosts the phases ran with, None if they ran in
+# Python.
+def _phaseDistance(distance, compiled):
+  if (compiled is not None and compiled.integral and
+      isinstance(distance, float) and distance != INFINITE):
+    return int(distance)
+  return distance
+
+# Returns the bytearray of the choices of E or D, None for _ffi.NULL
+def _compiledChoices(choices, entries):
+  if choices == _ffi.NULL:
+    return None
+  return bytearray(_ffi.buffer(choices, entries))
 
 # Returns the E mapping. Check the paper to understand what
 # the mapping mean.
 #
 # @parameter sourceTree the source tree (Tree)
 # @parameter targetTree the target tree (Tree)
-# @returns (dict, dict)
-#        The first dict is in the format {'i:j:k, p:q:r' => cost} where 
-#        i, j, k, p, q, r are integers. The second dict is in the format
-#        {'i:j:k, p:q:r' => mapping} where mapping is a list of
+# @parameter keep one of KEEP_MAPPINGS, KEEP_CHOICES, KEEP_NOTHING
+# @parameter costs the costs of the edit operations (costModel.EditCosts),
+#        unit costs if None
+# @parameter limit entries which can only lead to a distance above it are
+#        left INFINITE (see _Band)
+# @parameter kept the tables of an earlier run to take entries over from
+#        (_KeptTables), not with KEEP_MAPPINGS
+# @parameter compiled the costs for the accelerator from _compiledCosts
+#        for these keep, limit and kept, checked here if None
+# @returns (list, list)
+#        The first list holds the E costs and the second list holds
+#        the E mappings (or the choices under KEEP_CHOICES, None under
+#        KEEP_NOTHING), both addressed as described at _TreeIndex.
+#        A mapping (see flattenMapping) holds
 #         (x, y) pairs showing which node at the preorder position x
 #         in the source tree is mapped to which node at the preorder
 #         position y in the target tree. If x is ALPHA, then it shows
 #         the node at the preorder position y in the target tree is
 #         inserted. If y is ALPHA, then it shows the node at the preorder
 #         position x in the souce tree is deleted.
-def computeE(sourceTree, targetTree):
-  E = {}
-  mappingForE = {}
-  for i in range(1, sourceTree.size() + 1):
-    for j in range(1, targetTree.size() + 1):
-      for u in sourceTree.ancestor_iterator(i):
-        for s in sourceTree.ancestor_iterator(u):
-          for v in targetTree.ancestor_iterator(j):
-            for t in targetTree.ancestor_iterator(v):
-              key = keyForE(s, u, i, t, v, j)
-              if (s == u and u == i) and (t == v and v == j):
-                E[key] = r(sourceTree.node_at(i), targetTree.node_at(j))
-                mappingForE[key] = [(i,j)]
-              elif (s == u and u == i) or (t < v and v == j):
-                f_j = targetTree.father_of(j).preorder_position()
-                dependentKey = keyForE(s, u, i, t, f_j, j - 1)
-                E[key] = E[dependentKey] + r(ALPHA, targetTree.node_at(j))
-                mappingForE[key] = mappingForE[dependentKey] + [(ALPHA, j)]
-              elif (s < u and u == i) or (t == v and v == j):
-                f_i = sourceTree.father_of(i).preorder_position()
-                dependentKey = keyForE(s, f_i, i - 1, t, v, j)
-                E[key] = E[dependentKey] + r(sourceTree.node_at(i), ALPHA)
-                mappingForE[key] = mappingForE[dependentKey] + [(i, ALPHA)]
-              else:
-                xNode = sourceTree.child_on_path_from_descendant(u, i)
-                x = xNode.preorder_position()
-                yNode = targetTree.child_on_path_from_descendant(v, j)
-                y = yNode.preorder_position()
-                dependentKey1 = keyForE(s, x, i, t, v, j)
-                dependentKey2 = keyForE(s, u, i, t, y, j)
-                dependentKey3 = keyForE(s, u, x - 1, t, v, y - 1)
-                dependentKey4 = keyForE(x, x, i, y, y, j)
-                E[key] = min(
-                    E[dependentKey1],
-                    E[dependentKey2],
-                    E[dependentKey3] + E[dependentKey4])
-                # Remember the mapping.
-                if E[key] == E[dependentKey1]:
-                  mappingForE[key] = mappingForE[dependentKey1]
-                elif E[key] == E[dependentKey2]:
-                  mappingForE[key] = mappingForE[dependentKey2]
-                else:
-                  mappingForE[key] = (
-                      mappingForE[dependentKey3] + 
-                      mappingForE[dependentKey4])
-
-  return E, mappingForE
+def computeE(sourceTree, targetTree, keep=KEEP_MAPPINGS, costs=None,
+             limit=INFINITE, kept=None, compiled=None):
+  source = _TreeIndex(sourceTree)
+  target = _TreeIndex(targetTree)
+  width = target.pairs
+  if costs is None:
+    costs = UNIT_COSTS.editCosts(sourceTree, targetTree)
+  band = _Band(source.size, target.size, costs, limit)
+  if compiled is None:
+    compiled = _compiledCosts(costs, keep, limit, kept)
+  if compiled is not None:
+    return _compiledE(source, target, keep, compiled, band, limit)
+  E = [INFINITE] * (source.pairs * width)
+  keepMappings = keep == KEEP_MAPPINGS
+  keepChoices = keep == KEEP_CHOICES
+  mappingForE = [None] * len(E) if keepMappings else None
+  choicesForE = bytearray(len(E)) if keepChoices else None
+  if kept is not None:
+    if keepMappings:
+      raise ValueError('Kept tables have no mappings', keep)
+    rows = source.pairOffset[kept.firstSource]
+    columns = target.pairOffset[kept.firstTarget]
+    _copyRows(E, kept.E, rows, columns, width, kept.targetPairs)
+    if keepChoices:
+      _copyRows(choicesForE, kept.choicesForE, rows, columns, width,
+                kept.targetPairs)
+  records = mappingForE if keepMappings else choicesForE
+  rowOfE = lambda p: (E, records, source.pairOffset[p] * width)
+  for i in range(1, source.size + 1):
+    firstJ = band.first(i)
+    if kept is not None:
+      firstJ = kept.first(i, firstJ)
+    _fillRowOfE(i, firstJ, band.last(i), source, target, costs, keep,
+                rowOfE)
 
-# Returns the key for MIN_M map
-def keyForMIN_M(s, t):
-  return '%d:%d' % (s, t)
+  return E, mappingForE if keepMappings else choicesForE
 
 # Returns the MIN_M mapping. Check out the article to see
 # what the mapping mean
 #
-# @parameter E computed by computeE (dict)
+# @parameter E computed by computeE (list)
+# @parameter mappingForE computed by computeE (list)
 # @parameter sourceTree the source tree (Tree)
 # @parameter targetTree the target tree (Tree)
-# @returns (dict, dict)
-#        The first dict is the MIN_M map (key to cost). The second
-#        dict is (key to list of integer pairs) the transformation mapping
+# @parameter keep one of KEEP_MAPPINGS, KEEP_CHOICES, KEEP_NOTHING
+# @parameter costs the costs of the edit operations (costModel.EditCosts),
+#        unit costs if None
+# @parameter limit entries which can only lead to a distance above it are
+#        left INFINITE (see _Band)
+# @parameter kept the tables of an earlier run to take entries over from
+#        (_KeptTables), not with KEEP_MAPPINGS
+# @parameter compiled the costs for the accelerator from _compiledCosts
+#        for these keep, limit and kept, checked here if None
+# @returns (list, list)
+#        The first list is the MIN_M table (costs) addressed by
+#        i * (targetTree.size() + 1) + j. The second list is the
+#        transformation mapping (see flattenMapping) for each entry
+#        (under KEEP_CHOICES the MIN_M key of the chosen (s, t) instead,
+#        None under KEEP_NOTHING)
 #        where a pair (x, y) shows which node at the preorder position x
 #         in the source tree is mapped to which node at the preorder
 #         position y in the target tree. If x is ALPHA, then it shows
 #         the node at the preorder position y in the target tree is
 #         inserted. If y is ALPHA, then it shows the node at the preorder
 #         position x in the souce tree is deleted.
-def computeMIN_M(E, mappingForE, sourceTree, targetTree):
-  MIN_M = {keyForMIN_M(1, 1) : 0}
-  mappingForMinM = {keyForMIN_M(1, 1) : [(1, 1)]}
-  
-  # This part is missing in the paper
-  for j in range(2, targetTree.size()):
-    MIN_M[keyForMIN_M(1, j)] = (
-        MIN_M[keyForMIN_M(1, j - 1)] +
-        r(ALPHA, targetTree.node_at(j)))
-    mappingForMinM[keyForMIN_M(1, j)] = (
-        mappingForMinM[keyForMIN_M(1, j - 1)] + [(ALPHA, j)])
+def computeMIN_M(E, mappingForE, sourceTree, targetTree, keep=KEEP_MAPPINGS,
+                 costs=None, limit=INFINITE, kept=None, compiled=None):
+  source = _TreeIndex(sourceTree)
+  target = _TreeIndex(targetTree)
+  width = target.pairs
+  row = target.size + 1
+  if costs is None:
+    costs = UNIT_COSTS.editCosts(sourceTree, targetTree)
+  band = _Band(source.size, target.size, costs, limit)
+  if compiled is None:
+    compiled = _compiledCosts(costs, keep, limit, kept)
+  if compiled is not None:
+    return _compiledMIN_M(E, source, target, keep, compiled, band, limit)
+  MIN_M = [INFINITE] * ((source.size + 1) * row)
+  keepMappings = keep == KEEP_MAPPINGS
+  keepChoices = keep == KEEP_CHOICES
+  mappingForMinM = [None] * len(MIN_M) if keepMappings else None
+  choicesForMinM = [0] * len(MIN_M) if keepChoices else None
+  if kept is not None:
+    if keepMappings:
+      raise ValueError('Kept tables have no mappings', keep)
+    oldRow = kept.targetSize + 1
+    _copyRows(MIN_M, kept.MIN_M, kept.firstSource, kept.firstTarget, row,
+              oldRow)
+    if keepChoices:
+      # The choices are MIN_M keys of the old layout
+      for i in range(2, kept.firstSource):
+        for j in range(2, kept.firstTarget):
+          s, t = divmod(kept.choicesForMinM[i * oldRow + j], oldRow)
+          choicesForMinM[i * row + j] = s * row + t
+  records = mappingForMinM if keepMappings else choicesForMinM
+  rowOfE = lambda p: (E, mappingForE, source.pairOffset[p] * width)
+  rowOfMinM = lambda p: (MIN_M, records, p * row)
+  for i in range(1, source.size + 1):
+    firstJ = band.first(i)
+    if kept is not None:
+      firstJ = kept.first(i, firstJ)
+    _fillRowOfMinM(i, firstJ, band.last(i), source, target, costs, keep,
+                   limit, band, rowOfE, rowOfMinM)
 
-  # This part is missing in the paper
-  for i in range(2, sourceTree.size()):
-    MIN_M[keyForMIN_M(i, 1)] = (
-        MIN_M[keyForMIN_M(i - 1, 1)] +
-        r(sourceTree.node_at(i), ALPHA))
-    mappingForMinM[keyForMIN_M(i, 1)] = (
-        mappingForMinM[keyForMIN_M(i - 1, 1)] + [(i, ALPHA)])
-  
-  for i in range(2, sourceTree.size() + 1):
-    for j in range(2, targetTree.size() + 1):
-      keyForMIN_M_i_j= keyForMIN_M(i, j)
-      MIN_M[keyForMIN_M_i_j] = INFINITE
-      f_i = sourceTree.father_of(i).preorder_position()
-      f_j = targetTree.father_of(j).preorder_position()
-
-      for s in sourceTree.ancestor_iterator(f_i):
-        for t in targetTree.ancestor_iterator(f_j):
-          dependentKeyForE = keyForE(s, f_i, i - 1, t, f_j, j - 1)
-          dependentKeyForM = keyForMIN_M(s, t)
-          temp = (MIN_M[dependentKeyForM] +
-                       E[dependentKeyForE] -
-                       r(sourceTree.node_at(s), targetTree.node_at(t)))
-          MIN_M[keyForMIN_M_i_j] = min(temp, MIN_M[keyForMIN_M_i_j])
-          if temp == MIN_M[keyForMIN_M_i_j]:
-            mappingForMinM[keyForMIN_M_i_j] = list(set(
-                mappingForMinM[dependentKeyForM] +
-                mappingForE[dependentKeyForE]))
-          
-      MIN_M[keyForMIN_M_i_j]  = (
-          MIN_M[keyForMIN_M_i_j]  +
-          r(sourceTree.node_at(i), targetTree.node_at(j)))
-      mappingForMinM[keyForMIN_M_i_j].append((i, j))
-
-  return MIN_M, mappingForMinM
-
-# Returns the key for D map
-def keyForD(i, j):
-  return '%d, %d' % (i, j)
+  return MIN_M, mappingForMinM if keepMappings else choicesForMinM
 
 # Returns the D mapping. Check out the article to see
 # what the mapping mean
 #
 # @parameter sourceTree the source tree (Tree)
 # @parameter targetTree the target tree (Tree)
-# @parameter MIN_M the MIN_M map (dict)
+# @parameter MIN_M the MIN_M table (list)
 # @parameter mappingForM the transformation details for MIN_M
-# @returns (dict, dict)
-#        The first dict is the D mapping (key to cost).
-#        The second dict is (key to list of integer pairs) the transformation mapping
+# @parameter keep one of KEEP_MAPPINGS, KEEP_CHOICES, KEEP_NOTHING
+# @parameter costs the costs of the edit operations (costModel.EditCosts),
+#        unit costs if None
+# @parameter limit entries which can only lead to a distance above it are
+#        left INFINITE (see _Band)
+# @parameter kept the tables of an earlier run to take entries over from
+#        (_KeptTables), not with KEEP_MAPPINGS
+# @parameter compiled the costs for the accelerator from _compiledCosts
+#        for these keep, limit and kept, checked here if None
+# @returns (list, list)
+#        The first list is the D table (costs) addressed by
+#        i * (targetTree.size() + 1) + j.
+#        The second list is the transformation mapping (see
+#        flattenMapping) for each entry (the choices under KEEP_CHOICES,
+#        None under KEEP_NOTHING)
 #        where a pair (x, y) shows which node at the preorder position x
 #         in the source tree is mapped to which node at the preorder
 #         position y in the target tree. If x is ALPHA, then it shows
 #         the node at the preorder position y in the target tree is
 #         inserted. If y is ALPHA, then it shows the node at the preorder
 #         position x in the souce tree is deleted.
-def computeD(sourceTree, targetTree, MIN_M, mappingForMinM):
-  D = {keyForD(1, 1) : 0}
-  mappingForD = {keyForD(1, 1) : [(1, 1)]}
-
-  for i in range(2, sourceTree.size() + 1):
-    D[keyForD(i, 1)] = D[keyForD(i - 1, 1)] + r(sourceTree.node_at(i), ALPHA)
-    mappingForD[keyForD(i, 1)] = (
-        mappingForD[keyForD(i - 1, 1)] + [(i, ALPHA)])
-
-  for j in range(2, targetTree.size() + 1):
-    D[keyForD(1, j)] = D[keyForD(1, j - 1)] + r(ALPHA, targetTree.node_at(j))
-    mappingForD[keyForD(1, j)] = (
-        mappingForD[keyForD(1, j - 1)] + [(ALPHA, j)])
-
-  for i in range(2, sourceTree.size() + 1):
-    for j in range(2, targetTree.size() + 1):
-      option1 = D[keyForD(i, j - 1)] + r(ALPHA, targetTree.node_at(j))
-      option2 = D[keyForD(i - 1, j)] + r(sourceTree.node_at(i), ALPHA),
-      option3 = MIN_M[keyForMIN_M(i, j)]
-      D[keyForD(i, j)] = min(option1, option2, option3)
-
-      if D[keyForD(i, j)] == option1:
-        mappingForD[keyForD(i,  j)] = (
-            mappingForD[keyForD(i, j - 1)] + [(ALPHA, j)])
-      elif D[keyForD(i, j)] == option2:
-        mappingForD[keyForD(i,  j)] = (
-            mappingForD[keyForD(i - 1, j)] + [(i, ALPHA)])
+def computeD(sourceTree, targetTree, MIN_M, mappingForMinM,
+             keep=KEEP_MAPPINGS, costs=None, limit=INFINITE, kept=None,
+             compiled=None):
+  row = targetTree.size() + 1
+  if costs is None:
+    costs = UNIT_COSTS.editCosts(sourceTree, targetTree)
+  band = _Band(sourceTree.size(), targetTree.size(), costs, limit)
+  if compiled is None:
+    compiled = _compiledCosts(costs, keep, limit, kept)
+  if compiled is not None:
+    return _compiledD(MIN_M, sourceTree.size(), targetTree.size(), keep,
+                      compiled, band, limit)
+  D = [INFINITE] * ((sourceTree.size() + 1) * row)
+  keepMappings = keep == KEEP_MAPPINGS
+  keepChoices = keep == KEEP_CHOICES
+  mappingForD = [None] * len(D) if keepMappings else None
+  choicesForD = bytearray(len(D)) if keepChoices else None
+  if kept is not None:
+    if keepMappings:
+      raise ValueError('Kept tables have no mappings', keep)
+    oldRow = kept.targetSize + 1
+    _copyRows(D, kept.D, kept.firstSource, kept.firstTarget, row, oldRow)
+    if keepChoices:
+      _copyRows(choicesForD, kept.choicesForD, kept.firstSource,
+                kept.firstTarget, row, oldRow)
+  records = mappingForD if keepMappings else choicesForD
+  rowOfMinM = lambda p: (MIN_M, mappingForMinM, p * row)
+  rowOfD = lambda p: (D, records, p * row)
+  for i in range(1, sourceTree.size() + 1):
+    firstJ = band.first(i)
+    if kept is not None:
+      firstJ = kept.first(i, firstJ)
+    _fillRowOfD(i, firstJ, band.last(i), targetTree.size(), costs, keep,
+                limit, band, rowOfMinM, rowOfD)
+  return D, mappingForD if keepMappings else choicesForD
+
+# The rows of the tables. The phases fill the tables one row, the
+# entries of one source node i, at a time with _fillRowOfE,
+# _fillRowOfMinM and _fillRowOfD, which computeE, computeMIN_M and
+# computeD run on the whole tables and boundedDiff on the rows it holds.
+# The rows are found through a function rowOf(p) returning the list of
+# the costs of the row of source node p, the list of its mappings (or
+# choices, None under KEEP_NOTHING) and the index of the first entry of
+# the row in both, laid out like the whole tables (see _TreeIndex).
+
+# Fills the entries of E for source node i and the target nodes firstJ
+# to lastJ
+def _fillRowOfE(i, firstJ, lastJ, source, target, costs, keep, rowOfE):
+  width = target.pairs
+  deleteCosts = costs.deleteCosts
+  insertCosts = costs.insertCosts
+  keepMappings = keep == KEEP_MAPPINGS
+  keepChoices = keep == KEEP_CHOICES
+  pathOfI = source.ancestors[i]
+  depthOfI = source.depth[i]
+  relabelCostsOfI = costs.relabelCosts[i]
+  E, records, base = rowOfE(i)
+  # The rows the deletions of i read (the row of i - 1) and the splits
+  # at the child x of u on the path to i (the row of x - 1), by depth(u)
+  lastE, lastRecords, lastBase = rowOfE(i - 1) if i > 1 else (None,) * 3
+  rowsOfSplits = [rowOfE(pathOfI[du + 1] - 1) for du in range(depthOfI)]
+  for j in range(firstJ, lastJ + 1):
+    pathOfJ = target.ancestors[j]
+    depthOfJ = target.depth[j]
+    for du in range(depthOfI, -1, -1):
+      for ds in range(du, -1, -1):
+        sourceChain = base + (_chainCount(du) + ds) * width
+        for dv in range(depthOfJ, -1, -1):
+          for dt in range(dv, -1, -1):
+            key = sourceChain + target.chain(j, dt, dv)
+            if (ds == du and du == depthOfI) and (
+                dt == dv and dv == depthOfJ):
+              E[key] = relabelCostsOfI[j]
+              if keepMappings:
+                records[key] = ((i, j), None)
+            elif (ds == du and du == depthOfI) or (
+                dt < dv and dv == depthOfJ):
+              dependentKey = sourceChain + target.chain(
+                  j - 1, dt, depthOfJ - 1)
+              E[key] = E[dependentKey] + insertCosts[j]
+              if keepMappings and E[key] != INFINITE:
+                records[key] = ((ALPHA, j), records[dependentKey])
+            elif (ds < du and du == depthOfI) or (
+                dt == dv and dv == depthOfJ):
+              dependentKey = (
+                  lastBase + (_chainCount(depthOfI - 1) + ds) * width +
+                  target.chain(j, dt, dv))
+              E[key] = lastE[dependentKey] + deleteCosts[i]
+              if keepMappings and E[key] != INFINITE:
+                records[key] = ((i, ALPHA), lastRecords[dependentKey])
+            else:
+              y = pathOfJ[dv + 1]
+              splitE, splitRecords, splitBase = rowsOfSplits[du]
+              dependentKey1 = (base + (_chainCount(du + 1) + ds) * width +
+                               target.chain(j, dt, dv))
+              dependentKey2 = sourceChain + target.chain(j, dt, dv + 1)
+              dependentKey3 = (splitBase + (_chainCount(du) + ds) * width +
+                               target.chain(y - 1, dt, dv))
+              dependentKey4 = (
+                  base + (_chainCount(du + 1) + du + 1) * width +
+                  target.chain(j, dv + 1, dv + 1))
+              E[key] = min(
+                  E[dependentKey1],
+                  E[dependentKey2],
+                  splitE[dependentKey3] + E[dependentKey4])
+              # Remember the mapping.
+              if keepMappings and E[key] != INFINITE:
+                if E[key] == E[dependentKey1]:
+                  records[key] = records[dependentKey1]
+                elif E[key] == E[dependentKey2]:
+                  records[key] = records[dependentKey2]
+                else:
+                  records[key] = (splitRecords[dependentKey3],
+                                  records[dependentKey4], None)
+              elif keepChoices:
+                if E[key] == E[dependentKey1]:
+                  records[key] = _FROM_LEFT_CHILD_CHAIN
+                elif E[key] == E[dependentKey2]:
+                  records[key] = _FROM_RIGHT_CHILD_CHAIN
+                else:
+                  records[key] = _FROM_SPLIT
+
+# Fills the entries of MIN_M for source node i and the target nodes
+# firstJ to lastJ, and the ones of the first row and column which are not
+# in the paper, from the rows of E of i - 1 and of MIN_M of the ancestors
+# of i
+def _fillRowOfMinM(i, firstJ, lastJ, source, target, costs, keep, limit,
+                   band, rowOfE, rowOfMinM):
+  width = target.pairs
+  row = target.size + 1
+  relabelCosts = costs.relabelCosts
+  keepMappings = keep == KEEP_MAPPINGS
+  keepChoices = keep == KEEP_CHOICES
+  MIN_M, records, base = rowOfMinM(i)
+  if i == 1:
+    MIN_M[base + 1] = relabelCosts[1][1]
+    if keepMappings:
+      records[base + 1] = ((1, 1), None)
+    # This part is missing in the paper
+    for j in range(2, target.size):
+      MIN_M[base + j] = MIN_M[base + j - 1] + costs.insertCosts[j]
+      if keepMappings:
+        records[base + j] = ((ALPHA, j), records[base + j - 1])
+    return
+
+  # This part is missing in the paper
+  if i < source.size:
+    lastMinM, lastRecords, lastBase = rowOfMinM(i - 1)
+    MIN_M[base + 1] = lastMinM[lastBase + 1] + costs.deleteCosts[i]
+    if keepMappings:
+      records[base + 1] = ((i, ALPHA), lastRecords[lastBase + 1])
+
+  E, recordsOfE, baseOfE = rowOfE(i - 1)
+  f_i = source.father[i]
+  depthOfF_i = source.depth[f_i]
+  pathOfF_i = source.ancestors[f_i]
+  rowsOfS = [rowOfMinM(s) for s in pathOfF_i]
+  for j in range(max(2, firstJ), lastJ + 1):
+    key = base + j
+    f_j = target.father[j]
+    depthOfF_j = target.depth[f_j]
+    pathOfF_j = target.ancestors[f_j]
+
+    for ds in range(depthOfF_i, -1, -1):
+      s = pathOfF_i[ds]
+      minMOfS, recordsOfS, baseOfS = rowsOfS[ds]
+      sourceChain = baseOfE + (_chainCount(depthOfF_i) + ds) * width
+      for dt in range(depthOfF_j, -1, -1):
+        t = pathOfF_j[dt]
+        dependentKeyForE = sourceChain + target.chain(j - 1, dt, depthOfF_j)
+        temp = (minMOfS[baseOfS + t] +
+                E[dependentKeyForE] -
+                relabelCosts[s][t])
+        MIN_M[key] = min(temp, MIN_M[key])
+        if temp == MIN_M[key] and temp <= limit:
+          if keepMappings:
+            records[key] = (recordsOfS[baseOfS + t],
+                            recordsOfE[dependentKeyForE], None)
+          elif keepChoices:
+            records[key] = s * row + t
+
+    MIN_M[key] = MIN_M[key] + relabelCosts[i][j]
+    if MIN_M[key] + band.rest(i, j) > limit:
+      MIN_M[key] = INFINITE
+    elif keepMappings:
+      records[key] = ((i, j), records[key])
+
+# Fills the entries of D for source node i and the target nodes firstJ to
+# lastJ, and the ones of the first row and column, from the row of MIN_M
+# of i and the row of D of i - 1
+def _fillRowOfD(i, firstJ, lastJ, targetSize, costs, keep, limit, band,
+                rowOfMinM, rowOfD):
+  deleteCosts = costs.deleteCosts
+  insertCosts = costs.insertCosts
+  keepMappings = keep == KEEP_MAPPINGS
+  keepChoices = keep == KEEP_CHOICES
+  D, records, base = rowOfD(i)
+  if i == 1:
+    D[base + 1] = costs.relabelCosts[1][1]
+    if keepMappings:
+      records[base + 1] = ((1, 1), None)
+    for j in range(2, targetSize + 1):
+      D[base + j] = D[base + j - 1] + insertCosts[j]
+      if keepMappings:
+        records[base + j] = ((ALPHA, j), records[base + j - 1])
+    return
+
+  lastD, lastRecords, lastBase = rowOfD(i - 1)
+  D[base + 1] = lastD[lastBase + 1] + deleteCosts[i]
+  if keepMappings:
+    records[base + 1] = ((i, ALPHA), lastRecords[lastBase + 1])
+
+  MIN_M, recordsOfMinM, baseOfMinM = rowOfMinM(i)
+  for j in range(max(2, firstJ), lastJ + 1):
+    key = base + j
+    option1 = D[key - 1] + insertCosts[j]
+    option2 = lastD[lastBase + j] + deleteCosts[i]
+    option3 = MIN_M[baseOfMinM + j]
+    D[key] = min(option1, option2, option3)
+
+    if D[key] + band.rest(i, j) > limit:
+      D[key] = INFINITE
+    elif keepMappings:
+      if D[key] == option1:
+        records[key] = ((ALPHA, j), records[key - 1])
+      elif D[key] == option2:
+        records[key] = ((i, ALPHA), lastRecords[lastBase + j])
+      else:
+        records[key] = recordsOfMinM[baseOfMinM + j]
+    elif keepChoices:
+      if D[key] == option1:
+        records[key] = _FROM_INSERT
+      elif D[key] == option2:
+        records[key] = _FROM_DELETE
       else:
-        mappingForD[keyForD(i,  j)] = mappingForMinM[keyForMIN_M(i, j)]
-  return D, mappingForD
+        records[key] = _FROM_MIN_M
+
+# Rebuilds the optimal mapping of computeDiff from the choices recorded
+# by the phases under KEEP_CHOICES. Walks the choices back from
+# D(size, size') instead of keeping a mapping list per table entry.
+#
+# @returns [(int, int)] sorted like the mapping of computeDiff
+def _traceback(sourceTree, targetTree, choicesForE, choicesForMinM,
+               choicesForD):
+  source = _TreeIndex(sourceTree)
+  target = _TreeIndex(targetTree)
+  width = target.pairs
+  row = target.size + 1
+  mapping = set()
+  pending = [('D', source.size, target.size)]
+  while pending:
+    entry = pending.pop()
+    if entry[0] == 'E':
+      _, i, ds, du, j, dt, dv = entry
+      depthOfI = source.depth[i]
+      depthOfJ = target.depth[j]
+      if (ds == du and du == depthOfI) and (dt == dv and dv == depthOfJ):
+        mapping.add((i, j))
+      elif (ds == du and du == depthOfI) or (dt < dv and dv == depthOfJ):
+        mapping.add((ALPHA, j))
+        pending.append(('E', i, ds, du, j - 1, dt, depthOfJ - 1))
+      elif (ds < du and du == depthOfI) or (dt == dv and dv == depthOfJ):
+        mapping.add((i, ALPHA))
+        pending.append(('E', i - 1, ds, depthOfI - 1, j, dt, dv))
+      else:
+        choice = choicesForE[
+            source.chain(i, ds, du) * width + target.chain(j, dt, dv)]
+        if choice == _FROM_LEFT_CHILD_CHAIN:
+          pending.append(('E', i, ds, du + 1, j, dt, dv))
+        elif choice == _FROM_RIGHT_CHILD_CHAIN:
+          pending.append(('E', i, ds, du, j, dt, dv + 1))
+        else:
+          x = source.ancestors[i][du + 1]
+          y = target.ancestors[j][dv + 1]
+          pending.append(('E', x - 1, ds, du, y - 1, dt, dv))
+          pending.append(('E', i, du + 1, du + 1, j, dv + 1, dv + 1))
+    else:
+      kind, i, j = entry
+      if i == 1 and j == 1:
+        mapping.add((1, 1))
+      elif i == 1:
+        mapping.add((ALPHA, j))
+        pending.append((kind, 1, j - 1))
+      elif j == 1:
+        mapping.add((i, ALPHA))
+        pending.append((kind, i - 1, 1))
+      elif kind == 'D' and choicesForD[i * row + j] == _FROM_INSERT:
+        mapping.add((ALPHA, j))
+        pending.append(('D', i, j - 1))
+      elif kind == 'D' and choicesForD[i * row + j] == _FROM_DELETE:
+        mapping.add((i, ALPHA))
+        pending.append(('D', i - 1, j))
+      elif kind == 'D':
+        pending.append(('M', i, j))
+      else:
+        s, t = divmod(choicesForMinM[i * row + j], row)
+        f_i = source.father[i]
+        f_j = target.father[j]
+        mapping.add((i, j))
+        pending.append(('M', s, t))
+        pending.append(('E', i - 1, source.depth[s], source.depth[f_i],
+                        j - 1, target.depth[t], target.depth[f_j]))
+  return sorted(mapping)
 
 # Produces a list of humand friendly descriptions for mapping
 # between two trees
@@ -245,6 +844,150 @@ def produceHumanFriendlyMapping(mapping, sourceTree, targetTree):
                 targetNode.label(), targetNode.preorder_position()))
   return humandFriendlyMapping
 
+# Identical subtrees found with the subtree hashes of the trees (see
+# Tree.subtree_hashes) before any table is filled.
+#
+# Under the unit costs, the distance between two forests does not change
+# when the same subtree is put in front of both or after both, and the
+# distance between two trees whose roots have the same label is the
+# distance between the forests of their children. So, starting from the
+# roots, which are mapped to each other, the identical first and last
+# children of two mapped nodes are mapped node by node, and when a single
+# child with the same label is left on both sides, those are mapped too
+# and the search goes on below them. The tables are only filled for the
+# smaller trees made of the last two mapped nodes and the children left
+# between their identical ones, whose distance is the distance of the
+# whole trees.
+#
+# Identical subtrees between other children are not used since mapping
+# them to each other is not always optimal.
+class _Anchors(object):
+  def __init__(self, sourceTree, targetTree):
+    # The pairs of nodes mapped without the tables and their cost, which
+    # is the cost of changing the roots when they have different labels
+    self.mapping = []
+    self.cost = 0
+    sourceHashes = sourceTree.subtree_hashes()
+    targetHashes = targetTree.subtree_hashes()
+    sourceSizes = _subtreeSizes(sourceTree)
+    targetSizes = _subtreeSizes(targetTree)
+    i, j = 1, 1
+    while True:
+      sourceChildren = _childPositions(sourceTree, i)
+      targetChildren = _childPositions(targetTree, j)
+      first = 0
+      while (first < min(len(sourceChildren), len(targetChildren)) and
+             sourceHashes[sourceChildren[first]] ==
+             targetHashes[targetChildren[first]]):
+        first += 1
+      last = 0
+      while (last < min(len(sourceChildren), len(targetChildren)) - first and
+             sourceHashes[sourceChildren[-1 - last]] ==
+             targetHashes[targetChildren[-1 - last]]):
+        last += 1
+      for x, y in (zip(sourceChildren[:first], targetChildren[:first]) +
+                   zip(sourceChildren[len(sourceChildren) - last:],
+                       targetChildren[len(targetChildren) - last:])):
+        self.mapping.extend(
+            (x + k, y + k) for k in range(sourceSizes[x]))
+      sourceChildren = sourceChildren[first:len(sourceChildren) - last]
+      targetChildren = targetChildren[first:len(targetChildren) - last]
+      if (len(sourceChildren) != 1 or len(targetChildren) != 1 or
+          sourceTree.label_id_of(sourceChildren[0]) !=
+          targetTree.label_id_of(targetChildren[0])):
+        break
+      self.mapping.append((i, j))
+      self.cost += UNIT_COSTS.relabelCost(
+          sourceTree.node_at(i).label(), targetTree.node_at(j).label())
+      i, j = sourceChildren[0], targetChildren[0]
+
+    # positions[k] is the position in the whole tree of node k of the
+    # smaller tree
+    self.sourcePositions = _regionPositions(i, sourceChildren, sourceSizes)
+    self.targetPositions = _regionPositions(j, targetChildren, targetSizes)
+    self.sourceTree = _regionTree(sourceTree, self.sourcePositions)
+    self.targetTree = _regionTree(targetTree, self.targetPositions)
+
+  # Returns whether the smaller trees are smaller than the whole trees
+  def found(self):
+    return len(self.mapping) > 0
+
+  # Returns the largest distance of interest for the smaller trees
+  def maxDistance(self, maxDistance):
+    if maxDistance is None:
+      return None
+    return maxDistance - self.cost
+
+  # Returns the distance of the whole trees from the distance of the
+  # smaller trees
+  def distance(self, distance):
+    return distance + self.cost
+
+  # Returns the mapping of the whole trees from a mapping of the smaller
+  # trees (None is kept)
+  def extend(self, mapping):
+    if mapping is None:
+      return None
+    extended = list(self.mapping)
+    for x, y in mapping:
+      extended.append((x if x == ALPHA else self.sourcePositions[x],
+                       y if y == ALPHA else self.targetPositions[y]))
+    extended.sort()
+    return extended
+
+# Returns the preorder positions of the children of the node at position
+def _childPositions(tree, position):
+  return [child.preorder_position()
+          for child in tree.node_at(position).children()]
+
+# Returns the number of nodes in the subtree of every node
+def _subtreeSizes(tree):
+  fathers = tree.father_positions()
+  sizes = [1] * (tree.size() + 1)
+  for position in range(tree.size(), 1, -1):
+    sizes[fathers[position]] += sizes[position]
+  return sizes
+
+# Returns the positions of the tree made of the node at position and the
+# subtrees of the given children, in preorder (index 0 is unused)
+def _regionPositions(position, children, sizes):
+  positions = [0, position]
+  for child in children:
+    positions.extend(range(child, child + sizes[child]))
+  return positions
+
+# Returns the tree (CompactTree) made of the nodes at the given positions
+def _regionTree(tree, positions):
+  indexOf = dict((position, k) for k, position in enumerate(positions))
+  fathers = tree.father_positions()
+  parents = [0] * len(positions)
+  labelIds = [0] * len(positions)
+  labels = []
+  idsOfLabels = {}
+  for k in range(1, len(positions)):
+    position = positions[k]
+    if k > 1:
+      parents[k] = indexOf[fathers[position]]
+    label = tree.node_at(position).label()
+    labelId = idsOfLabels.get(label)
+    if labelId is None:
+      labelId = idsOfLabels[label] = len(labels)
+      labels.append(label)
+    labelIds[k] = labelId
+  region = CompactTree(parents, labelIds, labels)
+  region.build_caches()
+  return region
+
+# Names of the algorithms computeDiff can use. 'tai' is the algorithm
+# in this file, the others are implemented in keyrootDiff and are
+# faster on deep trees.
+ALGORITHMS = ('tai', 'zhang-shasha', 'apted')
+
+# The algorithm computeDiff can also use for unordered trees like YAML or
+# JSON mappings, which gives another distance (see unorderedDiff)
+UNORDERED = 'unordered'
+
+
 # Returns the distance between the given trees and the list of pairs
 # where each pair (x, y) shows which node at the preorder position x
 # in the source tree is mapped to which node at the preorder
@@ -255,13 +998,274 @@ def produceHumanFriendlyMapping(mapping, sourceTree, targetTree):
 #
 # @parameter sourceTree the source tree (Tree)
 # @parameter targetTree the target tree (Tree)
+# @parameter algorithm one of ALGORITHMS or UNORDERED (str)
+# @parameter costModel the costs of the edit operations
+#        (costModel.CostModel), the unit costs of r() if None
+# @parameter maxDistance the largest distance of interest (number). If
+#        the distance is larger, (INFINITE, None) is returned, usually
+#        long before the distance would be known: treeBounds.lowerBound
+#        is checked first and the 'tai' tables are only filled near their
+#        diagonal.
+# @parameter stats collects the time, the table sizes and the memory of
+#        the phases (diffStats.DiffStats), nothing is measured if None
+# @parameter vectorized whether to fill D a row at a time with NumPy
+#        (see wavefrontDiff.computeDRows), which gives the same result
+#
+# With the unit costs, the identical subtrees around the differences are
+# mapped first and the algorithm only runs on what is left (see _Anchors),
+# except for UNORDERED, where the order of the subtrees does not matter.
 # @returns (int, [(int, int)])
-def computeDiff(sourceTree, targetTree):
-  E, mappingForE = computeE(sourceTree, targetTree)
-  MIN_M, mappingForMinM = computeMIN_M(
-      E, mappingForE, sourceTree, targetTree)
-  D, mappingForD = computeD(
-      sourceTree, targetTree, MIN_M, mappingForMinM)
-  mapping = mappingForD[keyForD(sourceTree.size(), targetTree.size())]
-  mapping.sort()
-  return (D[keyForD(sourceTree.size(), targetTree.size())], mapping)
+def computeDiff(sourceTree, targetTree, algorithm='tai', costModel=None,
+                maxDistance=None, stats=None, vectorized=False):
+  if algorithm not in ALGORITHMS and algorithm != UNORDERED:
+    raise ValueError('Unknown algorithm', algorithm)
+  if stats is not None:
+    stats.diffs += 1
+  if costModel is None and algorithm != UNORDERED:
+    with _timed(stats, 'anchors'):
+      anchors = _Anchors(sourceTree, targetTree)
+    if anchors.found():
+      distance, mapping = _computeDiff(
+          anchors.sourceTree, anchors.targetTree, algorithm, None,
+          anchors.maxDistance(maxDistance), stats, vectorized)
+      with _timed(stats, 'mapping'):
+        return (anchors.distance(distance), anchors.extend(mapping))
+  return _computeDiff(sourceTree, targetTree, algorithm, costModel,
+                      maxDistance, stats, vectorized)
+
+# computeDiff after the identical subtrees are mapped
+def _computeDiff(sourceTree, targetTree, algorithm, costModel, maxDistance,
+                 stats, vectorized):
+  limit = INFINITE if maxDistance is None else maxDistance
+  if maxDistance is not None:
+    with _timed(stats, 'bounds'):
+      if lowerBound(sourceTree, targetTree, costModel) > limit:
+        return (INFINITE, None)
+  if algorithm == UNORDERED:
+    # Asks the cost model per label instead of filling the cost arrays
+    from unorderedDiff import computeUnorderedDiff
+    with _timed(stats, algorithm):
+      distance, mapping = computeUnorderedDiff(
+          sourceTree, targetTree, costModel)
+    if distance > limit:
+      return (INFINITE, None)
+    return (distance, mapping)
+  with _timed(stats, 'costs'):
+    costs = (costModel or UNIT_COSTS).editCosts(sourceTree, targetTree)
+    compiled = None
+    if stats is None or not stats.measureMappings:
+      compiled = _compiledCosts(costs, KEEP_CHOICES, limit, None)
+
+  if algorithm == 'zhang-shasha':
+    from keyrootDiff import computeZhangShashaDiff
+    with _timed(stats, algorithm):
+      distance, mapping = computeZhangShashaDiff(
+          sourceTree, targetTree, costs)
+  elif algorithm == 'apted':
+    from keyrootDiff import computeAptedDiff
+    with _timed(stats, algorithm):
+      distance, mapping = computeAptedDiff(sourceTree, targetTree, costs)
+  elif compiled is not None:
+    # The compiled phases keep the choices instead of the mappings, which
+    # leaves no mappings to measure
+    return _compiledDiff(
+        sourceTree, targetTree, costs, compiled, limit, stats)
+  else:
+    with _timed(stats, 'computeE'):
+      E, mappingForE = computeE(
+          sourceTree, targetTree, KEEP_MAPPINGS, costs, limit)
+    with _timed(stats, 'computeMIN_M'):
+      MIN_M, mappingForMinM = computeMIN_M(
+          E, mappingForE, sourceTree, targetTree, KEEP_MAPPINGS, costs,
+          limit)
+    with _timed(stats, 'computeD'):
+      if vectorized:
+        from wavefrontDiff import computeDRows
+        D, choicesForD = computeDRows(
+            sourceTree, targetTree, MIN_M, None, KEEP_CHOICES, costs, limit)
+        mappingForD = []
+      else:
+        D, mappingForD = computeD(
+            sourceTree, targetTree, MIN_M, mappingForMinM, KEEP_MAPPINGS,
+            costs, limit)
+    if stats is not None:
+      for table, cells in zip(
+          ('E', 'MIN_M', 'D'),
+          _cellCounts(sourceTree, targetTree, costs, limit)):
+        stats.addCells(table, cells)
+      stats.addTables({'E': len(E), 'MIN_M': len(MIN_M), 'D': len(D)})
+      stats.addMappingTables(mappingForE, mappingForMinM, mappingForD)
+    last = sourceTree.size() * (targetTree.size() + 1) + targetTree.size()
+    distance = D[last]
+    if vectorized and distance <= limit:
+      distance, mapping = _traceD(sourceTree.size(), targetTree.size(),
+                                  choicesForD, MIN_M, mappingForMinM, costs)
+    elif not vectorized:
+      mapping = mappingForD[last]
+  if distance > limit:
+    return (INFINITE, None)
+  with _timed(stats, 'mapping'):
+    if algorithm == 'tai':
+      mapping = flattenMapping(mapping)
+    else:
+      mapping.sort()
+  return (distance, mapping)
+
+# The phases of _computeDiff in _accelerator, with the mapping rebuilt
+# from their choices. compiled is the _CompiledCosts of costs.
+def _compiledDiff(sourceTree, targetTree, costs, compiled, limit, stats):
+  with _timed(stats, 'computeE'):
+    E, choicesForE = computeE(
+        sourceTree, targetTree, KEEP_CHOICES, costs, limit,
+        compiled=compiled)
+  with _timed(stats, 'computeMIN_M'):
+    MIN_M, choicesForMinM = computeMIN_M(
+        E, choicesForE, sourceTree, targetTree, KEEP_CHOICES, costs, limit,
+        compiled=compiled)
+  with _timed(stats, 'computeD'):
+    D, choicesForD = computeD(
+        sourceTree, targetTree, MIN_M, choicesForMinM, KEEP_CHOICES, costs,
+        limit, compiled=compiled)
+  if stats is not None:
+    for table, cells in zip(
+        ('E', 'MIN_M', 'D'),
+        _cellCounts(sourceTree, targetTree, costs, limit)):
+      stats.addCells(table, cells)
+    stats.addTables({'E': len(E), 'MIN_M': len(MIN_M), 'D': len(D)})
+  distance = D[sourceTree.size() * (targetTree.size() + 1) +
+               targetTree.size()]
+  if distance > limit:
+    return (INFINITE, None)
+  with _timed(stats, 'mapping'):
+    return (_phaseDistance(distance, compiled),
+            _traceback(sourceTree, targetTree, choicesForE, choicesForMinM,
+                       choicesForD))
+
+# Returns the distance and the mapping of D(sourceSize, targetSize) from
+# the choices of D and the mappings of MIN_M. The costs on the way are
+# added up in the order computeD adds them, so the distance is the same
+# number computeD gives, of the same type.
+def _traceD(sourceSize, targetSize, choicesForD, MIN_M, mappingForMinM,
+            costs):
+  row = targetSize + 1
+  i, j = sourceSize, targetSize
+  steps = []
+  while i > 1 or j > 1:
+    key = i * row + j
+    if i == 1 or (j > 1 and choicesForD[key] == _FROM_INSERT):
+      steps.append((ALPHA, j))
+      j -= 1
+    elif j == 1 or choicesForD[key] == _FROM_DELETE:
+      steps.append((i, ALPHA))
+      i -= 1
+    else:
+      distance, mapping = MIN_M[key], mappingForMinM[key]
+      break
+  else:
+    distance, mapping = costs.relabelCosts[1][1], ((1, 1), None)
+  for x, y in reversed(steps):
+    if x == ALPHA:
+      distance = distance + costs.insertCosts[y]
+    else:
+      distance = distance + costs.deleteCosts[x]
+    mapping = ((x, y), mapping)
+  return distance, mapping
+
+# Returns a context manager timing a phase into stats (diffStats.DiffStats),
+# which does nothing if stats is None
+def _timed(stats, phase):
+  if stats is None:
+    return _NOT_TIMED
+  return stats.timer(phase)
+
+class _NotTimed(object):
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exception):
+    return False
+
+_NOT_TIMED = _NotTimed()
+
+# Returns the numbers of entries of E, MIN_M and D which the phases
+# compute for the given trees: the ones in the band of the limit and the
+# first row and column of MIN_M and D
+def _cellCounts(sourceTree, targetTree, costs, limit):
+  source = _TreeIndex(sourceTree)
+  target = _TreeIndex(targetTree)
+  band = _Band(source.size, target.size, costs, limit)
+  cellsForE = 0
+  inner = 0
+  for i in range(1, source.size + 1):
+    first, last = band.first(i), band.last(i)
+    if first <= last:
+      cellsForE += _chainCount(source.depth[i] + 1) * (
+          target.pairOffset[last + 1] - target.pairOffset[first])
+    if i > 1:
+      inner += max(0, last - max(2, first) + 1)
+  cellsForMinM = (inner + max(0, source.size - 2) +
+                  max(0, target.size - 2) + 1)
+  cellsForD = inner + source.size + target.size - 1
+  return cellsForE, cellsForMinM, cellsForD
+
+# Returns the distance between the given trees without building the
+# mapping lists of computeDiff, which keeps the memory use to the cost
+# tables. If traceback is True, the phases also record which option
+# produced every entry and the optimal mapping is rebuilt once at the
+# end, so the result is the same as computeDiff.
+#
+# @parameter sourceTree the source tree (Tree)
+# @parameter targetTree the target tree (Tree)
+# @parameter traceback whether to also return the mapping (bool)
+# @parameter costModel the costs of the edit operations
+#        (costModel.CostModel), the unit costs of r() if None
+# @parameter maxDistance the largest distance of interest like in
+#        computeDiff, INFINITE (and no mapping) is returned above it
+# @parameter wavefront whether to fill MIN_M and D one anti-diagonal at a
+#        time with NumPy (see wavefrontDiff), which returns a float
+# @returns int, or (int, [(int, int)]) if traceback is True
+def computeDistance(sourceTree, targetTree, traceback=False, costModel=None,
+                    maxDistance=None, wavefront=False):
+  if costModel is None:
+    anchors = _Anchors(sourceTree, targetTree)
+    if anchors.found():
+      result = computeDistance(
+          anchors.sourceTree, anchors.targetTree, traceback, None,
+          anchors.maxDistance(maxDistance), wavefront)
+      if not traceback:
+        return anchors.distance(result)
+      return anchors.distance(result[0]), anchors.extend(result[1])
+  keep = KEEP_CHOICES if traceback else KEEP_NOTHING
+  limit = INFINITE if maxDistance is None else maxDistance
+  distance = INFINITE
+  if (maxDistance is None or
+      lowerBound(sourceTree, targetTree, costModel) <= limit):
+    costs = (costModel or UNIT_COSTS).editCosts(sourceTree, targetTree)
+    compiled = _compiledCosts(costs, keep, limit, None)
+    E, choicesForE = computeE(
+        sourceTree, targetTree, keep, costs, limit, compiled=compiled)
+    last = sourceTree.size() * (targetTree.size() + 1) + targetTree.size()
+    if wavefront:
+      from wavefrontDiff import computeDWavefront
+      from wavefrontDiff import computeMIN_MWavefront
+      MIN_M, choicesForMinM = computeMIN_MWavefront(
+          E, choicesForE, sourceTree, targetTree, keep, costs, limit)
+      D, choicesForD = computeDWavefront(
+          sourceTree, targetTree, MIN_M, choicesForMinM, keep, costs, limit)
+      distance = D[last]
+    else:
+      MIN_M, choicesForMinM = computeMIN_M(
+          E, choicesForE, sourceTree, targetTree, keep, costs, limit,
+          compiled=compiled)
+      D, choicesForD = computeD(
+          sourceTree, targetTree, MIN_M, choicesForMinM, keep, costs, limit,
+          compiled=compiled)
+      distance = _phaseDistance(D[last], compiled)
+  if distance > limit:
+    distance = INFINITE
+  if not traceback:
+    return distance
+  if distance == INFINITE:
+    return distance, None
+  return distance, _traceback(
+      sourceTree, targetTree, choicesForE, choicesForMinM, choicesForD)
@@ -0,0 +1,316 @@
+# Diff of trees whose children have no order, like the keys of the YAML
+# and JSON mappings, where computeDiff would count every change in the
+# order of the keys as edits.
+#
+# The edit distance of unordered trees is NP-hard, so the mappings here
+# are constrained top-down: the roots are mapped to each other and a node
+# is only mapped if its father is mapped to the father of its partner.
+# The children of two mapped nodes are then matched level by level:
+#
+#   - children with a label that occurs once among the children of both
+#     nodes (the keys of a mapping) are matched to each other
+#   - children with a label that occurs more often (e.g. the items of a
+#     list) are first matched to children of the same shape (equal
+#     subtrees up to the order of the children), and the others of the
+#     label are matched by an optimal assignment of their subtree costs
+#   - the children whose label does not occur among the other children
+#     (e.g. renamed keys) are matched by an assignment as well, together
+#     with the ones left over by the labels if they are few enough
+#
+# A child left unmatched is deleted (or inserted) with its whole subtree.
+# Groups of more than assignmentLimit children are matched in order
+# instead of by an assignment, so every node is compared with a bounded
+# number of others and the time grows close to linearly with the sizes
+# of the trees, also for nodes with thousands of children.
+#
+# The costs are asked from the cost model once per label (or pair of
+# labels) like in treeBounds, since a relabel matrix of two wide trees
+# would not fit in memory.
+
+import collections
+
+from costModel import UNIT_COSTS
+from treeBounds import _childLists
+from treeBounds import _nodeCosts
+from treeBounds import _subtreeSums
+from treediff import ALPHA
+from treediff import INFINITE
+from treediff import _subtreeSizes
+from util.tree import LABELS
+
+# The largest number of children (of both trees together) matched by an
+# assignment, which takes O(assignmentLimit^3) time
+ASSIGNMENT_LIMIT = 40
+
+# Returns the distance between the given trees as unordered trees and the
+# list of (x, y) pairs of the mapping like treediff.computeDiff, where x
+# or y is ALPHA for a deleted or an inserted node.
+#
+# @parameter sourceTree the source tree (Tree)
+# @parameter targetTree the target tree (Tree)
+# @parameter costModel the costs of the edit operations
+#        (costModel.CostModel), unit costs if None
+# @parameter assignmentLimit the largest group of children matched by an
+#        assignment, larger ones are matched in order
+# @returns (number, [(int, int)])
+def computeUnorderedDiff(sourceTree, targetTree, costModel=None,
+                         assignmentLimit=ASSIGNMENT_LIMIT):
+  diff = _UnorderedDiff(sourceTree, targetTree, costModel or UNIT_COSTS,
+                        assignmentLimit)
+  return diff.cost(1, 1), diff.mapping()
+
+class _UnorderedDiff(object):
+  def __init__(self, sourceTree, targetTree, costModel, assignmentLimit):
+    self.costModel = costModel
+    self.assignmentLimit = assignmentLimit
+    self.sourceLabelIds = sourceTree.label_ids()
+    self.targetLabelIds = targetTree.label_ids()
+    self.sourceChildren = _childLists(sourceTree)
+    self.targetChildren = _childLists(targetTree)
+    self.sourceSizes = _subtreeSizes(sourceTree)
+    self.targetSizes = _subtreeSizes(targetTree)
+    self.subtreeDeleteCosts = _subtreeSums(
+        sourceTree, _nodeCosts(sourceTree, costModel.deleteCost))
+    self.subtreeInsertCosts = _subtreeSums(
+        targetTree, _nodeCosts(targetTree, costModel.insertCost))
+    shapes = {}
+    self.sourceShapes = _shapes(sourceTree, self.sourceChildren, shapes)
+    self.targetShapes = _shapes(targetTree, self.targetChildren, shapes)
+    self.relabelCosts = {}
+    # (cost, pairs, deleted, inserted) of the mapped pairs of nodes: the
+    # cost of their subtrees and the matched, deleted and inserted
+    # children
+    self.matches = {}
+
+  def relabelCost(self, i, j):
+    pair = (self.sourceLabelIds[i], self.targetLabelIds[j])
+    cost = self.relabelCosts.get(pair)
+    if cost is None:
+      cost = self.relabelCosts[pair] = self.costModel.relabelCost(
+          LABELS.label_of(pair[0]), LABELS.label_of(pair[1]))
+    return cost
+
+  # Returns the cost of mapping the subtrees of source node i and target
+  # node j. The children are matched after the costs of their candidate
+  # pairs are known, which an explicit stack computes first, so deep
+  # trees do not hit the recursion limit.
+  def cost(self, i, j):
+    first = (i, j)
+    pending = [(i, j, None)]
+    while pending:
+      i, j, children = pending.pop()
+      if (i, j) in self.matches:
+        continue
+      if children is None:
+        children = self.groups(i, j)
+        pending.append((i, j, children))
+        matched, groups = children
+        pending.extend(pair + (None,) for pair in matched)
+        for _, _, candidates, _ in groups:
+          pending.extend(pair + (None,) for pair in candidates)
+      else:
+        self.matches[(i, j)] = self.match(i, j, *children)
+    return self.matches[first][0]
+
+  # Returns the children of source node i and target node j as the pairs
+  # matched for sure and the groups (sources, targets, candidates,
+  # assigned) of the others, where the candidates are the pairs whose
+  # costs the matching needs and assigned tells whether the group is
+  # matched by an assignment
+  def groups(self, i, j):
+    sourceByLabel = _byKey(self.sourceChildren[i], self.sourceLabelIds)
+    targetByLabel = _byKey(self.targetChildren[j], self.targetLabelIds)
+    matched = []
+    groups = []
+    sourcesLeft = []
+    for labelId, sources in sourceByLabel.items():
+      targets = targetByLabel.pop(labelId, None)
+      if targets is None:
+        sourcesLeft.extend(sources)
+      elif len(sources) == 1 and len(targets) == 1:
+        matched.append((sources[0], targets[0]))
+      else:
+        groups.append(self.matchShapes(sources, targets, matched))
+    targetsLeft = [target for targets in targetByLabel.values()
+                   for target in targets]
+    groups.append((sourcesLeft, sorted(targetsLeft)))
+    # The children left over by the labels can be matched to the ones
+    # of other labels too when they all fit in one assignment
+    if sum(len(sources) + len(targets)
+           for sources, targets in groups) <= self.assignmentLimit:
+      groups = [(sorted(source for sources, _ in groups
+                        for source in sources),
+                 sorted(target for _, targets in groups
+                        for target in targets))]
+    return matched, [self.group(sources, targets)
+                     for sources, targets in groups]
+
+  # Matches the sources to the targets of the same shape, adds the pairs
+  # to matched and returns the sources and the targets left
+  def matchShapes(self, sources, targets, matched):
+    # The targets of every shape from the last to the first one
+    targetsByShape = _byKey(reversed(targets), self.targetShapes)
+    sourcesLeft = []
+    matchedTargets = set()
+    for source in sources:
+      sameShape = targetsByShape.get(self.sourceShapes[source])
+      if sameShape:
+        matchedTargets.add(sameShape[-1])
+        matched.append((source, sameShape.pop()))
+      else:
+        sourcesLeft.append(source)
+    return sourcesLeft, [target for target in targets
+                         if target not in matchedTargets]
+
+  # Returns the group of the sources and the targets with its candidates:
+  # all the pairs if it is small enough for an assignment, the pairs in
+  # order otherwise
+  def group(self, sources, targets):
+    if len(sources) + len(targets) <= self.assignmentLimit:
+      return (sources, targets,
+              [(source, target) for source in sources for target in targets],
+              True)
+    return sources, targets, zip(sources, targets), False
+
+  # Returns the (cost, pairs, deleted, inserted) of the pair of source
+  # node i and target node j from the children of groups, whose
+  # candidates have their costs
+  def match(self, i, j, matched, groups):
+    cost = self.relabelCost(i, j)
+    pairs = list(matched)
+    deleted = []
+    inserted = []
+    for sources, targets, candidates, assigned in groups:
+      if assigned:
+        chosen = self.assign(sources, targets)
+      else:
+        chosen = [(source, target) for source, target in candidates
+                  if self.pairCost(source, target) <= (
+                      self.subtreeDeleteCosts[source] +
+                      self.subtreeInsertCosts[target])]
+      matchedSources = set(source for source, _ in chosen)
+      matchedTargets = set(target for _, target in chosen)
+      deleted.extend(source for source in sources
+                     if source not in matchedSources)
+      inserted.extend(target for target in targets
+                      if target not in matchedTargets)
+      pairs.extend(chosen)
+    for source, target in pairs:
+      cost += self.pairCost(source, target)
+    for source in deleted:
+      cost += self.subtreeDeleteCosts[source]
+    for target in inserted:
+      cost += self.subtreeInsertCosts[target]
+    return cost, pairs, deleted, inserted
+
+  def pairCost(self, i, j):
+    return self.matches[(i, j)][0]
+
+  # Returns the pairs of the sources and the targets of least cost when
+  # every source and target can also be deleted or inserted
+  def assign(self, sources, targets):
+    # Rows are the sources and the targets to insert, columns the targets
+    # and the sources to delete
+    size = len(sources) + len(targets)
+    costs = []
+    for source in sources:
+      costs.append([self.pairCost(source, target) for target in targets] +
+                   [self.subtreeDeleteCosts[source]] * len(sources))
+    insertRow = ([self.subtreeInsertCosts[target] for target in targets] +
+                 [0] * len(sources))
+    costs.extend([insertRow] * len(targets))
+    columnOfRow = _assignment(costs, size)
+    return [(sources[row], targets[columnOfRow[row]])
+            for row in range(len(sources))
+            if columnOfRow[row] < len(targets)]
+
+  # Returns the sorted pairs of the mapping of the roots
+  def mapping(self):
+    mapping = []
+    pending = [(1, 1)]
+    while pending:
+      i, j = pending.pop()
+      mapping.append((i, j))
+      _, pairs, deleted, inserted = self.matches[(i, j)]
+      pending.extend(pairs)
+      for source in deleted:
+        mapping.extend((x, ALPHA) for x in range(
+            source, source + self.sourceSizes[source]))
+      for target in inserted:
+        mapping.extend((ALPHA, y) for y in range(
+            target, target + self.targetSizes[target]))
+    mapping.sort()
+    return mapping
+
+# Returns the positions grouped by their keys (an OrderedDict of lists) in
+# the order of their first positions
+def _byKey(positions, keys):
+  groups = collections.OrderedDict()
+  for position in positions:
+    groups.setdefault(keys[position], []).append(position)
+  return groups
+
+# Returns the shapes of the subtrees of the tree, indexed by preorder
+# position: subtrees have the same shape if they are equal up to the
+# order of the children. A shape is a number in shapes, a dict from the
+# label id and the sorted shapes of the children to the number, which
+# the trees of a diff share.
+def _shapes(tree, children, shapes):
+  labelIds = tree.label_ids()
+  shapeOf = [0] * (tree.size() + 1)
+  # The children of a node come after it in the preorder
+  for position in range(tree.size(), 0, -1):
+    key = (labelIds[position],
+           tuple(sorted(shapeOf[child] for child in children[position])))
+    shapeOf[position] = shapes.setdefault(key, len(shapes))
+  return shapeOf
+
+# Returns the column assigned to every row of the square matrix costs of
+# the given size by an assignment of least cost, with the Hungarian
+# algorithm in O(size^3)
+def _assignment(costs, size):
+  # Potentials of the rows and the columns, and the row assigned to every
+  # column. Row and column 0 are a start outside of the matrix.
+  rowPotential = [0] * (size + 1)
+  columnPotential = [0] * (size + 1)
+  rowOfColumn = [0] * (size + 1)
+  previousColumn = [0] * (size + 1)
+  for row in range(1, size + 1):
+    rowOfColumn[0] = row
+    column = 0
+    least = [INFINITE] * (size + 1)
+    used = [False] * (size + 1)
+    # Grows a tree of alternating paths from row until it reaches a free
+    # column, along the columns of least reduced cost
+    while rowOfColumn[column] != 0 or column == 0:
+      used[column] = True
+      current = rowOfColumn[column]
+      rowCosts = costs[current - 1]
+      delta = INFINITE
+      nextColumn = 0
+      for other in range(1, size + 1):
+        if not used[other]:
+          reduced = (rowCosts[other - 1] - rowPotential[current] -
+                     columnPotential[other])
+          if reduced < least[other]:
+            least[other] = reduced
+            previousColumn[other] = column
+          if least[other] < delta:
+            delta = least[other]
+            nextColumn = other
+      for other in range(size + 1):
+        if used[other]:
+          rowPotential[rowOfColumn[other]] += delta
+          columnPotential[other] -= delta
+        else:
+          least[other] -= delta
+      column = nextColumn
+    # Flips the assignments along the path back to the start
+    while column != 0:
+      previous = previousColumn[column]
+      rowOfColumn[column] = rowOfColumn[previous]
+      column = previous
+  columnOfRow = [0] * size
+  for column in range(1, size + 1):
+    columnOfRow[rowOfColumn[column] - 1] = column - 1
+  return columnOfRow
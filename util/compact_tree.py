@@ -0,0 +1,318 @@
+"""CompactTree and CompactNode classes"""
+
+from array import array
+
+from tree import LABELS
+from tree import merkle_hashes
+
+
+class CompactNode(object):
+    """Lightweight view of a node of a CompactTree
+
+    Views are created on demand and only hold the tree and the preorder
+    position of the node, so they are cheap to throw away.
+    """
+    __slots__ = ('_tree', '_position')
+
+    def __init__(self, tree, position):
+        self._tree = tree
+        self._position = position
+
+    def __eq__(self, other):
+        return (isinstance(other, CompactNode) and
+                self._tree is other._tree and
+                self._position == other._position)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((id(self._tree), self._position))
+
+    def label(self):
+        """Returns the label (str) of this node"""
+        return self._tree.label_of(self._position)
+
+    def father(self):
+        """Returns the father node (CompactNode) of the node"""
+        return self._tree.father_of(self._position)
+
+    def children(self):
+        """Yields an iteration over the children (CompactNode)"""
+        for position in self._tree.child_positions(self._position):
+            yield CompactNode(self._tree, position)
+
+    def preorder_position(self):
+        """Returns the position (int) of the node in the preorder traversal"""
+        return self._position
+
+    def debug_string(self):
+        """Returns a representation (str) for this node for debugging"""
+        return ('label: %s, preorder_position: %d' %
+                (self.label(), self._position))
+
+
+class CompactTree(object):
+    """Array backed tree with the read-only API of Tree
+
+    The nodes are identified by their preorder positions (1 based) and
+    the structure is kept in parallel int arrays (parent, subtree size
+    and label id) plus a table of distinct labels, which needs a few
+    dozen bytes per node instead of a TreeNode object, its __dict__ and
+    its child list. The children of a node follow each other in preorder,
+    each one the size of its subtree after the previous one.
+    """
+
+    def __init__(self, parents, label_ids, labels, subtree_sizes=None):
+        """Creates the tree from arrays indexed by preorder position
+
+        parents[i] is the preorder position of the father of node i (0 for
+        the root), label_ids[i] is the index of its label in labels. Index
+        0 of both arrays is unused.
+
+        subtree_sizes[i] is the number of nodes in the subtree of node i.
+        When it is given, the arrays are neither checked nor copied, so
+        they can be views of a memory mapped file (see tree_file).
+        """
+        size = len(parents) - 1
+        if size < 1 or len(label_ids) != len(parents):
+            raise ValueError('Arrays of different or zero size',
+                             len(parents), len(label_ids))
+        self._labels = list(labels)
+        if subtree_sizes is not None:
+            self._parents = parents
+            self._label_ids = label_ids
+            self._subtree_sizes = subtree_sizes
+        else:
+            self._parents = array('i', parents)
+            self._label_ids = array('i', label_ids)
+            for position in range(2, size + 1):
+                if not 0 < self._parents[position] < position:
+                    raise ValueError('Parents are not in preorder', position)
+            self._subtree_sizes = array('i', [1]) * (size + 1)
+            for position in range(size, 1, -1):
+                self._subtree_sizes[self._parents[position]] += (
+                    self._subtree_sizes[position])
+
+        # Built on first use by depths, root_paths and label_ids
+        self._depths = None
+        self._shared_label_ids = None
+        self._root_paths = None
+        self._subtree_hashes = None
+
+    @classmethod
+    def from_tree(cls, tree):
+        """Returns a CompactTree with the same structure as a Tree
+
+        The tree must have its caches built.
+        """
+        size = tree.size()
+        parents = array('i', [0]) * (size + 1)
+        label_ids = array('i', [0]) * (size + 1)
+        labels = []
+        ids_of_labels = {}
+        for position in range(1, size + 1):
+            parents[position] = tree.father_position_of(position)
+            label = tree.node_at(position).label()
+            label_id = ids_of_labels.get(label)
+            if label_id is None:
+                label_id = ids_of_labels[label] = len(labels)
+                labels.append(label)
+            label_ids[position] = label_id
+        return cls(parents, label_ids, labels)
+
+    def size(self):
+        """Returns the number of nodes in the tree"""
+        return len(self._parents) - 1
+
+    def build_caches(self):
+        """Builds the depths and the subtree hashes of the nodes
+
+        The root paths are built when they are first asked for.
+        """
+        self.depths()
+        self.subtree_hashes()
+
+    def labels(self):
+        """Returns the list of distinct labels of the tree"""
+        return self._labels
+
+    def label_ids(self):
+        """Returns the array of label ids indexed by position
+
+        The ids are the ones of util.tree.LABELS, so they can be compared
+        with the ids of other trees (the ids used inside the tree are
+        indices in labels()).
+        """
+        if self._shared_label_ids is None:
+            shared_ids = LABELS.intern(self, self._labels)
+            self._shared_label_ids = array(
+                'i', (shared_ids[label_id] for label_id in self._label_ids))
+        return self._shared_label_ids
+
+    def label_indices(self):
+        """Returns the array of the indices of the labels in labels()
+        indexed by position"""
+        return self._label_ids
+
+    def label_id_of(self, preorder_position):
+        """Returns the id (int) of the label of the node in LABELS"""
+        return self.label_ids()[preorder_position]
+
+    def label_of(self, preorder_position):
+        """Returns the label (str) of the node at the given position"""
+        return self._labels[self._label_ids[preorder_position]]
+
+    def node_at(self, preorder_position):
+        """Returns the node (CompactNode) at the given preorder position"""
+        if 1 <= preorder_position <= self.size():
+            return CompactNode(self, preorder_position)
+        return None
+
+    def father_of(self, preorder_position):
+        """Returns the father of the node at the given preorder position"""
+        if not 1 <= preorder_position <= self.size():
+            raise ValueError('No node at the given position',
+                             preorder_position)
+        return self.node_at(self._parents[preorder_position])
+
+    def father_position_of(self, preorder_position):
+        """Returns the position (int) of the father, 0 for the root"""
+        return self._parents[preorder_position]
+
+    def father_positions(self):
+        """Returns the array of father positions indexed by position"""
+        return self._parents
+
+    def child_positions(self, preorder_position):
+        """Yields the positions (int) of the children of the node"""
+        end = preorder_position + self._subtree_sizes[preorder_position]
+        position = preorder_position + 1
+        while position < end:
+            yield position
+            position += self._subtree_sizes[position]
+
+    def subtree_sizes(self):
+        """Returns the array of subtree sizes indexed by position"""
+        return self._subtree_sizes
+
+    def depth_of(self, preorder_position):
+        """Returns the depth (int) of the node, 0 for the root"""
+        return self.depths()[preorder_position]
+
+    def depths(self):
+        """Returns the array of node depths indexed by position"""
+        if self._depths is None:
+            depths = array('i', [0]) * (self.size() + 1)
+            for position in range(2, self.size() + 1):
+                depths[position] = depths[self._parents[position]] + 1
+            self._depths = depths
+        return self._depths
+
+    def root_path(self, preorder_position):
+        """Returns the positions from the root to the node (tuple of int)"""
+        return self.root_paths()[preorder_position]
+
+    def root_paths(self):
+        """Returns the list of root paths indexed by position
+
+        The paths take O(size * depth) memory, so they are only built
+        when an algorithm asks for them.
+        """
+        if self._root_paths is None:
+            size = self.size()
+            root_paths = [()] * (size + 1)
+            root_paths[1] = (1,)
+            for position in range(2, size + 1):
+                root_paths[position] = (
+                    root_paths[self._parents[position]] + (position,))
+            self._root_paths = root_paths
+        return self._root_paths
+
+    def subtree_hashes(self):
+        """Returns the structural hashes (see tree.merkle_hashes) of the
+        subtrees indexed by position"""
+        if self._subtree_hashes is None:
+            self._subtree_hashes = merkle_hashes(
+                self.size(), self._parents, self.label_of)
+        return self._subtree_hashes
+
+    def subtree_hash(self, preorder_position):
+        """Returns the structural hash (str) of the subtree of the node"""
+        return self.subtree_hashes()[preorder_position]
+
+    def structural_hash(self):
+        """Returns the structural hash of the whole tree as a hex string"""
+        return self.subtree_hash(1).encode('hex')
+
+    def ancestor_iterator(self, starting_preorder_position):
+        """Produces iteration towards the root starting from the given position
+
+        Yields preorder positions of the nodes along the path from
+        the node at the given position to the root
+        """
+        if not 1 <= starting_preorder_position <= self.size():
+            raise ValueError('No node at the given position',
+                             starting_preorder_position)
+        return self._ancestor_positions(starting_preorder_position)
+
+    def _ancestor_positions(self, position):
+        while position:
+            yield position
+            position = self._parents[position]
+
+    def child_on_path(self, parent_position, descendant_position):
+        """Returns the position (int) of the child of the parent leading to
+        the descendant, or None if the parent is not a proper ancestor.
+        """
+        path = self.root_path(descendant_position)
+        depth = self.depth_of(parent_position)
+        if depth + 1 < len(path) and path[depth] == parent_position:
+            return path[depth + 1]
+        return None
+
+    def child_on_path_from_descendant(
+            self, parent_position, descendant_position):
+        """Finds a child node between the parent and the descendant.
+
+        Returns the child of a node which is on the path from a
+        descendant of the node to the node (there can only be one such child).
+        Returns None if no such node.
+        """
+        if self._parents[descendant_position] == 0:
+            raise ValueError(
+                'No father node for the given descendant position',
+                descendant_position)
+
+        child_position = self.child_on_path(
+            parent_position, descendant_position)
+        if child_position is None:
+            return None
+        return CompactNode(self, child_position)
+
+    def preorder_iterator(self):
+        """Yields the nodes (CompactNode) of the tree in preorder"""
+        for position in range(1, self.size() + 1):
+            yield CompactNode(self, position)
+
+    def postorder_iterator(self):
+        """Yields the nodes (CompactNode) of the tree in postorder"""
+        # The nodes whose subtrees are not over yet, with the positions
+        # their subtrees end at
+        pending = []
+        for position in range(1, self.size() + 1):
+            while pending and pending[-1][1] <= position:
+                yield CompactNode(self, pending.pop()[0])
+            pending.append(
+                (position, position + self._subtree_sizes[position]))
+        while pending:
+            yield CompactNode(self, pending.pop()[0])
+
+    def perform_preorder_traversal(self, visitor):
+        """Performs a preorder traversal on the tree
+
+        The visitor is used for taking an action on the visited node (
+        the visitor must have a visit method)
+        """
+        for position in range(1, self.size() + 1):
+            visitor.visit(CompactNode(self, position))
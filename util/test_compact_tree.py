@@ -0,0 +1,98 @@
+""" File contains unit tests for testing CompactTree and CompactNode classes.
+
+Run the test by executing "python test_compact_tree.py -v" or "nosetests"
+at the command line.
+"""
+
+import unittest
+from compact_tree import CompactTree
+from tree import Tree
+from tree import TreeNode
+
+# pylint: disable=too-many-public-methods
+
+
+class Visitor(object):  # pylint: disable=too-few-public-methods
+    """Builds an array of node labels it visits"""
+    def __init__(self):
+        self.traversal = []
+
+    def visit(self, node):
+        """Records the label of the node visited"""
+        self.traversal.append(node.debug_string())
+
+
+class TestCompactTree(unittest.TestCase):
+    """Tests the functionality of CompactTree """
+
+    def setUp(self):
+        a_node = TreeNode('A')
+        b_node = TreeNode('B')
+        c_node = TreeNode('C')
+        d_node = TreeNode('D')
+        e_node = TreeNode('B')
+        a_node.add_child(b_node)
+        a_node.add_child(c_node)
+        c_node.add_child(d_node)
+        d_node.add_child(e_node)
+        self.tree = Tree(a_node)
+        self.tree.build_caches()
+        self.compact_tree = CompactTree.from_tree(self.tree)
+
+    def test_from_tree(self):
+        """Same structure and labels as the converted tree"""
+        self.assertEqual(5, self.compact_tree.size())
+        self.assertEqual(['A', 'B', 'C', 'D'], self.compact_tree.labels())
+        compact_tree = self.compact_tree
+        for position in range(1, 6):
+            self.assertEqual(self.tree.node_at(position).debug_string(),
+                             compact_tree.node_at(position).debug_string())
+            self.assertEqual(self.tree.root_path(position),
+                             compact_tree.root_path(position))
+            self.assertEqual(list(self.tree.ancestor_iterator(position)),
+                             list(compact_tree.ancestor_iterator(position)))
+        self.assertIsNone(self.compact_tree.node_at(6))
+        self.assertEqual(self.tree.subtree_hashes(),
+                         self.compact_tree.subtree_hashes())
+        self.assertEqual(self.tree.structural_hash(),
+                         self.compact_tree.structural_hash())
+
+    def test_navigation(self):
+        """Fathers, children and paths between nodes"""
+        self.assertIsNone(self.compact_tree.father_of(1))
+        self.assertEqual(3, self.compact_tree.father_of(4).preorder_position())
+        self.assertEqual(
+            ['B', 'C'],
+            [node.label() for node in self.compact_tree.node_at(1).children()])
+        node = self.compact_tree.child_on_path_from_descendant(1, 5)
+        self.assertEqual('C', node.label())
+        self.assertEqual(node, self.compact_tree.node_at(3))
+        self.assertIsNone(self.compact_tree.child_on_path(2, 5))
+        with self.assertRaises(ValueError):
+            self.compact_tree.child_on_path_from_descendant(1, 1)
+        with self.assertRaises(ValueError):
+            self.compact_tree.father_of(6)
+
+    def test_preorder_traversal(self):
+        """Visits the same nodes in the same order as Tree"""
+        visitor = Visitor()
+        self.tree.perform_preorder_traversal(visitor)
+        compact_visitor = Visitor()
+        self.compact_tree.perform_preorder_traversal(compact_visitor)
+        self.assertEqual(visitor.traversal, compact_visitor.traversal)
+
+    def test_postorder_iterator(self):
+        """Visits the same nodes in the same order as Tree"""
+        self.assertEqual(
+            [node.preorder_position()
+             for node in self.tree.postorder_iterator()],
+            [node.preorder_position()
+             for node in self.compact_tree.postorder_iterator()])
+
+    def test_parents_not_in_preorder(self):
+        """Father positions must precede their children"""
+        with self.assertRaises(ValueError):
+            CompactTree([0, 0, 3, 1], [0, 0, 0, 0], ['A'])
+
+if __name__ == '__main__':
+    unittest.main()
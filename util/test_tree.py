@@ -5,6 +5,7 @@ command line.
 """
 
 import unittest
+from tree import LABELS
 from tree import Tree
 from tree import TreeNode
 
@@ -82,6 +83,34 @@ class TestPreorderTraversal(TestTree):
         self.assertEqual(expected, visitor.traversal)
 
 
+class TestIterators(TestTree):
+    """Tests preorder_iterator and postorder_iterator methods of Tree class"""
+
+    def test_success(self):
+        """Orders of the labels in a small tree"""
+        self.assertEqual(
+            ['A', 'B', 'C', 'D', 'E'],
+            [node.label() for node in self.tree_three.preorder_iterator()])
+        self.assertEqual(
+            ['B', 'E', 'D', 'C', 'A'],
+            [node.label() for node in self.tree_three.postorder_iterator()])
+
+    def test_deep_tree(self):
+        """Trees deeper than the recursion limit"""
+        root = node = TreeNode(0)
+        for label in range(1, 20000):
+            child = TreeNode(label)
+            node.add_child(child)
+            node = child
+        tree = Tree(root)
+        tree.build_caches()
+        self.assertEqual(20000, tree.size())
+        self.assertEqual(19999, tree.depth_of(20000))
+        self.assertEqual(
+            range(19999, -1, -1),
+            [node.label() for node in tree.postorder_iterator()])
+
+
 class TestNodeAt(TestTree):
     """Tests node_at method of Tree class"""
 
@@ -101,6 +130,26 @@ class TestNodeAt(TestTree):
         self.assertIsNone(self.tree_two.node_at(5))
 
 
+class TestChildEdits(TestTree):
+    """Tests insert_child and remove_child of TreeNode class"""
+
+    def test_success(self):
+        """The preorder follows the children after build_caches"""
+        root = self.tree_two.node_at(1)
+        node = TreeNode('X')
+        root.insert_child(1, node)
+        self.assertEqual(root, node.father())
+        self.tree_two.build_caches()
+        self.assertEqual(['A', 'B', 'X', 'C', 'D'],
+                         [self.tree_two.node_at(position).label()
+                          for position in range(1, 6)])
+        root.remove_child(node)
+        self.assertIsNone(node.father())
+        self.tree_two.build_caches()
+        self.assertEqual(4, self.tree_two.size())
+        self.assertEqual(3, self.tree_two.father_position_of(4))
+
+
 class TestFatherOf(TestTree):
     """Tests father_of method of Tree class"""
 
@@ -149,6 +198,46 @@ class TestAncestorIterator(TestTree):
                 self.fail("Should not yield even once")
 
 
+class TestLabelIds(TestTree):
+    """Tests the interned label ids of Tree class"""
+
+    def test_success(self):
+        """Equal labels get equal ids across trees"""
+        self.assertEqual(self.tree_one.label_id_of(2),
+                         self.tree_two.label_id_of(2))
+        self.assertEqual(self.tree_two.label_id_of(4),
+                         self.tree_three.label_id_of(4))
+        self.assertNotEqual(self.tree_three.label_id_of(4),
+                            self.tree_three.label_id_of(5))
+        self.assertEqual(
+            ['A', 'B', 'C'],
+            [LABELS.label_of(label_id)
+             for label_id in self.tree_one.label_ids()[1:]])
+
+    def test_lifetime(self):
+        """The ids are freed with the last tree holding them"""
+        labels = len(LABELS)
+        tree = Tree(TreeNode('only in this tree'))
+        tree.build_caches()
+        label_id = tree.label_id_of(1)
+        self.assertEqual(labels + 1, len(LABELS))
+        self.assertEqual('only in this tree', LABELS.label_of(label_id))
+        other = Tree(TreeNode('only in this tree'))
+        other.build_caches()
+        del tree
+        self.assertEqual(label_id, other.label_id_of(1))
+        self.assertEqual(labels + 1, len(LABELS))
+        # Relabeling keeps the ids of the labels still in the tree
+        other.node_at(1).add_child(TreeNode('A'))
+        other.build_caches()
+        self.assertEqual(label_id, other.label_id_of(1))
+        other.node_at(1).set_label('relabeled')
+        other.build_caches()
+        self.assertEqual(labels + 1, len(LABELS))
+        del other
+        self.assertEqual(labels, len(LABELS))
+
+
 class TestChildOnPathFromDescendant(TestTree):
     """Tests child_on_path_from_descendant method of Tree class"""
 
@@ -171,5 +260,71 @@ class TestChildOnPathFromDescendant(TestTree):
         with self.assertRaises(ValueError):
             self.tree_two.child_on_path_from_descendant(1, 1)
 
+class TestPathCaches(TestTree):
+    """Tests the father, depth and root path caches of Tree class"""
+
+    def test_success(self):
+        """Caches of the nodes of a tree"""
+        self.assertEqual(0, self.tree_three.father_position_of(1))
+        self.assertEqual(3, self.tree_three.father_position_of(4))
+        self.assertEqual(0, self.tree_three.depth_of(1))
+        self.assertEqual(3, self.tree_three.depth_of(5))
+        self.assertEqual((1, 3, 4, 5), self.tree_three.root_path(5))
+        self.assertEqual((1, 2), self.tree_three.root_path(2))
+
+    def test_child_on_path(self):
+        """Positions of the child leading to a descendant"""
+        self.assertEqual(3, self.tree_three.child_on_path(1, 5))
+        self.assertEqual(5, self.tree_three.child_on_path(4, 5))
+        self.assertIsNone(self.tree_three.child_on_path(2, 5))
+        self.assertIsNone(self.tree_three.child_on_path(5, 5))
+
+
+class TestStructuralHash(TestTree):
+    """Tests the subtree hashes of Tree class"""
+
+    def test_success(self):
+        """Equal subtrees have equal hashes"""
+        self.assertEqual(self.tree_two.subtree_hash(2),
+                         self.tree_three.subtree_hash(2))
+        self.assertNotEqual(self.tree_two.subtree_hash(3),
+                            self.tree_three.subtree_hash(3))
+        self.assertNotEqual(self.tree_two.subtree_hash(4),
+                            self.tree_three.subtree_hash(4))
+        self.assertNotEqual(self.tree_two.structural_hash(),
+                            self.tree_three.structural_hash())
+
+    def test_build_caches(self):
+        """The hashes follow the changes of the tree"""
+        before = self.tree_two.structural_hash()
+        self.tree_two.node_at(4).set_label('E')
+        self.tree_two.build_caches()
+        self.assertNotEqual(before, self.tree_two.structural_hash())
+        self.assertEqual(self.tree_two.subtree_hash(2),
+                         self.tree_three.subtree_hash(2))
+
+    def test_rebuilt_tree(self):
+        """A tree built again has the same hash, other orders do not"""
+        a_node = TreeNode('A')
+        b_node = TreeNode('B')
+        c_node = TreeNode('C')
+        d_node = TreeNode('D')
+        a_node.add_child(b_node)
+        a_node.add_child(c_node)
+        c_node.add_child(d_node)
+        tree = Tree(a_node)
+        tree.build_caches()
+        self.assertEqual(self.tree_two.structural_hash(),
+                         tree.structural_hash())
+
+        a_node = TreeNode('A')
+        a_node.add_child(c_node)
+        a_node.add_child(b_node)
+        tree = Tree(a_node)
+        tree.build_caches()
+        self.assertNotEqual(self.tree_two.structural_hash(),
+                            tree.structural_hash())
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,60 @@
+""" File contains unit tests for testing TreeBuilder class.
+
+Run the test by executing "python test_tree_builder.py -v" or "nosetests"
+at the command line.
+"""
+
+import unittest
+from tree_builder import TreeBuilder
+
+# pylint: disable=too-many-public-methods
+
+
+class TestTreeBuilder(unittest.TestCase):
+    """Tests the functionality of TreeBuilder"""
+
+    def test_success(self):
+        """The nodes are added in preorder and the labels are shared"""
+        builder = TreeBuilder()
+        builder.start('A')
+        builder.leaf('B')
+        builder.start('C')
+        builder.leaf(''.join(['B']))
+        builder.end()
+        self.assertEqual(1, builder.depth())
+        builder.end()
+        tree = builder.tree()
+        self.assertEqual(['A', 'B', 'C', 'B'],
+                         [node.label() for node in tree.preorder_iterator()])
+        self.assertEqual(3, tree.father_position_of(4))
+        self.assertIs(tree.node_at(2).label(), tree.node_at(4).label())
+
+        # The builder starts a new tree
+        builder.start(1)
+        self.assertRaises(ValueError, builder.tree)
+        builder.end()
+        self.assertEqual([1], [node.label()
+                               for node in builder.tree().preorder_iterator()])
+
+    def test_labels_of_other_types(self):
+        """Equal labels of different types are not merged"""
+        builder = TreeBuilder()
+        builder.start(1)
+        builder.leaf(True)
+        builder.leaf(1.0)
+        builder.end()
+        self.assertEqual([int, bool, float],
+                         [type(node.label())
+                          for node in builder.tree().preorder_iterator()])
+
+    def test_errors(self):
+        """A tree has a single root and nodes end after they start"""
+        builder = TreeBuilder()
+        self.assertRaises(ValueError, builder.end)
+        self.assertRaises(ValueError, builder.tree)
+        builder.leaf('A')
+        self.assertRaises(ValueError, builder.leaf, 'B')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+""" File contains unit tests for saving and loading trees in binary files.
+
+Run the test by executing "python test_tree_file.py -v" or "nosetests"
+at the command line.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from compact_tree import CompactTree
+from tree import Tree
+from tree import TreeNode
+from tree_file import load_tree
+from tree_file import save_tree
+
+# pylint: disable=too-many-public-methods
+
+
+class TestTreeFile(unittest.TestCase):
+    """Tests save_tree and load_tree"""
+
+    def setUp(self):
+        a_node = TreeNode('A')
+        b_node = TreeNode(2)
+        c_node = TreeNode('C')
+        d_node = TreeNode(u'\xe7')
+        e_node = TreeNode('B')
+        a_node.add_child(b_node)
+        a_node.add_child(c_node)
+        c_node.add_child(d_node)
+        c_node.add_child(e_node)
+        self.tree = Tree(a_node)
+        self.tree.build_caches()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'tree.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        """The loaded tree has the structure and the labels of the tree"""
+        save_tree(self.tree, self.path)
+        loaded = load_tree(self.path)
+        self.assertEqual(5, loaded.size())
+        self.assertEqual(['A', 2, 'C', u'\xe7', 'B'],
+                         [node.label() for node in loaded.preorder_iterator()])
+        self.assertEqual(
+            [node.debug_string() for node in self.tree.postorder_iterator()],
+            [node.debug_string() for node in loaded.postorder_iterator()])
+        self.assertEqual([4, 5], list(loaded.child_positions(3)))
+        self.assertEqual(self.tree.structural_hash(), loaded.structural_hash())
+
+        # A CompactTree is saved as it is
+        save_tree(loaded, self.path + '.copy')
+        with open(self.path, 'rb') as original:
+            with open(self.path + '.copy', 'rb') as copy:
+                self.assertEqual(original.read(), copy.read())
+
+    def test_bad_files(self):
+        """Files which are not whole tree files are refused"""
+        with open(self.path, 'wb') as bad_file:
+            bad_file.write('not a tree')
+        self.assertRaises(ValueError, load_tree, self.path)
+
+        save_tree(self.tree, self.path)
+        with open(self.path, 'rb') as tree_file:
+            content = tree_file.read()
+        with open(self.path, 'wb') as tree_file:
+            tree_file.write(content[:-1])
+        self.assertRaises(ValueError, load_tree, self.path)
+
+        a_node = TreeNode(('A', 1))
+        tree = Tree(a_node)
+        tree.build_caches()
+        self.assertRaises(ValueError, save_tree, tree, self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,109 @@
 """Tree and TreeNode classes"""
 
+import hashlib
+import weakref
+
+
+class LabelTable(object):
+    """Assigns small integer ids to labels
+
+    Equal labels get equal ids, so algorithms can compare the ids of the
+    nodes instead of their labels. The trees hold the ids of their labels
+    through weak references: the id of a label is freed (and may be given
+    to another label) once no live tree holds it, so the table only keeps
+    the labels of the trees in use.
+    """
+    def __init__(self):
+        self._ids = {}
+        self._labels = []
+        # The number of holders of every id
+        self._counts = []
+        self._free_ids = []
+        # The weak reference and the held ids by the id() of the holder
+        self._holders = {}
+
+    def intern(self, holder, labels):
+        """Returns the ids (list of int) of the labels
+
+        The ids are held until the holder is garbage collected or interns
+        labels again, which keeps the ids of the labels it still has.
+        """
+        ids = {}
+        label_ids = []
+        for label in labels:
+            label_id = ids.get(label)
+            if label_id is None:
+                label_id = ids[label] = self._hold(label)
+            label_ids.append(label_id)
+        key = id(holder)
+        self._release(key, self._holders.get(key, (None,))[0])
+        self._holders[key] = (
+            weakref.ref(holder, lambda ref: self._release(key, ref)),
+            ids.values())
+        return label_ids
+
+    def label_of(self, label_id):
+        """Returns the label with the given id"""
+        return self._labels[label_id]
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _hold(self, label):
+        label_id = self._ids.get(label)
+        if label_id is None:
+            if self._free_ids:
+                label_id = self._free_ids.pop()
+                self._labels[label_id] = label
+            else:
+                label_id = len(self._labels)
+                self._labels.append(label)
+                self._counts.append(0)
+            self._ids[label] = label_id
+        self._counts[label_id] += 1
+        return label_id
+
+    def _release(self, key, ref):
+        """Releases the ids held by the holder with the weak reference"""
+        holder = self._holders.get(key)
+        if holder is None or holder[0] is not ref:
+            return
+        del self._holders[key]
+        for label_id in holder[1]:
+            self._counts[label_id] -= 1
+            if not self._counts[label_id]:
+                del self._ids[self._labels[label_id]]
+                self._labels[label_id] = None
+                self._free_ids.append(label_id)
+
+
+# The table every tree interns its labels in, so that the label ids of
+# different trees can be compared. An id stays valid while a tree with
+# the label is alive, it is freed with the last of them.
+LABELS = LabelTable()
+
+
+def merkle_hashes(size, father_positions, label_of):
+    """Returns the structural hashes of the subtrees of a tree
+
+    The hash (a 20 byte str) of a node covers its label and the hashes of
+    its children in order, so equal subtrees have equal hashes whichever
+    tree they are in. The result is indexed by preorder position (index 0
+    is unused). label_of returns the label at a preorder position.
+    """
+    children = [[] for _ in range(size + 1)]
+    for position in range(2, size + 1):
+        children[father_positions[position]].append(position)
+    hashes = [None] * (size + 1)
+    # The children of a node come after it in the preorder
+    for position in range(size, 0, -1):
+        label = repr(label_of(position))
+        digest = hashlib.sha1('%d:%s' % (len(label), label))
+        for child in children[position]:
+            digest.update(hashes[child])
+        hashes[position] = digest.digest()
+    return hashes
+
 
 class Visitor(object):  # pylint: disable=too-few-public-methods
     """A visitor class to apply the visitor pattern for navigating the tree"""
@@ -64,6 +168,16 @@ class TreeNode(object):
         self._children.append(node)
         node.set_father(self)
 
+    def insert_child(self, index, node):
+        """Inserts a new child (TreeNode) before the child at index"""
+        self._children.insert(index, node)
+        node.set_father(self)
+
+    def remove_child(self, node):
+        """Removes the child (TreeNode) from the node"""
+        self._children.remove(node)
+        node.set_father(None)
+
     def children(self):
         """Yields an iteration over the children (TreeNode)"""
         for child in self._children:
@@ -82,9 +196,35 @@ class TreeNode(object):
 
         The parameter visitor should have a visit method accepting a TreeNode.
         """
-        visitor.visit(self)
-        for child in self._children:
-            child.preorder_traversal(visitor)
+        for node in self.preorder_iterator():
+            visitor.visit(node)
+
+    def preorder_iterator(self):
+        """Yields the nodes (TreeNode) of the subtree in preorder
+
+        Uses an explicit stack, so the depth of the tree is not limited by
+        the recursion limit.
+        """
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node._children))
+
+    def postorder_iterator(self):
+        """Yields the nodes (TreeNode) of the subtree in postorder
+
+        Uses an explicit stack, so the depth of the tree is not limited by
+        the recursion limit.
+        """
+        stack = [(self, False)]
+        while stack:
+            node, children_visited = stack.pop()
+            if children_visited:
+                yield node
+                continue
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node._children))
 
     def debug_string(self):
         """Returns a representation (str) for this node for debugging"""
@@ -98,6 +238,20 @@ class Tree(object):
         self._root = root
         self._preorder_position_to_node = {}
 
+        # Per preorder position caches built by build_caches. Index 0 is
+        # unused so that the lists can be indexed by preorder positions.
+        # The father position of the root is 0.
+        self._father_positions = [0]
+        self._depths = [0]
+        # Ids of the labels in LABELS
+        self._label_ids = [0]
+        # The preorder positions on the path from the root to the node.
+        # They take O(size * depth) memory, so they are only built when
+        # they are first asked for (None until then).
+        self._root_paths = None
+        # The merkle_hashes of the subtrees
+        self._subtree_hashes = [None]
+
     def size(self):
         """Returns the number of nodes in the tree"""
         return len(self._preorder_position_to_node)
@@ -105,11 +259,32 @@ class Tree(object):
     def build_caches(self):
         """Builds the cached preorder positions of the nodes in the tree.
 
-        Call this method after the tree structure is finalized    .
+        Also builds the father position, depth, label id (in LABELS) and
+        subtree hash (see merkle_hashes) of every node. Call this method
+        after the tree structure and the labels are finalized.
         """
+        self._preorder_position_to_node = {}
         visitor = PreOrderMarkingVisitor(self)
         self.perform_preorder_traversal(visitor)
 
+        size = self.size()
+        self._father_positions = [0] * (size + 1)
+        self._depths = [0] * (size + 1)
+        self._label_ids = [0] * (size + 1)
+        self._root_paths = None
+        self._label_ids[1:] = LABELS.intern(
+            self, [self._preorder_position_to_node[position].label()
+                   for position in range(1, size + 1)])
+        # A father always precedes its children in the preorder
+        for position in range(2, size + 1):
+            father = self._preorder_position_to_node[position].father()
+            father_position = father.preorder_position()
+            self._father_positions[position] = father_position
+            self._depths[position] = self._depths[father_position] + 1
+        self._subtree_hashes = merkle_hashes(
+            size, self._father_positions,
+            lambda position: self._preorder_position_to_node[position].label())
+
     def perform_preorder_traversal(self, visitor):
         """Performs a preorder traversal on the tree
 
@@ -118,6 +293,14 @@ class Tree(object):
         """
         self._root.preorder_traversal(visitor)
 
+    def preorder_iterator(self):
+        """Yields the nodes (TreeNode) of the tree in preorder"""
+        return self._root.preorder_iterator()
+
+    def postorder_iterator(self):
+        """Yields the nodes (TreeNode) of the tree in postorder"""
+        return self._root.postorder_iterator()
+
     def print_preorder_traversal(self):
         """Does a preorder traversal and prints the node labels"""
         visitor = DebugVisitor()
@@ -140,24 +323,94 @@ class Tree(object):
 
         raise ValueError('No node at the given position', preorder_position)
 
+    def father_position_of(self, preorder_position):
+        """Returns the position (int) of the father, 0 for the root"""
+        return self._father_positions[preorder_position]
+
+    def depth_of(self, preorder_position):
+        """Returns the depth (int) of the node, 0 for the root"""
+        return self._depths[preorder_position]
+
+    def root_path(self, preorder_position):
+        """Returns the positions from the root to the node (tuple of int)
+
+        The ancestor at depth d of the node is root_path(position)[d].
+        """
+        return self.root_paths()[preorder_position]
+
+    def label_id_of(self, preorder_position):
+        """Returns the id (int) of the label of the node in LABELS"""
+        return self._label_ids[preorder_position]
+
+    def label_ids(self):
+        """Returns the list of label ids (in LABELS) indexed by position"""
+        return self._label_ids
+
+    def father_positions(self):
+        """Returns the list of father positions indexed by position"""
+        return self._father_positions
+
+    def depths(self):
+        """Returns the list of node depths indexed by position"""
+        return self._depths
+
+    def root_paths(self):
+        """Returns the list of root paths indexed by position"""
+        if self._root_paths is None:
+            size = self.size()
+            root_paths = [()] * (size + 1)
+            root_paths[1] = (1,)
+            for position in range(2, size + 1):
+                root_paths[position] = (
+                    root_paths[self._father_positions[position]] +
+                    (position,))
+            self._root_paths = root_paths
+        return self._root_paths
+
+    def subtree_hashes(self):
+        """Returns the structural hashes (see merkle_hashes) of the subtrees
+        indexed by position"""
+        return self._subtree_hashes
+
+    def subtree_hash(self, preorder_position):
+        """Returns the structural hash (str) of the subtree of the node"""
+        return self.subtree_hashes()[preorder_position]
+
+    def structural_hash(self):
+        """Returns the structural hash of the whole tree as a hex string
+
+        Trees with the same structure and labels have the same hash.
+        """
+        return self.subtree_hash(1).encode('hex')
+
     def ancestor_iterator(self, starting_preorder_position):
         """Produces iteration towards the root starting from the given position
 
         Yields preorder positions of the nodes along the path from
         the node at the given position to the root
         """
-        if starting_preorder_position > len(self._preorder_position_to_node):
+        if (starting_preorder_position not in
+                self._preorder_position_to_node):
             raise ValueError('No node at the given position',
                              starting_preorder_position)
 
-        yield starting_preorder_position
-        while True:
-            node = self.father_of(starting_preorder_position)
-            if node:
-                starting_preorder_position = node.preorder_position()
-                yield starting_preorder_position
-            else:
-                break
+        return self._ancestor_positions(starting_preorder_position)
+
+    def _ancestor_positions(self, position):
+        while position:
+            yield position
+            position = self._father_positions[position]
+
+    def child_on_path(self, parent_position, descendant_position):
+        """Returns the position (int) of the child of the parent leading to
+        the descendant in O(1), or None if the parent is not a proper
+        ancestor of the descendant.
+        """
+        path = self.root_path(descendant_position)
+        depth = self._depths[parent_position]
+        if depth + 1 < len(path) and path[depth] == parent_position:
+            return path[depth + 1]
+        return None
 
     def child_on_path_from_descendant(
             self, parent_position, descendant_position):
@@ -167,17 +420,13 @@ class Tree(object):
         descendant of the node to the node (there can only be one such child).
         Returns None if no such node.
         """
-        current_child_node = self.node_at(descendant_position)
-        father_node = current_child_node.father()
-        if father_node is None:
+        if self._father_positions[descendant_position] == 0:
             raise ValueError(
                 'No father node for the given descendant position',
                 descendant_position)
 
-        while father_node.preorder_position() != parent_position:
-            current_child_node = father_node
-            father_node = current_child_node .father()
-            if father_node is None:
-                return None
-
-        return current_child_node
+        child_position = self.child_on_path(
+            parent_position, descendant_position)
+        if child_position is None:
+            return None
+        return self.node_at(child_position)
@@ -0,0 +1,64 @@
+"""TreeBuilder class"""
+
+from tree import Tree
+from tree import TreeNode
+
+
+class TreeBuilder(object):
+    """Builds trees from the start and the end of every node in preorder
+
+    The loaders (yaml2tree, json2tree, xml2tree, ast2tree) walk their input
+    and call start(label) when they enter a node and end() when they leave
+    it, so no input is ever walked recursively. Equal labels are interned:
+    the nodes of all the trees of a builder share one label object per
+    distinct label, which saves the memory of the many copies a parser
+    makes.
+    """
+
+    def __init__(self):
+        self._labels = {}
+        # The root of the tree being built and the nodes entered but not
+        # left yet
+        self._root = None
+        self._open = []
+
+    def start(self, label):
+        """Enters a node with the given label, a child of the current node"""
+        # The type is part of the key so that 1, 1.0 and True stay apart
+        label = self._labels.setdefault((type(label), label), label)
+        node = TreeNode(label)
+        if self._open:
+            self._open[-1].add_child(node)
+        elif self._root is None:
+            self._root = node
+        else:
+            raise ValueError('A tree has a single root', label)
+        self._open.append(node)
+
+    def end(self):
+        """Leaves the current node"""
+        if not self._open:
+            raise ValueError('No node to end')
+        self._open.pop()
+
+    def leaf(self, label):
+        """Adds a node without children"""
+        self.start(label)
+        self.end()
+
+    def depth(self):
+        """Returns the number of nodes entered but not left"""
+        return len(self._open)
+
+    def tree(self):
+        """Returns the tree (Tree) built since the last call
+
+        All its nodes must have been left. The builder then starts a new
+        tree.
+        """
+        if self._root is None or self._open:
+            raise ValueError('The tree is not complete')
+        tree = Tree(self._root)
+        tree.build_caches()
+        self._root = None
+        return tree
@@ -0,0 +1,98 @@
+"""Binary files of trees which are loaded through mmap
+
+The file of a tree with n nodes is made of
+
+    header          magic, version, n and the length of the label table
+                    (struct HEADER)
+    parents         n + 1 little endian int32, see CompactTree
+    label ids       n + 1 little endian int32, indices in the label table
+    subtree sizes   n + 1 little endian int32
+    label table     the distinct labels as a JSON list
+
+load_tree maps the file copy-on-write and the arrays of the CompactTree
+it returns are views of the mapping, so opening a tree of millions of
+nodes reads and copies nothing but the label table. Processes loading
+the same file share its pages through the page cache.
+"""
+
+import ctypes
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+from compact_tree import CompactTree
+
+MAGIC = 'TDIFTREE'
+VERSION = 1
+HEADER = struct.Struct('<8sIII')
+
+# The array element of the files, little endian whatever the machine is
+_INT32 = ctypes.c_int32.__ctype_le__
+
+
+def save_tree(tree, path):
+    """Writes the tree (Tree or CompactTree) to the file at path
+
+    The labels have to be JSON values (str, numbers, booleans or None).
+    """
+    if not isinstance(tree, CompactTree):
+        tree = CompactTree.from_tree(tree)
+    try:
+        label_table = json.dumps(tree.labels())
+    except (TypeError, UnicodeDecodeError):
+        label_table = None
+    # Tuples would come back as lists
+    if label_table is None or json.loads(label_table) != tree.labels():
+        raise ValueError('Labels must be JSON values', tree.labels())
+    size = tree.size()
+    with open(path, 'wb') as tree_file:
+        tree_file.write(HEADER.pack(MAGIC, VERSION, size, len(label_table)))
+        for values in (tree.father_positions(), tree.label_indices(),
+                       tree.subtree_sizes()):
+            values = array('i', values)
+            if sys.byteorder == 'big':
+                values.byteswap()
+            values.tofile(tree_file)
+        tree_file.write(label_table)
+
+
+def load_tree(path):
+    """Returns the tree (CompactTree) in the file at path
+
+    The tree is backed by a copy-on-write mapping of the file, which stays
+    mapped as long as the tree is used.
+    """
+    with open(path, 'rb') as tree_file:
+        mapped = mmap.mmap(tree_file.fileno(), 0, access=mmap.ACCESS_COPY)
+    if len(mapped) < HEADER.size:
+        raise ValueError('Not a tree file', path)
+    magic, version, size, table_length = HEADER.unpack_from(mapped, 0)
+    if magic != MAGIC:
+        raise ValueError('Not a tree file', path)
+    if version != VERSION:
+        raise ValueError('Unsupported tree file version', version)
+    array_length = 4 * (size + 1)
+    table_offset = HEADER.size + 3 * array_length
+    if size < 1 or len(mapped) != table_offset + table_length:
+        raise ValueError('Truncated tree file', path)
+
+    parents, label_ids, subtree_sizes = [
+        (_INT32 * (size + 1)).from_buffer(
+            mapped, HEADER.size + index * array_length)
+        for index in range(3)]
+    labels = [_str_if_ascii(label) for label in
+              json.loads(mapped[table_offset:table_offset + table_length])]
+    return CompactTree(parents, label_ids, labels, subtree_sizes)
+
+
+def _str_if_ascii(label):
+    """Returns the label as a str if it is an ASCII unicode, the way YAML
+    and the trees built in Python have it"""
+    if isinstance(label, unicode):
+        try:
+            return label.encode('ascii')
+        except UnicodeEncodeError:
+            pass
+    return label
@@ -0,0 +1,280 @@
+# Wavefront evaluation of the MIN_M and D tables of treediff with NumPy.
+#
+# MIN_M(i, j) only depends on MIN_M(s, t) for ancestors s of i and t of j,
+# and D(i, j) on D(i, j - 1), D(i - 1, j) and MIN_M(i, j), so all the
+# entries on an anti-diagonal i + j = d only depend on the earlier
+# diagonals. The functions below fill the tables one diagonal at a time
+# with NumPy operations over all the entries of the diagonal instead of
+# one entry at a time. For MIN_M, each (depth of s, depth of t) pair is
+# one operation over the entries whose fathers are deep enough.
+#
+# They give the same costs as computeMIN_M and computeD under
+# KEEP_NOTHING and KEEP_CHOICES, and the same choices for the entries
+# which are not INFINITE (the mapping lists of KEEP_MAPPINGS are built
+# one by one anyway). The costs are floats.
+#
+# computeDRows fills D a row at a time instead, which needs fewer and
+# longer NumPy operations than the diagonals (see below).
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+from costModel import UNIT_COSTS
+from treediff import INFINITE
+from treediff import KEEP_CHOICES
+from treediff import KEEP_MAPPINGS
+from treediff import _Band
+from treediff import _FROM_DELETE
+from treediff import _FROM_INSERT
+from treediff import _FROM_MIN_M
+from treediff import _TreeIndex
+from treediff import _chainCount
+from treediff import computeD
+from treediff import computeMIN_M
+
+
+# The arrays of a _TreeIndex that the diagonals gather from
+class _WavefrontIndex(object):
+  def __init__(self, tree):
+    index = _TreeIndex(tree)
+    self.size = index.size
+    self.pairs = index.pairs
+    self.depth = numpy.array(index.depth)
+    self.father = numpy.array(index.father)
+    self.fatherDepth = self.depth[self.father]
+    # ancestorAt[d][i] is the ancestor of i at depth d (0 if i is not
+    # that deep)
+    self.ancestorAt = numpy.zeros(
+        (int(self.depth.max()) + 1, self.size + 1), dtype=int)
+    for i in range(1, self.size + 1):
+      path = index.ancestors[i]
+      self.ancestorAt[:len(path), i] = path
+    # The chain (s, f_i, i - 1) of MIN_M(i, j) is chainBase[i] + depth(s)
+    self.chainBase = numpy.zeros(self.size + 1, dtype=int)
+    for i in range(2, self.size + 1):
+      self.chainBase[i] = (index.pairOffset[i - 1] +
+                           _chainCount(index.depth[index.father[i]]))
+
+# Returns the source positions i of the entries (i, d - i) of diagonal d
+# with i, j >= 2
+def _diagonal(d, sourceSize, targetSize):
+  return numpy.arange(max(2, d - targetSize), min(sourceSize, d - 2) + 1)
+
+# Same as treediff.computeMIN_M, filling the entries with i, j >= 2 one
+# anti-diagonal at a time. Falls back to computeMIN_M without NumPy.
+def computeMIN_MWavefront(E, choicesForE, sourceTree, targetTree,
+                          keep=KEEP_CHOICES, costs=None, limit=INFINITE):
+  if keep == KEEP_MAPPINGS:
+    raise ValueError('Mappings are not kept in the wavefront mode', keep)
+  if numpy is None:
+    return computeMIN_M(E, choicesForE, sourceTree, targetTree, keep, costs,
+                        limit)
+
+  if costs is None:
+    costs = UNIT_COSTS.editCosts(sourceTree, targetTree)
+  source = _WavefrontIndex(sourceTree)
+  target = _WavefrontIndex(targetTree)
+  row = target.size + 1
+  width = target.pairs
+  band = _Band(source.size, target.size, costs, limit)
+  relabelCosts = numpy.array(costs.relabelCosts, dtype=float)
+  # The first row and column are the same as in computeMIN_M
+  table = numpy.full((source.size + 1) * row, INFINITE)
+  table[row + 1] = costs.relabelCosts[1][1]
+  for j in range(2, target.size):
+    table[row + j] = table[row + j - 1] + costs.insertCosts[j]
+  for i in range(2, source.size):
+    table[i * row + 1] = table[(i - 1) * row + 1] + costs.deleteCosts[i]
+  choices = numpy.zeros(len(table), dtype=int)
+
+  for d in range(4, source.size + target.size + 1):
+    I = _diagonal(d, source.size, target.size)
+    if not len(I):
+      continue
+    J = d - I
+    fatherOfI = source.father[I]
+    fatherOfJ = target.father[J]
+    depthOfF_i = source.fatherDepth[I]
+    depthOfF_j = target.fatherDepth[J]
+    # The (s, t) of every entry, the same order as the loops of
+    # computeMIN_M so that the last (s, t) with the lowest cost is chosen
+    # like there
+    candidates = []
+    for ds in range(int(depthOfF_i.max()), -1, -1):
+      deepEnough = depthOfF_i >= ds
+      for dt in range(int(depthOfF_j.max()), -1, -1):
+        entries = numpy.flatnonzero(deepEnough & (depthOfF_j >= dt))
+        s = source.ancestorAt[ds][fatherOfI[entries]]
+        t = target.ancestorAt[dt][fatherOfJ[entries]]
+        keysForE = ((source.chainBase[I[entries]] + ds) * width +
+                    target.chainBase[J[entries]] + dt)
+        candidates.append((entries, s, t, keysForE))
+    # E is a list far larger than the entries the diagonal reads, so only
+    # those are gathered
+    keysOfE = numpy.concatenate([keys for _, _, _, keys in candidates])
+    valuesOfE = numpy.array(map(E.__getitem__, keysOfE.tolist()), dtype=float)
+
+    best = numpy.full(len(I), INFINITE)
+    chosen = numpy.zeros(len(I), dtype=int)
+    offset = 0
+    for entries, s, t, _ in candidates:
+      keysForM = s * row + t
+      temp = (table[keysForM] + valuesOfE[offset:offset + len(entries)] -
+              relabelCosts[s, t])
+      offset += len(entries)
+      better = temp <= best[entries]
+      best[entries[better]] = temp[better]
+      chosen[entries[better]] = keysForM[better]
+
+    keys = I * row + J
+    best += relabelCosts[I, J]
+    rest = band.cheapest * numpy.abs(band.sizeDifference - (J - I))
+    best[best + rest > limit] = INFINITE
+    table[keys] = best
+    choices[keys] = chosen
+
+  MIN_M = table.tolist()
+  if keep != KEEP_CHOICES:
+    return MIN_M, None
+  return MIN_M, choices.tolist()
+
+# Same as treediff.computeD, filling the entries with i, j >= 2 one
+# anti-diagonal at a time. Falls back to computeD without NumPy.
+def computeDWavefront(sourceTree, targetTree, MIN_M, choicesForMinM,
+                      keep=KEEP_CHOICES, costs=None, limit=INFINITE):
+  if keep == KEEP_MAPPINGS:
+    raise ValueError('Mappings are not kept in the wavefront mode', keep)
+  if numpy is None:
+    return computeD(sourceTree, targetTree, MIN_M, choicesForMinM, keep,
+                    costs, limit)
+
+  if costs is None:
+    costs = UNIT_COSTS.editCosts(sourceTree, targetTree)
+  sourceSize = sourceTree.size()
+  targetSize = targetTree.size()
+  row = targetSize + 1
+  band = _Band(sourceSize, targetSize, costs, limit)
+  deleteCosts = numpy.array(costs.deleteCosts, dtype=float)
+  insertCosts = numpy.array(costs.insertCosts, dtype=float)
+  MIN_M = numpy.array(MIN_M, dtype=float)
+  D = numpy.full((sourceSize + 1) * row, INFINITE)
+  D[row + 1] = costs.relabelCosts[1][1]
+  for i in range(2, sourceSize + 1):
+    D[i * row + 1] = D[(i - 1) * row + 1] + deleteCosts[i]
+  for j in range(2, targetSize + 1):
+    D[row + j] = D[row + j - 1] + insertCosts[j]
+  choices = numpy.zeros(len(D), dtype=numpy.uint8)
+
+  for d in range(4, sourceSize + targetSize + 1):
+    I = _diagonal(d, sourceSize, targetSize)
+    if not len(I):
+      continue
+    J = d - I
+    keys = I * row + J
+    option1 = D[keys - 1] + insertCosts[J]
+    option2 = D[keys - row] + deleteCosts[I]
+    option3 = MIN_M[keys]
+    best = numpy.minimum(numpy.minimum(option1, option2), option3)
+    choices[keys] = numpy.where(
+        best == option1, _FROM_INSERT,
+        numpy.where(best == option2, _FROM_DELETE, _FROM_MIN_M))
+    rest = band.cheapest * numpy.abs(band.sizeDifference - (J - I))
+    best[best + rest > limit] = INFINITE
+    D[keys] = best
+
+  if keep != KEEP_CHOICES:
+    return D.tolist(), None
+  return D.tolist(), bytearray(choices.tostring())
+
+# Same as treediff.computeD, filling D one row at a time instead. Within
+# row i, D(i, j) is the least of a(k) plus the insertions of k + 1, ...,
+# j over k <= j, where a(k) = min(D(i - 1, k) + delete(i), MIN_M(i, k)),
+# so with the prefix sums P of the insertion costs the whole row is
+#
+#   D(i, j) = P(j) + min over k <= j of (a(k) - P(k))
+#
+# which is one numpy.minimum.accumulate. The entries are the same as the
+# ones of computeD, and the choices the same for the entries which are
+# not INFINITE, as long as the sums are exact: when the insertion and
+# deletion costs and MIN_M are whole numbers below 2 ** 52. Otherwise,
+# and without NumPy, computeD is run instead. The costs are floats.
+def computeDRows(sourceTree, targetTree, MIN_M, choicesForMinM,
+                 keep=KEEP_CHOICES, costs=None, limit=INFINITE):
+  if keep == KEEP_MAPPINGS:
+    raise ValueError('Mappings are not kept in the row mode', keep)
+  if costs is None:
+    costs = UNIT_COSTS.editCosts(sourceTree, targetTree)
+  if numpy is None:
+    return computeD(sourceTree, targetTree, MIN_M, choicesForMinM, keep,
+                    costs, limit)
+  # fromiter reads a list of numbers a few times faster than array
+  table = numpy.fromiter(MIN_M, dtype=float, count=len(MIN_M))
+  if not _exact(costs, table):
+    return computeD(sourceTree, targetTree, MIN_M, choicesForMinM, keep,
+                    costs, limit)
+
+  sourceSize = sourceTree.size()
+  targetSize = targetTree.size()
+  row = targetSize + 1
+  band = _Band(sourceSize, targetSize, costs, limit)
+  # deleteCosts[i] and insertCosts[j] are the costs of the nodes i and j,
+  # and prefix[j] is the cost of inserting 2, ..., j
+  deleteCosts = numpy.array([0] + costs.deleteCosts[1:], dtype=float)
+  insertCosts = numpy.array([0] + costs.insertCosts[1:], dtype=float)
+  prefix = numpy.zeros(row)
+  prefix[2:] = numpy.cumsum(insertCosts[2:])
+  columns = numpy.arange(row)
+  D = numpy.full((sourceSize + 1, row), INFINITE)
+  MIN_M = table.reshape(sourceSize + 1, row)
+  choices = numpy.zeros((sourceSize + 1, row), dtype=numpy.uint8)
+  D[1, 1] = costs.relabelCosts[1][1]
+  D[1, 2:] = D[1, 1] + prefix[2:]
+  D[2:, 1] = D[1, 1] + numpy.cumsum(deleteCosts[2:])
+
+  for i in range(2, sourceSize + 1):
+    first = max(2, band.first(i))
+    last = band.last(i)
+    if first > last:
+      continue
+    above = D[i - 1] + deleteCosts[i]
+    a = numpy.minimum(above[first:last + 1], MIN_M[i, first:last + 1])
+    # The entries left of the band are not computed, so D(i, 1) only
+    # reaches the row when the band starts at column 2
+    start = first
+    if first == 2:
+      start = 1
+      a = numpy.concatenate(([D[i, 1]], a))
+    best = (prefix[start:last + 1] +
+            numpy.minimum.accumulate(a - prefix[start:last + 1]))
+    best = best[first - start:]
+    rest = band.cheapest * numpy.abs(
+        band.sizeDifference - (columns[first:last + 1] - i))
+    kept = best + rest <= limit
+    best[~kept] = INFINITE
+    D[i, first:last + 1] = best
+    if keep == KEEP_CHOICES:
+      option1 = D[i, first - 1:last] + insertCosts[first:last + 1]
+      option2 = above[first:last + 1]
+      choices[i, first:last + 1] = numpy.where(
+          ~kept, 0,
+          numpy.where(best == option1, _FROM_INSERT,
+                      numpy.where(best == option2, _FROM_DELETE,
+                                  _FROM_MIN_M)))
+
+  if keep != KEEP_CHOICES:
+    return D.ravel().tolist(), None
+  return D.ravel().tolist(), bytearray(choices.tostring())
+
+# Returns whether the sums of computeDRows are exact in floats: the
+# insertion and deletion costs and the MIN_M entries are whole numbers
+# and a MIN_M entry plus all the costs stays below 2 ** 52. MIN_M is an
+# array.
+def _exact(costs, MIN_M):
+  nodeCosts = numpy.array(costs.deleteCosts[1:] + costs.insertCosts[1:],
+                          dtype=float)
+  MIN_M = MIN_M[numpy.isfinite(MIN_M)]
+  values = numpy.concatenate((nodeCosts, MIN_M))
+  return bool(numpy.all(values == numpy.floor(values)) and
+              abs(MIN_M).max() + abs(nodeCosts).sum() < 2 ** 52)
@@ -0,0 +1,64 @@
+# Builds trees from XML documents.
+#
+# Every element is a node labeled with its tag. Its children are a leaf
+# '@name=value' for every attribute, sorted by name, then its text and
+# its child elements in document order, each followed by its tail text.
+# Texts are leaves labeled with the stripped text, blank ones are left
+# out. So <a x="1">t<b/>u</a> is
+#
+#   a - @x=1
+#     \ t
+#     \ b
+#     \ u
+#
+# The document is read with iterparse and every element is removed from
+# its father as soon as it is in the tree, so besides the tree only the
+# elements being read and the ones the parser has read ahead are kept in
+# memory.
+
+try:
+  from xml.etree.cElementTree import iterparse
+except ImportError:
+  from xml.etree.ElementTree import iterparse
+
+from util.tree_builder import TreeBuilder
+
+# Returns the tree of the XML document in source (a file name or a file)
+def buildTreeFromXml(source):
+  builder = TreeBuilder()
+  # For every element being read, [element, whether its text is in the
+  # tree, its last child element whose tail is not in the tree yet]
+  pending = []
+  for event, element in iterparse(source, events=('start', 'end')):
+    if event == 'start':
+      if pending:
+        _addTexts(pending[-1], builder)
+      builder.start(element.tag)
+      for name, value in sorted(element.attrib.items()):
+        builder.leaf('@%s=%s' % (name, value))
+      pending.append([element, False, None])
+    else:
+      _addTexts(pending.pop(), builder)
+      builder.end()
+      if pending:
+        pending[-1][2] = element
+      else:
+        element.clear()
+  return builder.tree()
+
+# Adds the texts of a pending element that are complete by now: its own
+# text before its first child element and the tail of its last child
+# element, which is removed from the element then
+def _addTexts(entry, builder):
+  element, textAdded, lastChild = entry
+  if not textAdded:
+    _addText(element.text, builder)
+    entry[1] = True
+  if lastChild is not None:
+    _addText(lastChild.tail, builder)
+    element.remove(lastChild)
+    entry[2] = None
+
+def _addText(text, builder):
+  if text is not None and text.strip():
+    builder.leaf(text.strip())
@@ -1,34 +1,88 @@
-# requires
-# pip install pyyaml
-import yaml
-from util.tree import Tree
-from util.tree import TreeNode
-
-def buildTreesFromYamlInput(treesAsYaml):
-    yamlInput = yaml.safe_load_all(treesAsYaml)
-    treesParsed = []
-    for t in yamlInput:
-        treesParsed.append(t)    
-    trees = []
-    for treeParsed in treesParsed:
-      trees.append(_buildTree(treeParsed))
-
-    return trees
-
-def _buildSubtree(rootLabel, children):
-  rootNode = TreeNode(rootLabel)
-  if children:
-    for childDict in children:
-      childLabel, childrenOfChild = childDict.iteritems().next()
-      childNode = _buildSubtree(childLabel, childrenOfChild)
-      rootNode.add_child(childNode)
-  return rootNode
-
-def _buildTree(treeParsed):
-    rootLabel, children = treeParsed.iteritems().next()
-    rootNode = _buildSubtree(rootLabel, children)
-    aTree = Tree(rootNode)
-    aTree.build_caches()
-    aTree.print_preorder_traversal()
-    return aTree
-
+# requires
+# pip install pyyaml
+#
+# The trees are read from YAML documents like
+#
+# ---
+# A:
+#   - B:
+#   - C:
+#     - D:
+#
+# where every node is a mapping from its label to the list of its
+# children (empty for a leaf).
+import yaml
+from util.tree_builder import TreeBuilder
+
+# The LibYAML parser is much faster when PyYAML was built with it
+try:
+  from yaml import CSafeLoader as _Loader
+except ImportError:
+  from yaml import SafeLoader as _Loader
+
+# Returns the trees of all the documents in treesAsYaml as a list
+def buildTreesFromYamlInput(treesAsYaml):
+  return list(iterTreesFromYamlInput(treesAsYaml))
+
+# Yields the trees of the documents in treesAsYaml (a str or a file) one
+# at a time. The trees are built straight from the events of the parser,
+# so only the tree being built and the part of the input the parser
+# buffers are in memory. Empty documents are skipped.
+def iterTreesFromYamlInput(treesAsYaml):
+  loader = _Loader(treesAsYaml)
+  builder = TreeBuilder()
+  try:
+    _expect(loader, yaml.StreamStartEvent)
+    while not loader.check_event(yaml.StreamEndEvent):
+      _expect(loader, yaml.DocumentStartEvent)
+      if loader.check_event(yaml.ScalarEvent):
+        _expectEmpty(loader, loader.get_event())
+      else:
+        _readTree(loader, builder)
+        yield builder.tree()
+      _expect(loader, yaml.DocumentEndEvent)
+  finally:
+    loader.dispose()
+
+# Reads the events of one tree into the builder (util.tree_builder)
+def _readTree(loader, builder):
+  while True:
+    _expect(loader, yaml.MappingStartEvent)
+    builder.start(_label(loader, _expect(loader, yaml.ScalarEvent)))
+    event = loader.get_event()
+    # The node stays open while its list of children is read
+    if not isinstance(event, yaml.SequenceStartEvent):
+      _expectEmpty(loader, event)
+      _expect(loader, yaml.MappingEndEvent)
+      builder.end()
+    while builder.depth() and loader.check_event(yaml.SequenceEndEvent):
+      loader.get_event()
+      _expect(loader, yaml.MappingEndEvent)
+      builder.end()
+    if not builder.depth():
+      return
+
+# Returns the next event, which must be of the given class
+def _expect(loader, eventClass):
+  event = loader.get_event()
+  if not isinstance(event, eventClass):
+    raise ValueError('Unexpected YAML in a tree', str(event.start_mark))
+  return event
+
+# Checks that the value of a node without children is empty or null
+def _expectEmpty(loader, event):
+  if not (isinstance(event, yaml.ScalarEvent) and
+          _label(loader, event) in (None, '')):
+    raise ValueError('Expected a list of children', str(event.start_mark))
+
+# Returns the label of a scalar event, typed like yaml.safe_load types it
+def _label(loader, event):
+  tag = event.tag
+  if tag is None or tag == '!':
+    tag = loader.resolve(yaml.ScalarNode, event.value, event.implicit)
+  node = yaml.ScalarNode(tag, event.value, event.start_mark, event.end_mark,
+                         event.style)
+  constructor = loader.yaml_constructors.get(tag)
+  if constructor is None:
+    raise ValueError('Unsupported YAML tag', tag)
+  return constructor(loader, node)